@@ -1,18 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.database import get_session
 from app.models import User
-from app.core.security import pwd_context, create_access_token
+from app.core.security import create_access_token, invalidar_usuario
+from app.core.senhas import verificar_senha
+from app.core.limites import limitar_login
+from app.schemas.user import TokenResponse
 
 router = APIRouter(tags=["Autenticação"])
 
-@router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
-    usuario = session.exec(select(User).where(User.email == form_data.username)).first()
-    if not usuario or not pwd_context.verify(form_data.password, usuario.hashed_password):
+# Limitado por IP e por conta antes do bcrypt (app/core/limites.py)
+@router.post("/login", response_model=TokenResponse, dependencies=[Depends(limitar_login)])
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_session)):
+    usuario = (await session.exec(select(User).where(User.email == form_data.username))).first()
+    if not usuario:
         raise HTTPException(status_code=401, detail="Credenciais inválidas.")
+
+    # bcrypt roda no pool de processos de hash (app/core/senhas.py)
+    senha_ok, novo_hash = await verificar_senha(form_data.password, usuario.hashed_password)
+    if not senha_ok:
+        raise HTTPException(status_code=401, detail="Credenciais inválidas.")
+
+    # Custo do bcrypt mudou desde que a senha foi salva: aproveita a senha em mãos e refaz o hash
+    if novo_hash:
+        usuario.hashed_password = novo_hash
+        session.add(usuario)
+        await session.commit()
+        invalidar_usuario(usuario.id)
     
-    access_token = create_access_token(data={"sub": usuario.email})
+    # "uid" permite ao get_current_user buscar o usuário por chave primária (e usar o cache)
+    access_token = create_access_token(data={"sub": usuario.email, "uid": usuario.id})
     
     return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
@@ -0,0 +1,107 @@
+import time
+from contextlib import aclosing
+
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.eventos import AssinanteLento, broker, serializar
+from app.core.security import get_current_user
+from app.database import async_engine, get_session
+from app.models import User
+
+router = APIRouter(prefix="/eventos", tags=["Eventos"])
+
+# Eventos que podem tirar o acesso de quem é citado neles
+EVENTOS_DE_ACESSO = ("morador_saiu", "cargo_alterado")
+
+
+async def ainda_e_morador(user_id: int, republic_id: int) -> bool:
+    # Direto do banco (o cache de usuários pode estar atrasado em outro worker)
+    async with AsyncSession(async_engine) as session:
+        atual = (await session.exec(select(User.republic_id).where(User.id == user_id))).first()
+    return atual == republic_id
+
+
+async def eventos_do_morador(user_id: int, republic_id: int):
+    """
+    Eventos da república (None nos heartbeats) enquanto o usuário for morador dela.
+    Confere no banco a cada evento que o cita (saída, troca de cargo) e a cada
+    eventos_revalidar segundos; quando ele deixa de ser morador, termina.
+    """
+    proxima_conferencia = time.monotonic() + settings.eventos_revalidar
+    async with aclosing(broker().assinar(republic_id, settings.eventos_heartbeat)) as eventos:
+        async for evento in eventos:
+            cita_o_usuario = (
+                evento is not None and evento["tipo"] in EVENTOS_DE_ACESSO
+                and evento["dados"].get("user_id") == user_id
+            )
+            if cita_o_usuario or time.monotonic() >= proxima_conferencia:
+                if not await ainda_e_morador(user_id, republic_id):
+                    return
+                proxima_conferencia = time.monotonic() + settings.eventos_revalidar
+            yield evento
+
+
+# rota de eventos da república em tempo real (Server-Sent Events)
+@router.get("/")
+async def eventos_sse(
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    if current_user.republic_id is None:
+        raise HTTPException(status_code=400, detail="Usuário não pertence a nenhuma república.")
+    republic_id = current_user.republic_id
+    user_id = current_user.id
+    # A conexão fica aberta por horas: devolve a conexão do banco ao pool agora
+    await session.close()
+
+    async def stream():
+        yield "retry: 3000\n\n"
+        try:
+            async for evento in eventos_do_morador(user_id, republic_id):
+                if evento is None:
+                    yield ": ping\n\n"
+                else:
+                    yield f"event: {evento['tipo']}\ndata: {serializar(evento)}\n\n"
+            # Deixou de ser morador: o cliente não deve reconectar
+            yield "event: encerrado\ndata: {}\n\n"
+        except AssinanteLento:
+            # O cliente reconecta (retry) e refaz as leituras
+            yield "event: reconectar\ndata: {}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# mesma coisa por WebSocket; o token vai na query (?token=...), já que o navegador não manda cabeçalhos
+@router.websocket("/ws")
+async def eventos_ws(websocket: WebSocket, token: str = Query(...)):
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        try:
+            current_user = await get_current_user(token, session)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+    if current_user.republic_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    try:
+        async for evento in eventos_do_morador(current_user.id, current_user.republic_id):
+            if evento is None:
+                await websocket.send_json({"tipo": "ping"})
+            else:
+                await websocket.send_text(serializar(evento))
+        # Deixou de ser morador da república
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+    except AssinanteLento:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+    except WebSocketDisconnect:
+        pass
@@ -1,104 +1,195 @@
 from datetime import date
-from app.models.finance import CashTransaction, ExpenseTemplate, ResidentPurchase
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from decimal import Decimal
+from app.models.finance import CashTransaction, CashTransactionArchive, ExpenseTemplate, ResidentPurchase
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from app.database import get_session
-from app.models import User, Republic, Expense, UserExpense
-from app.models.finance import PaymentHistory 
+from app.models import User, Republic, Expense
+from app.models.finance import UserBalance, RepublicBalance
 from app.schemas.republic import RoleUpdate
-from app.schemas.finance import ExpenseTemplateUpdate, PaymentCreate, FixedRentUpdate, CashTransactionCreate, DashboardResponse, ExpenseCreateInput, ExpenseResponse, ExpenseTemplateCreate, ResidentPurchaseCreate
-from app.core.security import get_current_user
-from typing import List
-from sqlalchemy import func
-
-router = APIRouter(prefix="/financas", tags=["Finanças"])
+from app.schemas.finance import ExpenseTemplateUpdate, PaymentCreate, FixedRentUpdate, CashTransactionCreate, DashboardResponse, ExpenseCreateInput, ExpenseHistoricoResponse, ExpenseResponse, ExpenseTemplateCreate, ResidentPurchaseCreate, MensalidadeJobResponse, ResidentPurchaseLoteItem, CashTransactionLoteItem, LoteResponse, AlugueisResponse, CaixaTransacaoResponse, CashTransactionResponse, DetalheResponse, DevedorResponse, ExpenseTemplateResponse, MensalidadeResponse, PagamentoResponse, AcertoAplicar, AcertoAplicadoResponse, AcertoResponse
+from app.schemas.user import UserPublic
+from app.core.config import settings
+from app.core.security import get_current_user, invalidar_usuario
+from app.core.paginacao import Paginacao, resposta_ndjson
+from app.core.etag import etag_republica
+from app.core.eventos import publicar_apos_commit
+from app.core.limites import limitar_escritas
+from app.core.shards import confirmar, get_session_republica
+from app.core.replicas import get_session_leitura, marcar_escrita
+from app.services.ledger import ajustar_saldo_usuario, ajustar_saldo_republica
+from app.services.acerto import AcertoDesatualizado, aplicar_acerto, calcular_posicoes, montar_resposta
+from app.services.devedores import gerar_relatorio_devedores
+from app.services.despesas import gerar_mensalidades, moradores_por_republica, ratear_igualmente
+from app.services.pagamentos import alocar_pagamento, ConflitoDePagamento
+from app.services.idempotencia import Pedido, pedido_idempotente, resposta_salva, salvar_resposta
+from app.services.versoes import incrementar_versao, versao_atual
+from app.services import jobs, lotes, resumos
+from typing import List, Literal, Optional
+
+# Escritas limitadas por IP e por conta (app/core/limites.py); as leituras não gastam ficha
+router = APIRouter(prefix="/financas", tags=["Finanças"], dependencies=[Depends(limitar_escritas), Depends(marcar_escrita)])
+
+TENTATIVAS_PAGAMENTO = 3
 
 # dependencias de permissão
-def check_admin_finance(current_user: User = Depends(get_current_user)):
+async def check_admin_finance(current_user: User = Depends(get_current_user)):
     if current_user.role_tag == "admin_finance" or current_user.role_tag == "admin":
         return current_user
     raise HTTPException(status_code=403, detail= "Acesso negado: somente administradores de finanças podem acessar.")
 
+def checar_tamanho_lote(itens: list):
+    if not itens:
+        raise HTTPException(status_code=400, detail="O lote está vazio.")
+    if len(itens) > settings.lote_max_itens:
+        raise HTTPException(status_code=413, detail=f"O lote aceita no máximo {settings.lote_max_itens} itens.")
+
+async def concluir_lote(session, response, user_id, rep_id, idempotencia, resultados, aceitos, atomico, gravar):
+    """
+    Parte comum das rotas de lote: grava os aceitos com `gravar()` e faz um único commit,
+    junto com a versão da república e a resposta da Idempotency-Key (o app pode reenviar a
+    fila inteira depois de um timeout sem duplicar nada). No modo atômico, qualquer item
+    rejeitado faz o lote inteiro voltar com 422 sem gravar nada.
+    """
+    rejeitados = len(resultados) - len(aceitos)
+    if atomico and rejeitados:
+        lotes.marcar_nao_aplicados(resultados)
+        response.status_code = 422
+        return {"detail": "Nenhum item foi gravado: há itens rejeitados.", "aceitos": 0, "rejeitados": rejeitados, "resultados": resultados}
+
+    resposta = {"detail": f"{len(aceitos)} de {len(resultados)} itens registrados.", "aceitos": len(aceitos), "rejeitados": rejeitados, "resultados": resultados}
+    if aceitos:
+        await gravar()
+        await incrementar_versao(session, [rep_id])
+    salvar_resposta(session, user_id, idempotencia, jsonable_encoder(resposta))
+    try:
+        await session.commit()
+    except IntegrityError:
+        # A mesma Idempotency-Key foi processada em paralelo e gravada primeiro
+        await session.rollback()
+        salva = await resposta_salva(session, user_id, idempotencia)
+        if salva is None:
+            raise
+        return salva
+    return resposta
+
 #rota para criação de despesas fixas da republica, feita por ADM
 @router.post("/despesas", response_model=ExpenseResponse)
-def criar_despesas(
+async def criar_despesas(
     expense_in: ExpenseCreateInput, 
     current_user: User  = Depends(get_current_user), 
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session_republica)
 ):
     nova_despesa = Expense(
         description = expense_in.description,
-        total_value = expense_in.total_value,
+        amount = expense_in.total_value,
         due_date = expense_in.due_date,
         category = expense_in.category,
         split_type = expense_in.split_type,
         republic_id = current_user.republic_id
     )
     session.add(nova_despesa)
-    session.commit()
-    session.refresh(nova_despesa)
+    await session.flush() # INSERT ... RETURNING id
 
-    moradores = session.exec(select(User).where(User.republic_id == current_user.republic_id)).all()
-    
     if expense_in.split_type == "equal":
-        # Dividir igualmente entre todos os moradores da república
-        split_value = expense_in.total_value / len(moradores)
-        for morador in moradores:
-            user_expense = UserExpense(
-                user_id = morador.id,
-                expense_id = nova_despesa.id,
-                value = split_value
-            )
-            session.add(user_expense)
+        # Dividir igualmente entre todos os moradores da república (fatias em um único INSERT em lote)
+        moradores = await moradores_por_republica(session, [current_user.republic_id])
+        await ratear_igualmente(session, [(nova_despesa.id, nova_despesa.republic_id, nova_despesa.amount)], moradores)
+    else:
+        await ajustar_saldo_republica(session, current_user.republic_id, despesas=nova_despesa.amount)
+    await resumos.registrar(session, nova_despesa.republic_id, nova_despesa.due_date, nova_despesa.category, "expenses", nova_despesa.amount)
     
-    session.commit()
-    return("Despesa criada com sucesso.", nova_despesa)
+    await incrementar_versao(session, [current_user.republic_id])
+    publicar_apos_commit(
+        session, current_user.republic_id, "despesa_criada",
+        expense_id=nova_despesa.id, description=nova_despesa.description, amount=nova_despesa.amount,
+        due_date=nova_despesa.due_date, category=nova_despesa.category, split_type=nova_despesa.split_type,
+    )
+    await session.commit()
+    await session.refresh(nova_despesa, ["splits"])
+    return nova_despesa
 
 # rota para listar despesas da republica
-@router.get("/despesas", response_model=List[ExpenseResponse])
-def listar_despesas(
+@router.get("/despesas", response_model=List[ExpenseResponse], dependencies=[Depends(etag_republica)])
+async def listar_despesas(
+    response: Response,
+    formato: Literal["json", "ndjson"] = "json",
+    historico: Literal["recente", "completo"] = "recente",
+    paginacao: Paginacao = Depends(),
     current_user: User  = Depends(get_current_user), 
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session_leitura)
 ):
-    despesas = session.exec(
-        select(Expense).where(Expense.republic_id == current_user.republic_id)
-    ).all()
-    return despesas
+    statement = (
+        select(Expense)
+        .where(Expense.republic_id == current_user.republic_id)
+        .options(selectinload(Expense.splits))
+    )
+    schema = ExpenseResponse
+    # completo: junta as fatias quitadas que já foram para o arquivo (app/services/arquivo.py)
+    if historico == "completo":
+        statement = statement.options(selectinload(Expense.archived_splits))
+        schema = ExpenseHistoricoResponse
+    # ndjson: todas as despesas (a partir do cursor, se houver) transmitidas linha a linha
+    if formato == "ndjson":
+        return resposta_ndjson(paginacao.aplicar(statement, Expense.id, com_limite=False), schema, engine=session.bind)
+
+    despesas = (await session.exec(paginacao.aplicar(statement, Expense.id))).all()
+    if historico == "completo":
+        despesas = [ExpenseHistoricoResponse.model_validate(despesa) for despesa in despesas]
+    return paginacao.finalizar(despesas, response)
 
 #rota para listar alugueis fixos dos moradores
-@router.get("/alugueis-fixos")
-def listar_alugueis(
+@router.get("/alugueis-fixos", response_model=List[UserPublic])
+async def listar_alugueis(
     current_user: User = Depends(check_admin_finance),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session_republica)
 ):
-    # Retorna todos os moradores da república do admin
+    # Retorna todos os moradores da república do admin (UserPublic: sem o hash da senha)
     statement = select(User).where(User.republic_id == current_user.republic_id)
-    users = session.exec(statement).all()
+    users = (await session.exec(statement)).all()
     return users
 
-#rota para atualizar alugueis fixos dos moradores
-@router.put("/alugueis-fixos")
-def atualizar_alugueis(
+#rota para atualizar alugueis fixos dos moradores (vários de uma vez, um UPDATE em lote)
+@router.put("/alugueis-fixos", response_model=AlugueisResponse)
+async def atualizar_alugueis(
     updates: List[FixedRentUpdate],
+    atomico: bool = False,
     current_user: User = Depends(check_admin_finance),
-    session: Session = Depends(get_session)
+    diretorio: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_session_republica)
 ):
-    for update in updates:
-        # Verifica se o usuário pertence à mesma república (segurança)
-        user = session.get(User, update.user_id)
-        if user and user.republic_id == current_user.republic_id:
-            user.fixed_rent = update.fixed_rent
-            session.add(user)
-    
-    session.commit()
-    return {"mensagem": "Aluguéis atualizados com sucesso!"}
+    checar_tamanho_lote(updates)
+    rep_id = current_user.republic_id
+    # Verifica numa única consulta quais usuários pertencem à mesma república (segurança)
+    resultados, aceitos = await lotes.validar_alugueis(session, rep_id, updates)
+    if atomico and len(aceitos) < len(updates):
+        lotes.marcar_nao_aplicados(resultados)
+        return {"mensagem": "Nenhum aluguel foi atualizado: há itens rejeitados.", "resultados": resultados}
+
+    # O aluguel fica no usuário: grava no diretório e, com a república em outro shard, na cópia de lá
+    await lotes.gravar_alugueis(diretorio, resultados, aceitos)
+    if session is not diretorio:
+        await lotes.gravar_alugueis(session, resultados, aceitos)
+    alterados = list(aceitos)
+    if alterados:
+        await incrementar_versao(session, [rep_id])
+        publicar_apos_commit(session, rep_id, "alugueis_atualizados", user_ids=alterados)
+    await confirmar(diretorio, session)
+    for user_id in alterados:
+        invalidar_usuario(user_id)
+    return {"mensagem": "Aluguéis atualizados com sucesso!", "resultados": resultados}
 
 #rota para registrar compras feitas por moradores
-@router.post("/compras-moradores")
-def registrar_compra_morador(
+@router.post("/compras-moradores", response_model=DetalheResponse)
+async def registrar_compra_morador(
     compra_in: ResidentPurchaseCreate,
     current_user: User  = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session_republica)
 ):
     nova_compra = ResidentPurchase(
         description = compra_in.description,
@@ -108,15 +199,55 @@ def registrar_compra_morador(
         republic_id = current_user.republic_id
     )
     session.add(nova_compra)
-    session.commit()
-    session.refresh(nova_compra)
+    await ajustar_saldo_usuario(session, current_user.id, creditos=nova_compra.amount)
+    await resumos.registrar(session, nova_compra.republic_id, nova_compra.purchase_date, resumos.CATEGORIA_GERAL, "purchases", nova_compra.amount)
+    await incrementar_versao(session, [current_user.republic_id])
+    publicar_apos_commit(
+        session, current_user.republic_id, "compra_registrada",
+        user_id=current_user.id, description=nova_compra.description, amount=nova_compra.amount,
+    )
+    await session.commit()
+    await session.refresh(nova_compra)
     return {"detail": "Compra registrada com sucesso."}
     
-@router.post("/caixa/transacao")
-def registrar_transacao_caixa(
+# compras em lote (importação de notas, fila offline do app) numa única transação
+@router.post("/compras-moradores/lote", response_model=LoteResponse)
+async def registrar_compras_em_lote(
+    itens: List[ResidentPurchaseLoteItem],
+    response: Response,
+    atomico: bool = False,
+    idempotencia: Optional[Pedido] = Depends(pedido_idempotente),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session_republica)
+):
+    checar_tamanho_lote(itens)
+    if current_user.republic_id is None:
+        raise HTTPException(status_code=400, detail="Usuário não pertence a nenhuma república.")
+    user_id, rep_id = current_user.id, current_user.republic_id
+    salva = await resposta_salva(session, user_id, idempotencia)
+    if salva is not None:
+        return salva
+
+    resultados, aceitos = await lotes.validar_compras(
+        session, current_user, itens, pode_lancar_para_outros=current_user.role_tag in ("admin", "admin_finance")
+    )
+
+    async def gravar():
+        await lotes.gravar_compras(session, resultados, aceitos)
+        publicar_apos_commit(
+            session, rep_id, "compras_registradas",
+            quantidade=len(aceitos), user_ids=sorted({linha["user_id"] for _, linha in aceitos}),
+            amount=sum(linha["amount"] for _, linha in aceitos),
+        )
+
+    return await concluir_lote(session, response, user_id, rep_id, idempotencia,
+                               resultados, aceitos, atomico, gravar)
+
+@router.post("/caixa/transacao", response_model=CaixaTransacaoResponse)
+async def registrar_transacao_caixa(
     transaction_in: CashTransactionCreate,
     current_user: User  = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session_republica)
 ):
     nova_transacao = CashTransaction(
         description = transaction_in.description,
@@ -130,55 +261,110 @@ def registrar_transacao_caixa(
         raise HTTPException(status_code=400, detail="Tipo de transação inválido. Use 'in' ou 'out'.")
     
     session.add(nova_transacao)
-    session.commit()
-    session.refresh(nova_transacao)
 
     # Ajustar o saldo do caixa conforme o tipo de transação
-    valor_final = transaction_in.amount if transaction_in.type == "in" else -transaction_in.amount
+    if transaction_in.type == "in":
+        await ajustar_saldo_republica(session, current_user.republic_id, entradas=transaction_in.amount)
+    else:
+        await ajustar_saldo_republica(session, current_user.republic_id, saidas=transaction_in.amount)
+    await resumos.registrar(
+        session, current_user.republic_id, nova_transacao.transaction_date, resumos.CATEGORIA_GERAL,
+        "cashbox_in" if transaction_in.type == "in" else "cashbox_out", transaction_in.amount,
+    )
 
-    return {"detail": f"Transação de {nova_transacao.amount} registrada com sucesso.", "transacao": nova_transacao.amount}
+    await incrementar_versao(session, [current_user.republic_id])
+    publicar_apos_commit(
+        session, current_user.republic_id, "caixa_movimentado",
+        type=nova_transacao.type, description=nova_transacao.description, amount=nova_transacao.amount,
+    )
+    await session.commit()
+    await session.refresh(nova_transacao)
 
-@router.get("/caixa/extrato", response_model=List[CashTransactionCreate])
-def obter_extrato_caixa(
-    current_user: User  = Depends(get_current_user),
-    session: Session = Depends(get_session)
-):
-    statement = select(CashTransaction).where(CashTransaction.republic_id == current_user.republic_id)
-    transacoes = session.exec(statement).all()
-    return transacoes
+    return {"detail": f"Transação de {nova_transacao.amount} registrada com sucesso.", "transacao": nova_transacao.amount}
 
-@router.get("/dashboard", response_model=DashboardResponse)
-def obter_dashboard(
+# movimentações do caixa em lote (ex.: extrato bancário do mês)
+@router.post("/caixa/transacoes/lote", response_model=LoteResponse)
+async def registrar_transacoes_em_lote(
+    itens: List[CashTransactionLoteItem],
+    response: Response,
+    atomico: bool = False,
+    idempotencia: Optional[Pedido] = Depends(pedido_idempotente),
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session_republica)
 ):
-    rep_id = current_user.republic_id
+    checar_tamanho_lote(itens)
+    if current_user.republic_id is None:
+        raise HTTPException(status_code=400, detail="Usuário não pertence a nenhuma república.")
+    user_id, rep_id = current_user.id, current_user.republic_id
+    salva = await resposta_salva(session, user_id, idempotencia)
+    if salva is not None:
+        return salva
+
+    resultados, aceitos = lotes.validar_transacoes(rep_id, itens)
+
+    async def gravar():
+        await lotes.gravar_transacoes(session, rep_id, resultados, aceitos)
+        publicar_apos_commit(
+            session, rep_id, "caixa_movimentado_em_lote",
+            quantidade=len(aceitos),
+            entradas=sum(linha["amount"] for _, linha in aceitos if linha["type"] == "in"),
+            saidas=sum(linha["amount"] for _, linha in aceitos if linha["type"] == "out"),
+        )
 
-    # Agora buscamos APENAS UserExpenses (que incluem Aluguel e Variáveis já gerados)
-    debitos_ativos = session.exec(
-        select(func.sum(UserExpense.value - UserExpense.paid_amount))
-        .where(UserExpense.user_id == current_user.id, UserExpense.is_paid == False)
-    ).one() or 0.0
+    return await concluir_lote(session, response, user_id, rep_id, idempotencia,
+                               resultados, aceitos, atomico, gravar)
 
+@router.get("/caixa/extrato", response_model=List[CashTransactionResponse])
+async def obter_extrato_caixa(
+    response: Response,
+    formato: Literal["json", "ndjson"] = "json",
+    historico: Literal["recente", "completo"] = "recente",
+    paginacao: Paginacao = Depends(),
+    current_user: User  = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session_leitura)
+):
+    statement, coluna_id = select(CashTransaction).where(CashTransaction.republic_id == current_user.republic_id), CashTransaction.id
+    if historico == "completo":
+        # Movimentações quentes e arquivadas (mesmas colunas e ids) numa UNION ALL paginada pelo id
+        extrato = union_all(
+            select(*CashTransaction.__table__.columns).where(CashTransaction.republic_id == current_user.republic_id),
+            select(*CashTransactionArchive.__table__.columns).where(CashTransactionArchive.republic_id == current_user.republic_id),
+        ).subquery("extrato")
+        statement, coluna_id = select(*extrato.c), extrato.c.id
+    if formato == "ndjson":
+        return resposta_ndjson(paginacao.aplicar(statement, coluna_id, com_limite=False), CashTransactionResponse,
+                               engine=session.bind, escalares=historico != "completo")
+
+    transacoes = (await session.exec(paginacao.aplicar(statement, coluna_id))).all()
+    return paginacao.finalizar(transacoes, response)
+
+@router.get("/dashboard", response_model=DashboardResponse, dependencies=[Depends(etag_republica)])
+async def obter_dashboard(
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session_leitura)
+):
+    # Uma única leitura por chave primária nos saldos consolidados (ledger),
+    # em vez de cinco SUM sobre as tabelas brutas. O aluguel vem do banco, não do
+    # usuário em cache, para o ETag nunca ficar associado a um valor desatualizado.
+    aluguel_fixo, ledger_usuario, ledger_republica = (await session.exec(
+        select(User.fixed_rent, UserBalance, RepublicBalance)
+        .select_from(User)
+        .outerjoin(UserBalance, UserBalance.user_id == User.id)
+        .outerjoin(RepublicBalance, RepublicBalance.republic_id == User.republic_id)
+        .where(User.id == current_user.id)
+    )).one()
+
+    debitos_ativos = ledger_usuario.open_debts if ledger_usuario else Decimal(0)
     # Créditos são apenas compras que AINDA NÃO entraram em nenhuma fatura
-    meus_creditos_novos = session.exec(
-        select(func.sum(ResidentPurchase.amount))
-        .where(ResidentPurchase.user_id == current_user.id, ResidentPurchase.is_settled == False)
-    ).one() or 0.0
-
-    # 3. Saldo do Caixa da República
-    entradas = session.exec(select(func.sum(CashTransaction.amount)).where(CashTransaction.republic_id == rep_id, CashTransaction.type == "in")).one() or 0.0
-    saidas = session.exec(select(func.sum(CashTransaction.amount)).where(CashTransaction.republic_id == rep_id, CashTransaction.type == "out")).one() or 0.0
-    
-    # 4. [NOVO] Total de Despesas da Casa (Para mostrar o custo total da república)
-    # Somamos todas as Expenses do mês/geral da república
-    total_despesas = session.exec(
-        select(func.sum(Expense.amount))
-        .where(Expense.republic_id == rep_id)
-    ).one() or 0.0
+    meus_creditos_novos = ledger_usuario.open_credits if ledger_usuario else Decimal(0)
+
+    # Saldo do Caixa e Total de Despesas da Casa
+    entradas = ledger_republica.cashbox_in if ledger_republica else Decimal(0)
+    saidas = ledger_republica.cashbox_out if ledger_republica else Decimal(0)
+    total_despesas = ledger_republica.total_expenses if ledger_republica else Decimal(0)
 
     # --- Cálculos Finais ---
-    aluguel_fixo = current_user.fixed_rent or 0.0
+    aluguel_fixo = aluguel_fixo or Decimal(0)
     valor_total_pagar = aluguel_fixo + debitos_ativos - meus_creditos_novos
     
     # 5. [NOVO] Saldo do Usuário (Quanto ele tem de crédito ou débito "puro", sem contar aluguel fixo)
@@ -186,7 +372,7 @@ def obter_dashboard(
     saldo_usuario = meus_creditos_novos - debitos_ativos
 
     return {
-        "fixed_rent_base": current_user.fixed_rent,
+        "fixed_rent_base": aluguel_fixo,
         "variable_debts": debitos_ativos,
         "my_credits": meus_creditos_novos,
         "total_to_pay": round(valor_total_pagar, 2),
@@ -195,141 +381,166 @@ def obter_dashboard(
         "user_balance": saldo_usuario
     }
 
-@router.post("/pagar-divida")
-def registrar_pagamento(
+@router.post("/pagar-divida", response_model=PagamentoResponse)
+async def registrar_pagamento(
     payment_in: PaymentCreate,
+    idempotencia: Optional[Pedido] = Depends(pedido_idempotente),
     current_user: User = Depends(check_admin_finance),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session_republica)
 ):
-    valor_disponivel = payment_in.amount
-    dividas_para_pagar = []
-
-    # --- CAMINHO A: Pagar um item específico ---
-    if payment_in.user_expense_id:
-        divida = session.get(UserExpense, payment_in.user_expense_id)
-        if not divida:
-            raise HTTPException(status_code=404, detail="Dívida não encontrada.")
-        if divida.is_paid:
-            raise HTTPException(status_code=400, detail="Esta conta já está quitada.")
-        dividas_para_pagar = [divida]
-
-    # --- CAMINHO B: Pagamento Inteligente (Distribuição) ---
-    elif payment_in.user_id:
-        # Busca todas as fatias abertas do usuário (da mais antiga para a mais nova)
-        statement = (
-            select(UserExpense)
-            .where(UserExpense.user_id == payment_in.user_id, UserExpense.is_paid == False)
-            .order_by(UserExpense.id)
-        )
-        dividas_para_pagar = session.exec(statement).all()
-        
-        if not dividas_para_pagar:
-            raise HTTPException(status_code=400, detail="Este usuário não possui dívidas pendentes.")
-
-    else:
-        raise HTTPException(status_code=400, detail="Informe o ID da dívida ou o ID do usuário.")
-
-    # --- LÓGICA DE PROCESSAMENTO (Comum para ambos os caminhos) ---
-    for conta in dividas_para_pagar:
-        if valor_disponivel <= 0:
-            break
-
-        falta_nesta = conta.value - conta.paid_amount
-        pagar_agora = min(valor_disponivel, falta_nesta)
-
-        # 1. Atualiza a dívida
-        conta.paid_amount += pagar_agora
-        if conta.paid_amount >= (conta.value - 0.01):
-            conta.is_paid = True
-        
-        # 2. Cria o registro no histórico (Recibo)
-        novo_recibo = PaymentHistory(
-            user_expense_id=conta.id,
-            amount=pagar_agora,
-            confirmed_by_id=current_user.id
-        )
-        
-        session.add(conta)
-        session.add(novo_recibo)
-        
-        valor_disponivel -= pagar_agora
-
-    session.commit()
+    # Guardados antes: depois de um rollback os atributos do current_user ficam expirados
+    admin_id = current_user.id
+    rep_id = current_user.republic_id
 
-    return {
-        "detail": "Pagamento processado com sucesso.",
-        "sobra_em_caixa": round(valor_disponivel, 2)
-    }
+    # Reenvio do mesmo pedido (ex.: app reenviou após timeout): devolve a resposta original
+    salva = await resposta_salva(session, admin_id, idempotencia)
+    if salva is not None:
+        return salva
+
+    for _ in range(TENTATIVAS_PAGAMENTO):
+        try:
+            sobra = await alocar_pagamento(
+                session,
+                payment_in.amount,
+                confirmado_por_id=admin_id,
+                republic_id=rep_id,
+                user_expense_id=payment_in.user_expense_id,
+                user_id=payment_in.user_id,
+            )
+            resposta = {
+                "detail": "Pagamento processado com sucesso.",
+                "sobra_em_caixa": float(sobra)
+            }
+            salvar_resposta(session, admin_id, idempotencia, resposta)
+            await incrementar_versao(session, [rep_id])
+            publicar_apos_commit(
+                session, rep_id, "pagamento_registrado",
+                user_id=payment_in.user_id, user_expense_id=payment_in.user_expense_id,
+                amount=payment_in.amount, sobra_em_caixa=float(sobra),
+            )
+            await session.commit()
+            return resposta
+        except ConflitoDePagamento:
+            # Outro admin pagou alguma dessas fatias ao mesmo tempo: refaz com os valores novos
+            await session.rollback()
+        except IntegrityError:
+            # A mesma Idempotency-Key foi processada em paralelo e gravada primeiro
+            await session.rollback()
+            salva = await resposta_salva(session, admin_id, idempotencia)
+            if salva is None:
+                raise
+            return salva
+
+    raise HTTPException(status_code=409, detail="O pagamento conflitou com outra operação. Tente novamente.")
+
+# summary_only=true: os itens vêm sem pending_expenses
+@router.get("/devedores", response_model=List[DevedorResponse], response_model_exclude_none=True)
+async def listar_devedores_resumo(
+    limit: int = Query(default=100, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    summary_only: bool = False,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session_leitura)
+):
+    # Resumo por morador em uma consulta agrupada + uma consulta com as fatias pendentes
+    # (summary_only=true pula a lista de fatias)
+    return await gerar_relatorio_devedores(
+        session,
+        current_user.republic_id,
+        limit=limit,
+        offset=offset,
+        summary_only=summary_only,
+    )
 
-@router.get("/devedores")
-def listar_devedores_resumo(
+# acerto de contas: posição de cada morador e o mínimo de transferências para zerar a casa
+@router.get("/acerto", response_model=AcertoResponse, dependencies=[Depends(etag_republica)])
+async def calcular_acerto(
+    aluguel: bool = True,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session_leitura)
 ):
-    # Busca todos os moradores da república
-    moradores = session.exec(select(User).where(User.republic_id == current_user.republic_id)).all()
-    
-    resumo = []
-    for m in moradores:
-        # Busca fatias pendentes deste morador
-        fatias = session.exec(
-            select(UserExpense)
-            .where(UserExpense.user_id == m.id, UserExpense.is_paid == False)
-        ).all()
-        
-        if not fatias:
-            continue
-            
-        total_devido = sum(f.value - f.paid_amount for f in fatias)
-        
-        resumo.append({
-            "id": m.id,
-            "name": m.name,
-            "total_owed": total_devido,
-            "pending_count": len(fatias),
-            "pending_expenses": [
-                {
-                    "id": f.id,
-                    "description": f.expense.description, # Assumindo relação com Expense
-                    "value": f.value,
-                    "paid_amount": f.paid_amount
-                } for f in fatias
-            ]
-        })
-        
-    return resumo
-
-@router.post("/templates")
-def criar_template(
+    if current_user.republic_id is None:
+        raise HTTPException(status_code=400, detail="Usuário não pertence a nenhuma república.")
+    # A versão é lida antes das posições: se algo mudar no meio, o POST com ela dá 409
+    versao = await versao_atual(session, current_user.republic_id)
+    posicoes = await calcular_posicoes(session, current_user.republic_id, aluguel)
+    return montar_resposta(versao, aluguel, posicoes)
+
+# registra o acerto calculado: quita as fatias e acerta as compras em lote
+@router.post("/acerto", response_model=AcertoAplicadoResponse)
+async def aplicar_acerto_de_contas(
+    acerto_in: AcertoAplicar,
+    idempotencia: Optional[Pedido] = Depends(pedido_idempotente),
+    current_user: User = Depends(check_admin_finance),
+    session: AsyncSession = Depends(get_session_republica)
+):
+    if acerto_in.aluguel:
+        # Nada do aluguel fixo é gravado: quitá-lo no acerto faria o próximo cálculo cobrá-lo de novo
+        raise HTTPException(status_code=400, detail="O acerto aplicado não inclui o aluguel fixo. Envie aluguel=false.")
+    admin_id = current_user.id
+    rep_id = current_user.republic_id
+    salva = await resposta_salva(session, admin_id, idempotencia)
+    if salva is not None:
+        return salva
+
+    try:
+        acerto = await aplicar_acerto(session, rep_id, acerto_in.versao, admin_id)
+    except AcertoDesatualizado:
+        # Pode ser o próprio acerto, reenviado enquanto o primeiro era gravado
+        await session.rollback()
+        salva = await resposta_salva(session, admin_id, idempotencia)
+        if salva is None:
+            raise HTTPException(status_code=409, detail="Os valores mudaram desde o cálculo do acerto. Calcule de novo.")
+        return salva
+    resposta = jsonable_encoder({
+        "detail": (
+            f"Acerto registrado: {acerto['fatias_quitadas']} fatias quitadas (recibos pelo valor bruto de cada fatia) "
+            f"e {acerto['compras_acertadas']} compras acertadas (abatidas das fatias nas transferências, que são o valor líquido)."
+        ),
+        **acerto,
+    })
+    salvar_resposta(session, admin_id, idempotencia, resposta)
+    publicar_apos_commit(
+        session, rep_id, "acerto_aplicado",
+        fatias=acerto["fatias_quitadas"], compras=acerto["compras_acertadas"], transferencias=len(acerto["transferencias"]),
+    )
+    await session.commit()
+    return resposta
+
+@router.post("/templates", response_model=DetalheResponse)
+async def criar_template(
     template_in: ExpenseTemplateCreate,
     current_user: User = Depends(check_admin_finance),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session_republica)
 ):
     novo_template = ExpenseTemplate(
         **template_in.model_dump(),
         republic_id=current_user.republic_id
     )
     session.add(novo_template)
-    session.commit()
+    await incrementar_versao(session, [current_user.republic_id])
+    await session.commit()
     return {"detail": "Template configurado com sucesso."}
 
-@router.get("/templates", response_model=List[ExpenseTemplate])
-def listar_templates(
+@router.get("/templates", response_model=List[ExpenseTemplateResponse], dependencies=[Depends(etag_republica)])
+async def listar_templates(
+    response: Response,
+    paginacao: Paginacao = Depends(),
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session_leitura)
 ):
-    return session.exec(
-        select(ExpenseTemplate).where(ExpenseTemplate.republic_id == current_user.republic_id)
-    ).all()
+    statement = select(ExpenseTemplate).where(ExpenseTemplate.republic_id == current_user.republic_id)
+    templates = (await session.exec(paginacao.aplicar(statement, ExpenseTemplate.id))).all()
+    return paginacao.finalizar(templates, response)
 
-@router.put("/templates/{template_id}")
-def atualizar_template(
+@router.put("/templates/{template_id}", response_model=ExpenseTemplateResponse)
+async def atualizar_template(
     template_id: int,
     template_in: ExpenseTemplateUpdate,
     current_user: User = Depends(check_admin_finance),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session_republica)
 ):
-    template = session.get(ExpenseTemplate, template_id)
+    template = await session.get(ExpenseTemplate, template_id)
     if not template or template.republic_id != current_user.republic_id:
         raise HTTPException(status_code=404, detail="Template não encontrado.")
     
@@ -339,48 +550,56 @@ def atualizar_template(
         setattr(template, key, value)
 
     session.add(template)
-    session.commit()
-    session.refresh(template)
-
-@router.post("/gerar-mensalidade")
-def gerar_contas_do_mes(
+    await incrementar_versao(session, [current_user.republic_id])
+    await session.commit()
+    await session.refresh(template)
+    return template
+
+@router.post("/gerar-mensalidade", response_model=MensalidadeResponse)
+async def gerar_contas_do_mes(
+    response: Response,
     current_user: User = Depends(check_admin_finance),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session_republica)
 ):
     rep_id = current_user.republic_id
-    templates = session.exec(select(ExpenseTemplate).where(ExpenseTemplate.republic_id == rep_id)).all()
-    moradores = session.exec(select(User).where(User.republic_id == rep_id)).all()
-    
     hoje = date.today()
-    mes_referencia = hoje.strftime('%m/%Y')
-    
-    if not templates:
+
+    if settings.jobs_habilitados:
+        # Só enfileira: quem gera é o worker de jobs, então a latência não depende do tamanho da casa
+        tem_template = (await session.exec(select(ExpenseTemplate.id).where(ExpenseTemplate.republic_id == rep_id).limit(1))).first()
+        if tem_template is None:
+            raise HTTPException(status_code=400, detail="Nenhum template configurado.")
+
+        job = await jobs.solicitar_mensalidade(session, rep_id, hoje)
+        await session.commit()
+        jobs.acordar()
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {
+            "detail": f"Geração das contas de {hoje.strftime('%m/%Y')} agendada.",
+            "job": job,
+        }
+
+    # Sem worker: tudo em uma transação; repetir o clique no mesmo mês não duplica as contas
+    criadas = await gerar_mensalidades(session, hoje, [rep_id])
+    if rep_id not in criadas:
         raise HTTPException(status_code=400, detail="Nenhum template configurado.")
 
-    hoje = date.today()
-    despesas_criadas = 0
-
-    for t in templates:
-        # 1. Cria a Despesa Real baseada no Template
-        nova_despesa = Expense(
-            description=f"{t.description} - {hoje.strftime('%m/%Y')}",
-            amount=t.base_value,
-            due_date=date(hoje.year, hoje.month, 10), # Fixa para dia 10 (exemplo)
-            category=t.category,
-            split_type="equal",
-            republic_id=rep_id
-        )
-        session.add(nova_despesa)
-        session.commit()
-        session.refresh(nova_despesa)
-
-        # 2. Divide entre os moradores
-        valor_fatia = t.base_value / len(moradores)
-        for m in moradores:
-            fatia = UserExpense(user_id=m.id, expense_id=nova_despesa.id, value=valor_fatia, paid_amount=0.0, is_paid=False)
-            session.add(fatia)
-        
-        despesas_criadas += 1
-
-    session.commit()
+    await session.commit()
+
+    despesas_criadas = criadas[rep_id]
+    if despesas_criadas == 0:
+        return {"detail": f"As contas de {hoje.strftime('%m/%Y')} já haviam sido geradas."}
     return {"detail": f"{despesas_criadas} despesas geradas e divididas para o mês atual."}
+
+# andamento da geração das contas do mês (AAAA-MM; padrão: mês atual)
+@router.get("/gerar-mensalidade", response_model=MensalidadeJobResponse)
+async def status_contas_do_mes(
+    mes: Optional[str] = Query(default=None, pattern=r"^\d{4}-\d{2}$"),
+    current_user: User = Depends(check_admin_finance),
+    session: AsyncSession = Depends(get_session_republica)
+):
+    referencia = date.fromisoformat(f"{mes}-01") if mes else date.today()
+    job = await jobs.obter_job(session, current_user.republic_id, referencia)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Nenhuma geração registrada para este mês.")
+    return job
@@ -0,0 +1,64 @@
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.etag import etag_republica
+from app.core.security import get_current_user
+from app.core.replicas import get_session_leitura
+from app.models import User
+from app.schemas.finance import RelatorioResponse
+from app.services import resumos
+
+router = APIRouter(prefix="/relatorios", tags=["Relatórios"])
+
+MES = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+def _meses_atras(hoje: date, meses: int) -> str:
+    total = hoje.year * 12 + hoje.month - 1 - meses
+    return f"{total // 12:04d}-{total % 12 + 1:02d}"
+
+
+# rota de relatório financeiro por mês e/ou categoria (lê os resumos mensais, não o histórico)
+@router.get("/", response_model=RelatorioResponse, dependencies=[Depends(etag_republica)])
+async def obter_relatorio(
+    response: Response,
+    de: Optional[str] = Query(default=None, pattern=MES, description="Mês inicial AAAA-MM (padrão: 11 meses atrás)"),
+    ate: Optional[str] = Query(default=None, pattern=MES, description="Mês final AAAA-MM, inclusive (padrão: o mês atual)"),
+    por: Literal["mes", "categoria", "mes_categoria"] = "mes",
+    formato: Literal["json", "csv"] = "json",
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session_leitura)
+):
+    if current_user.republic_id is None:
+        raise HTTPException(status_code=400, detail="Usuário não pertence a nenhuma república.")
+
+    hoje = date.today()
+    ate = ate or _meses_atras(hoje, 0)
+    de = de or _meses_atras(hoje, 11)
+    if de > ate:
+        raise HTTPException(status_code=400, detail="O mês inicial deve ser anterior ao final.")
+
+    linhas = await resumos.relatorio(session, current_user.republic_id, de, ate, por)
+
+    if formato == "csv":
+        saida = io.StringIO()
+        colunas = [*(c.key for c in resumos.AGRUPAMENTOS[por]), *resumos.CAMPOS]
+        escritor = csv.DictWriter(saida, fieldnames=colunas)
+        escritor.writeheader()
+        for linha in linhas:
+            escritor.writerow({campo: f"{valor:.2f}" if isinstance(valor, Decimal) else valor for campo, valor in linha.items()})
+        # A resposta é nova: leva junto o ETag/Cache-Control que etag_republica deixou em `response`
+        cabecalhos = {nome: response.headers[nome] for nome in ("ETag", "Cache-Control") if nome in response.headers}
+        return Response(
+            content=saida.getvalue(),
+            media_type="text/csv; charset=utf-8",
+            headers={**cabecalhos, "Content-Disposition": f'attachment; filename="relatorio-{de}-a-{ate}.csv"'},
+        )
+
+    return {"de": de, "ate": ate, "por": por, "linhas": linhas, "totais": resumos.totais(linhas)}
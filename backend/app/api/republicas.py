@@ -1,32 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import selectinload
 from app.database import get_session
 from app.models.user import User              # Para o banco de dados
 from app.models.republic import Republic      # Para o banco de dados
-from app.schemas.republic import RepublicCreate, RepublicPublic, RepublicDetail, RoleUpdate # Para validação
-from app.core.security import get_current_user
+from app.schemas.republic import RepublicCreate, RepublicPublic, RepublicDetail, RoleUpdate, MensagemResponse, RepublicaCriadaResponse # Para validação
+from app.core.security import get_current_user, invalidar_usuario
+from app.core.paginacao import Paginacao
+from app.core.etag import etag_republica
+from app.core.eventos import publicar_apos_commit
+from app.core.limites import limitar_escritas
+from app.core.replicas import marcar_escrita
+from app.core.shards import confirmar, escolher_shard, invalidar_republica, sessao_do_shard, shard_da_republica
+from app.services.versoes import incrementar_versao
+from app.services.sync import registrar_remocao
+from app.services.shards import apagar_republica, espelhar_moradores
 from app.utils import gerar_codigo_convite
 from typing import List
 
 # Criamos o router com um prefixo. Assim, todas as rotas aqui começam com /republicas
-router = APIRouter(prefix="/republicas", tags=["Republicas"])
+router = APIRouter(prefix="/republicas", tags=["Republicas"], dependencies=[Depends(limitar_escritas), Depends(marcar_escrita)])
 
-@router.post("/")
-def criar_republica(republica_input: RepublicCreate, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+@router.post("/", response_model=RepublicaCriadaResponse)
+async def criar_republica(republica_input: RepublicCreate, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
     codigo = gerar_codigo_convite(republica_input.name)  # Gera um código de convite simples
+    shard = await escolher_shard(session)  # O shard com menos repúblicas (app/core/shards.py)
     republica = Republic(
         name=republica_input.name,
         address=republica_input.address,
-        invite_code=codigo
+        invite_code=codigo,
+        shard=shard
     )
     session.add(republica)  
-    session.commit()
-    session.refresh(republica)
+    await session.commit()
+    await session.refresh(republica)
 
     current_user.role_tag = "admin"
     current_user.republic_id = republica.id
     session.add(current_user)
-    session.commit()
+    async with sessao_do_shard(session, shard) as sessao_rep:
+        await espelhar_moradores(session, sessao_rep, shard, republica.id, [current_user.id])
+        await incrementar_versao(sessao_rep, [republica.id])
+        await confirmar(session, sessao_rep)
+    invalidar_usuario(current_user.id)
 
     return {
         "mensagem": "República criada com sucesso!",
@@ -34,39 +51,51 @@ def criar_republica(republica_input: RepublicCreate, current_user: User = Depend
         "fundador": current_user.name
     }
 
-@router.delete("/sair")
-def sair_republica(current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+@router.delete("/sair", response_model=MensagemResponse)
+async def sair_republica(current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
     if current_user.republic_id is None:
         raise HTTPException(status_code=400, detail="Usuário não pertence a nenhuma república.")
 
     old_republic_id = current_user.republic_id
+    shard = await shard_da_republica(session, old_republic_id)
     current_user.role_tag = "morador"
 
     current_user.republic_id = None
     session.add(current_user)
-    session.commit()
-    session.refresh(current_user)
+    async with sessao_do_shard(session, shard) as sessao_rep:
+        await espelhar_moradores(session, sessao_rep, shard, old_republic_id, [current_user.id])
+        registrar_remocao(sessao_rep, old_republic_id, "moradores", current_user.id)
+        await incrementar_versao(sessao_rep, [old_republic_id])
+        publicar_apos_commit(sessao_rep, old_republic_id, "morador_saiu", user_id=current_user.id)
+        await confirmar(session, sessao_rep)
+    await session.refresh(current_user)
+    invalidar_usuario(current_user.id)
     
-    moradores = session.exec(select(User).where(User.republic_id == old_republic_id)).all()
+    moradores = (await session.exec(select(User).where(User.republic_id == old_republic_id))).all()
     
     mensagem_extra = ""
 
     if not moradores:
-        republica = session.get(Republic, old_republic_id)
-        session.delete(republica)
-        session.commit()
+        async with sessao_do_shard(session, shard) as sessao_rep:
+            # Despesas, fatias, compras, caixa, arquivo etc. saem antes da república (chaves estrangeiras)
+            await apagar_republica(sessao_rep, old_republic_id, shard)
+            await sessao_rep.commit()
+        republica = await session.get(Republic, old_republic_id)
+        await session.delete(republica)
+        await session.commit()
+        invalidar_republica(old_republic_id)
         mensagem_extra = " Como você era o último, a república foi encerrada."
     
     return {"mensagem": f"Você saiu da república com sucesso.{mensagem_extra}"}
 
 @router.get("/", response_model=List[RepublicPublic])
-def listar_republicas(session: Session = Depends(get_session)):
-    republicas = session.exec(select(Republic)).all()
-    return republicas
+async def listar_republicas(response: Response, paginacao: Paginacao = Depends(), session: AsyncSession = Depends(get_session)):
+    republicas = (await session.exec(paginacao.aplicar(select(Republic), Republic.id))).all()
+    return paginacao.finalizar(republicas, response)
 
-@router.post("/entrar/")
-def entrar_republica(invite_code: str, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
-    republica = session.exec(select(Republic).where(Republic.invite_code == invite_code)).first()
+@router.post("/entrar/", response_model=MensagemResponse)
+async def entrar_republica(invite_code: str, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    republica = (await session.exec(select(Republic).where(Republic.invite_code == invite_code))).first()
     if not republica:
         raise HTTPException(status_code=404, detail="Código de convite inválido.")
     if current_user.republic_id == republica.id:
@@ -74,56 +103,70 @@ def entrar_republica(invite_code: str, current_user: User = Depends(get_current_
     if current_user.republic_id is not None:
         raise HTTPException(status_code=400, detail="Usuário já pertence a outra república.")
     
+    shard = await shard_da_republica(session, republica.id)
     current_user.role_tag = "morador"
     current_user.republic_id = republica.id
     session.add(current_user)
-    session.commit()
-    session.refresh(current_user)
+    async with sessao_do_shard(session, shard) as sessao_rep:
+        await espelhar_moradores(session, sessao_rep, shard, republica.id, [current_user.id])
+        await incrementar_versao(sessao_rep, [republica.id])
+        publicar_apos_commit(sessao_rep, republica.id, "morador_entrou", user_id=current_user.id, name=current_user.name)
+        await confirmar(session, sessao_rep)
+    await session.refresh(current_user)
+    invalidar_usuario(current_user.id)
 
     return {"mensagem": f"Usuário {current_user.name} entrou na república {republica.name} com sucesso!"}
 
-@router.post("/sair")
-def sair_republica(current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+@router.post("/sair", response_model=MensagemResponse)
+async def sair_republica(current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
     if current_user.republic_id is None:
         raise HTTPException(status_code=400, detail="Usuário não pertence a nenhuma república.")
     
+    old_republic_id = current_user.republic_id
+    shard = await shard_da_republica(session, old_republic_id)
     current_user.republic_id = None
     session.add(current_user)
-    session.commit()
-    session.refresh(current_user)
+    async with sessao_do_shard(session, shard) as sessao_rep:
+        await espelhar_moradores(session, sessao_rep, shard, old_republic_id, [current_user.id])
+        registrar_remocao(sessao_rep, old_republic_id, "moradores", current_user.id)
+        await incrementar_versao(sessao_rep, [old_republic_id])
+        publicar_apos_commit(sessao_rep, old_republic_id, "morador_saiu", user_id=current_user.id)
+        await confirmar(session, sessao_rep)
+    await session.refresh(current_user)
+    invalidar_usuario(current_user.id)
 
     return {"mensagem": f"Usuário {current_user.name} saiu da república com sucesso!"}
 
-@router.get("/moradores", response_model=RepublicDetail)
-def listar_moradores(current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+@router.get("/moradores", response_model=RepublicDetail, dependencies=[Depends(etag_republica)])
+async def listar_moradores(current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
     if current_user.republic_id is None:
         raise HTTPException(status_code=400, detail="Usuário não pertence a nenhuma república.")
     
-    republica = session.get(Republic, current_user.republic_id)
+    republica = await session.get(Republic, current_user.republic_id, options=[selectinload(Republic.users)])
     if not republica:
         raise HTTPException(status_code=404, detail="República não encontrada.")
     
     return republica
 
 @router.get("/{republica_id}", response_model=RepublicDetail)
-def obter_republica(republica_id: int, session: Session = Depends(get_session)):
-    republica = session.get(Republic, republica_id)
+async def obter_republica(republica_id: int, session: AsyncSession = Depends(get_session)):
+    republica = await session.get(Republic, republica_id, options=[selectinload(Republic.users)])
     if not republica:
         raise HTTPException(status_code=404, detail="República não encontrada.")
     return republica
 
-@router.put("/promover-admin")
-def alterar_cargo(
+@router.put("/promover-admin", response_model=MensagemResponse)
+async def alterar_cargo(
     role_data: RoleUpdate,
     current_user: User = Depends(get_current_user), # Vamos checar manualmente se é admin
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     # 1. Segurança: Apenas quem TEM a tag 'admin' pode promover outros
     if current_user.role_tag != 'admin':
         raise HTTPException(status_code=403, detail="Apenas o Admin Geral pode alterar cargos.")
 
     # 2. Busca o usuário alvo
-    target_user = session.get(User, role_data.user_id)
+    target_user = await session.get(User, role_data.user_id)
     if not target_user or target_user.republic_id != current_user.republic_id:
         raise HTTPException(status_code=404, detail="Usuário não encontrado.")
 
@@ -133,6 +176,12 @@ def alterar_cargo(
 
     target_user.role_tag = role_data.new_role
     session.add(target_user)
-    session.commit()
+    shard = await shard_da_republica(session, current_user.republic_id)
+    async with sessao_do_shard(session, shard) as sessao_rep:
+        await espelhar_moradores(session, sessao_rep, shard, current_user.republic_id, [target_user.id])
+        await incrementar_versao(sessao_rep, [current_user.republic_id])
+        publicar_apos_commit(sessao_rep, current_user.republic_id, "cargo_alterado", user_id=target_user.id, role=role_data.new_role)
+        await confirmar(session, sessao_rep)
+    invalidar_usuario(target_user.id)
 
     return {"mensagem": f"Cargo de {target_user.name} alterado para {role_data.new_role}."}
@@ -0,0 +1,25 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.security import get_current_user
+from app.core.shards import get_session_republica
+from app.models import User
+from app.schemas.sync import SyncResponse
+from app.services.sync import mudancas
+
+router = APIRouter(prefix="/sync", tags=["Sincronização"])
+
+
+# rota de sincronização incremental: só o que mudou na república desde o último cursor
+@router.get("/", response_model=SyncResponse)
+async def sincronizar(
+    cursor: Optional[str] = Query(default=None, description="Cursor devolvido pelo /sync anterior (ausente = carga completa)"),
+    limit: int = Query(default=500, ge=1, le=2000),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session_republica)
+):
+    if current_user.republic_id is None:
+        raise HTTPException(status_code=400, detail="Usuário não pertence a nenhuma república.")
+    return await mudancas(session, current_user.republic_id, cursor, limit)
@@ -1,38 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.database import get_session
 from app.models.user import User
 from app.models.republic import Republic
 from app.schemas.user import UserCreate, UserPublic
-from app.core.security import get_current_user, hash_password
+from app.core.security import get_current_user
+from app.core.paginacao import Paginacao
+from app.core.senhas import gerar_hash
+from app.core.limites import limitar_cadastro
 from typing import List
 
 # Criamos o router com um prefixo. Assim, todas as rotas aqui começam com /republicas
 router = APIRouter(prefix="/usuarios", tags=["Usuarios"])
 
-@router.post("/", response_model=UserPublic)
-def criar_usuario(usuario_input: UserCreate, session: Session = Depends(get_session)):
+@router.post("/", response_model=UserPublic, dependencies=[Depends(limitar_cadastro)])
+async def criar_usuario(usuario_input: UserCreate, session: AsyncSession = Depends(get_session)):
     #validação da senha
     if len(usuario_input.password) > 72:
         raise HTTPException(status_code=400, detail="A senha não pode ultrapassar 72 caracteres.")
     
     # validação simples para evitar emails duplicados
-    existing_user = session.exec(select(User).where(User.email == usuario_input.email)).first()
+    existing_user = (await session.exec(select(User).where(User.email == usuario_input.email))).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email já cadastrado.")
 
     usuario = User(
         name=usuario_input.name,
         email=usuario_input.email,
-        hashed_password=hash_password(usuario_input.password)
+        hashed_password=await gerar_hash(usuario_input.password)
     )
     session.add(usuario)
-    session.commit()
-    session.refresh(usuario)
+    await session.commit()
+    await session.refresh(usuario)
     return usuario
 
 @router.get("/me", response_model=UserPublic)
-def obter_perfil_logado(current_user: User = Depends(get_current_user)):
+async def obter_perfil_logado(current_user: User = Depends(get_current_user)):
     """
     Retorna os dados do usuário que enviou o token. 
     Não precisa passar ID na URL, o sistema descobre pelo token.
@@ -40,13 +44,13 @@ def obter_perfil_logado(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.get("/", response_model=List[UserPublic])
-def listar_usuarios(session: Session = Depends(get_session)):
-    usuarios = session.exec(select(User)).all()
-    return usuarios
+async def listar_usuarios(response: Response, paginacao: Paginacao = Depends(), session: AsyncSession = Depends(get_session)):
+    usuarios = (await session.exec(paginacao.aplicar(select(User), User.id))).all()
+    return paginacao.finalizar(usuarios, response)
 
 @router.get("/{usuario_id}", response_model=UserPublic)
-def obter_usuario(usuario_id: int, session: Session = Depends(get_session)):
-    usuario = session.get(User, usuario_id)
+async def obter_usuario(usuario_id: int, session: AsyncSession = Depends(get_session)):
+    usuario = await session.get(User, usuario_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado.")
     return usuario
\ No newline at end of file
@@ -0,0 +1,54 @@
+import time
+from collections import OrderedDict
+
+
+class CacheTTL:
+    """
+    Cache em memória com limite de tamanho (LRU) e tempo de vida por item.
+    Vale só para o processo atual: com vários workers, cada um tem o seu,
+    e o TTL limita por quanto tempo um valor desatualizado pode sobreviver.
+    """
+
+    def __init__(self, ttl: float, max_itens: int):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def obter(self, chave):
+        item = self._itens.get(chave)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expira_em, valor = item
+        if expira_em < time.monotonic():
+            del self._itens[chave]
+            self.misses += 1
+            return None
+
+        self._itens.move_to_end(chave)
+        self.hits += 1
+        return valor
+
+    def guardar(self, chave, valor):
+        if self.ttl <= 0:
+            return
+        self._itens[chave] = (time.monotonic() + self.ttl, valor)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+    def invalidar(self, chave):
+        self._itens.pop(chave, None)
+
+    def limpar(self):
+        self._itens.clear()
+
+    def estatisticas(self):
+        return {
+            "itens": len(self._itens),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
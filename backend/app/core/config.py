@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
+from typing import Optional
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 ENV_PATH = BASE_DIR / ".env"
@@ -9,7 +10,83 @@ class Settings(BaseSettings):
     algorithm: str
     access_token_expire_minutes: int
     database_url: str = "sqlite:///database.db"
+    # URL usada pelas rotas (driver assíncrono). Se vazia, é derivada da database_url:
+    # sqlite:// -> sqlite+aiosqlite://, postgresql:// -> postgresql+asyncpg://
+    async_database_url: Optional[str] = None
+    # Mostra o SQL no terminal (só para desenvolvimento)
+    database_echo: bool = False
+    # Pool de conexões (ignorado para SQLite em memória)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800 # segundos
+    # SQLite em arquivo (app/core/sqlite.py): pragmas de cada conexão, pool de leitura e uma escrita por vez
+    sqlite_wal: bool = True
+    sqlite_synchronous: str = "NORMAL" # no WAL, o fsync fica para os checkpoints
+    sqlite_mmap_size: int = 268435456 # bytes lidos via mmap (256 MiB)
+    sqlite_cache_size: int = -65536 # páginas por conexão; negativo = KiB (64 MiB)
+    sqlite_busy_timeout: int = 5000 # ms esperando a vez de escrever (neste e em outros processos)
+    sqlite_foreign_keys: bool = True
+    sqlite_escritor_unico: bool = True # escritas do processo em fila, uma transação por vez
+    sqlite_leitores: int = 4 # conexões do pool de leitura (0 = leituras no pool principal)
+    # Shards: bancos extras para os dados das repúblicas, URLs separadas por vírgula. O shard 0
+    # é a database_url, que também guarda o diretório global (usuários, repúblicas, convites)
+    shards: str = ""
+    shards_cache_ttl: float = 5.0 # segundos que cada processo guarda o shard de uma república
+    # Réplicas de leitura, URLs separadas por vírgula: "url" é réplica do shard 0 e "N=url", do
+    # shard N. As leituras pesadas (dashboard, devedores, extrato...) vão para elas
+    replicas: str = ""
+    replicas_ler_primario: float = 5.0 # segundos que quem escreveu continua lendo do primário
+    replicas_checagem: float = 10.0 # segundos entre as checagens de saúde das réplicas
+    replicas_timeout: float = 2.0 # segundos para a réplica responder à checagem
+    replicas_marcador_backend: str = "memoria" # "memoria" (por worker) ou "redis" (compartilhado, usa redis_url)
+    # Cache de identidade do usuário autenticado (0 desliga)
+    auth_cache_ttl: int = 60 # segundos
+    auth_cache_max_itens: int = 10000
+    # Senhas: custo do bcrypt (mudar faz os hashes serem refeitos no próximo login)
+    bcrypt_rounds: int = 12
+    # Processos dedicados ao bcrypt (0 = usa o threadpool) e limite da fila de espera
+    hash_workers: int = 2
+    hash_fila_max: int = 32
+    hash_fila_timeout: float = 2.0 # segundos esperando vaga antes de responder 503
+    # Métricas: queries acima deste tempo entram em /status/consultas-lentas
+    slow_query_ms: float = 100.0
+    # Cabeçalho Server-Timing (tempo total e tempo de banco) em todas as respostas
+    server_timing: bool = True
+    # /metrics e /status/* sem autenticação; False = só administradores (com o token)
+    status_publico: bool = False
+    # Cache HTTP das leituras com ETag: 0 = o app sempre revalida (If-None-Match -> 304)
+    http_cache_max_age: int = 0 # segundos
+    # Eventos em tempo real (/eventos): "memoria" (um worker) ou "redis" (vários)
+    eventos_backend: str = "memoria"
+    redis_url: Optional[str] = None
+    eventos_fila_max: int = 100 # eventos pendentes por cliente antes de desconectá-lo
+    eventos_heartbeat: float = 15.0 # segundos
+    eventos_revalidar: float = 60.0 # segundos entre as conferências de que o assinante ainda é morador
+    # Worker de jobs (geração automática das contas do mês); False = a rota gera na hora
+    jobs_habilitados: bool = True
+    mensalidade_dia: int = 1 # a partir deste dia do mês as contas são geradas automaticamente
+    jobs_intervalo: float = 30.0 # segundos entre verificações da fila (e base do backoff)
+    jobs_lote: int = 50 # repúblicas por transação
+    jobs_concorrencia: int = 2 # lotes processados em paralelo
+    jobs_max_tentativas: int = 5
+    jobs_lease: int = 600 # segundos até um job "executando" ser considerado abandonado
+    # Arquivamento (python manage.py arquivo executar): fatias quitadas e caixa de meses fechados
+    arquivo_meses_quentes: int = 12 # meses antes do atual que continuam nas tabelas quentes
+    arquivo_lote: int = 1000 # linhas por transação
+    # Envios em lote (/financas/.../lote e PUT /financas/alugueis-fixos): itens por requisição
+    lote_max_itens: int = 500
+    # Limite de requisições (token bucket, "capacidade/periodo em segundos"; vazio ou "0" desliga)
+    limites_habilitados: bool = True
+    limites_backend: str = "memoria" # "memoria" (por worker) ou "redis" (compartilhado, usa redis_url)
+    limites_max_chaves: int = 100000 # baldes guardados no backend "memoria"
+    limites_confiar_proxy: bool = False # usa o X-Forwarded-For (só atrás de um proxy reverso)
+    limite_login_ip: str = "20/60"
+    limite_login_conta: str = "10/300"
+    limite_cadastro_ip: str = "10/600"
+    limite_escrita_ip: str = "600/60"
+    limite_escrita_conta: str = "120/60"
     # Carrega automaticamente do arquivo .env
     model_config = SettingsConfigDict(env_file=ENV_PATH)
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -0,0 +1,56 @@
+"""
+ETags das leituras que o app consulta o tempo todo (dashboard, despesas, moradores, templates).
+
+O ETag é derivado da versão de dados da república (Republic.data_version, incrementada
+a cada escrita financeira ou de moradores), do usuário e da URL com os parâmetros.
+Se o cliente mandar If-None-Match com o mesmo valor, a rota responde 304 depois de
+uma única leitura por chave primária, sem rodar as queries nem serializar a resposta.
+"""
+import hashlib
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.security import get_current_user
+from app.core.replicas import get_session_leitura
+from app.models import User
+from app.services.versoes import versao_atual
+
+
+def cabecalho_cache_control() -> str:
+    # private: depende do usuário autenticado, não pode ficar em cache compartilhado
+    if settings.http_cache_max_age > 0:
+        return f"private, max-age={settings.http_cache_max_age}"
+    return "private, no-cache"
+
+
+def _etags_do_cliente(valor: str):
+    # If-None-Match usa comparação fraca: W/"x" casa com "x"
+    return {parte.strip().removeprefix("W/") for parte in valor.split(",")}
+
+
+async def etag_republica(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session_leitura),
+):
+    """Dependência: responde 304 se o cliente já tem esta versão; senão, só preenche os cabeçalhos."""
+    # Mesma sessão da rota (réplica ou primário): a versão do ETag é a dos dados lidos
+    if current_user.republic_id is None:
+        return
+
+    versao = await versao_atual(session, current_user.republic_id)
+    if versao is None:
+        return
+
+    chave = f"{request.url.path}?{request.url.query}|{current_user.id}|{current_user.republic_id}"
+    etag = f'"{versao}-{hashlib.blake2b(chave.encode(), digest_size=8).hexdigest()}"'
+    cabecalhos = {"ETag": etag, "Cache-Control": cabecalho_cache_control()}
+
+    pedido = request.headers.get("if-none-match")
+    if pedido and (pedido.strip() == "*" or etag in _etags_do_cliente(pedido)):
+        raise HTTPException(status_code=304, headers=cabecalhos)
+
+    response.headers.update(cabecalhos)
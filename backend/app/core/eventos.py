@@ -0,0 +1,160 @@
+"""
+Barramento de eventos por república.
+
+As rotas de escrita registram eventos com publicar_apos_commit(); eles só saem quando a
+transação é confirmada (um rollback os descarta) e chegam aos moradores conectados em
+/eventos (SSE) ou /eventos/ws (WebSocket), que recebem o que mudou em vez de refazer
+as leituras a cada poucos segundos.
+
+O backend é plugável (settings.eventos_backend):
+- "memoria": broker dentro do processo. Suficiente com um único worker.
+- "redis": pub/sub do Redis, para vários workers/máquinas (requer o pacote redis).
+"""
+import asyncio
+import json
+import time
+from decimal import Decimal
+from typing import AsyncIterator, Dict, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+PENDENTES = "eventos_pendentes"
+
+
+def _json_padrao(valor):
+    # Valores em reais (Decimal) saem como número; datas e o resto, como texto
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return str(valor)
+
+
+def serializar(evento: dict) -> str:
+    return json.dumps(evento, default=_json_padrao)
+
+
+class AssinanteLento(Exception):
+    """A fila do assinante encheu: ele deve reconectar e refazer as leituras."""
+
+
+class _Assinatura:
+    __slots__ = ("fila", "atrasada")
+
+    def __init__(self, fila_max: int):
+        self.fila = asyncio.Queue(maxsize=fila_max)
+        self.atrasada = False
+
+
+class BrokerMemoria:
+    """
+    Uma fila limitada por cliente conectado. assinar() devolve os eventos da república
+    e None a cada `heartbeat` segundos sem evento, para a rota manter a conexão viva.
+    """
+
+    def __init__(self, fila_max: int):
+        self.fila_max = fila_max
+        self._assinaturas: Dict[int, Set[_Assinatura]] = {}
+
+    def publicar(self, republic_id: int, evento: dict):
+        for assinatura in list(self._assinaturas.get(republic_id, ())):
+            try:
+                assinatura.fila.put_nowait(evento)
+            except asyncio.QueueFull:
+                # Não segura o publicador por causa de um cliente lento: ele é desconectado
+                assinatura.atrasada = True
+
+    async def assinar(self, republic_id: int, heartbeat: float) -> AsyncIterator[Optional[dict]]:
+        assinatura = _Assinatura(self.fila_max)
+        self._assinaturas.setdefault(republic_id, set()).add(assinatura)
+        try:
+            while True:
+                if assinatura.atrasada:
+                    raise AssinanteLento()
+                try:
+                    yield await asyncio.wait_for(assinatura.fila.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            assinaturas = self._assinaturas.get(republic_id)
+            if assinaturas is not None:
+                assinaturas.discard(assinatura)
+                if not assinaturas:
+                    del self._assinaturas[republic_id]
+
+    def assinantes(self) -> int:
+        return sum(len(a) for a in self._assinaturas.values())
+
+
+class BrokerRedis:
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("EVENTOS_BACKEND=redis requer o pacote redis (pip install redis).")
+        self._redis = redis.from_url(url)
+        self._tarefas = set()
+        self._locais = 0
+
+    @staticmethod
+    def _canal(republic_id: int) -> str:
+        return f"repapp:eventos:{republic_id}"
+
+    def publicar(self, republic_id: int, evento: dict):
+        tarefa = asyncio.get_running_loop().create_task(
+            self._redis.publish(self._canal(republic_id), serializar(evento))
+        )
+        # Guarda a referência até terminar (o loop só mantém referência fraca)
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def assinar(self, republic_id: int, heartbeat: float) -> AsyncIterator[Optional[dict]]:
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self._canal(republic_id))
+        self._locais += 1
+        try:
+            while True:
+                mensagem = await pubsub.get_message(timeout=heartbeat)
+                yield json.loads(mensagem["data"]) if mensagem else None
+        finally:
+            self._locais -= 1
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+
+    def assinantes(self) -> int:
+        return self._locais
+
+
+_broker = None
+
+
+def broker():
+    global _broker
+    if _broker is None:
+        if settings.eventos_backend == "redis":
+            _broker = BrokerRedis(settings.redis_url)
+        else:
+            _broker = BrokerMemoria(settings.eventos_fila_max)
+    return _broker
+
+
+def publicar_apos_commit(session, republic_id: Optional[int], tipo: str, **dados):
+    """Enfileira um evento para a república; é publicado no commit da sessão."""
+    if republic_id is None:
+        return
+    evento = {"tipo": tipo, "republica_id": republic_id, "em": time.time(), "dados": dados}
+    session.info.setdefault(PENDENTES, []).append(evento)
+
+
+# Vale para AsyncSession também: os eventos de sessão disparam na Session síncrona interna
+
+@event.listens_for(Session, "after_commit")
+def _publicar_pendentes(session):
+    for evento in session.info.pop(PENDENTES, ()):
+        broker().publicar(evento["republica_id"], evento)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_pendentes(session, transacao_anterior):
+    session.info.pop(PENDENTES, None)
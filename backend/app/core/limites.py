@@ -0,0 +1,205 @@
+"""
+Limite de requisições (token bucket) por IP e por conta.
+
+/login e POST /usuarios/ rodam bcrypt a cada chamada: uma rajada de credential stuffing
+ou um app preso num loop de retentativas ocupa todos os processos de hash e derruba a
+latência do resto da API. Cada regra é um balde de `capacidade` fichas que se repõe
+continuamente (capacidade a cada `periodo` segundos); cada requisição gasta uma ficha e,
+com o balde vazio, a resposta é 429 com Retry-After, antes de qualquer trabalho pesado.
+
+As regras vêm do settings no formato "capacidade/periodo" (ex.: "10/60" = rajada de 10,
+repondo 10 por minuto); vazio ou "0" desliga a regra. São lidas na subida do app (REGRAS):
+uma regra fora do formato impede a subida. O armazenamento é plugável
+(settings.limites_backend), como em app/core/eventos.py:
+- "memoria": baldes dentro do processo (cada worker conta os seus).
+- "redis": baldes compartilhados entre workers/máquinas (requer o pacote redis).
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+from jose import JWTError, jwt
+
+from app.core.config import settings
+
+METODOS_ESCRITA = ("POST", "PUT", "PATCH", "DELETE")
+
+
+def interpretar_regra(regra: Optional[str]) -> Optional[Tuple[int, float]]:
+    """
+    "capacidade/periodo" -> (capacidade, fichas por segundo); None se a regra estiver
+    desligada. ValueError se a regra não estiver nesse formato.
+    """
+    if not regra or regra.strip() == "0":
+        return None
+    try:
+        capacidade, periodo = regra.split("/")
+        capacidade, periodo = int(capacidade), float(periodo)
+    except ValueError:
+        raise ValueError(f"regra {regra!r} inválida: use capacidade/periodo em segundos (ex.: 10/60)")
+    if capacidade <= 0 or periodo <= 0:
+        return None
+    return capacidade, capacidade / periodo
+
+
+def _carregar_regras() -> Dict[str, Optional[Tuple[int, float]]]:
+    # Na importação (subida do app): uma regra malformada impede a subida, em vez de virar 500 na requisição
+    regras = {}
+    for nome in ("login-ip", "login-conta", "cadastro-ip", "escrita-ip", "escrita-conta"):
+        campo = "limite_" + nome.replace("-", "_")
+        try:
+            regras[nome] = interpretar_regra(getattr(settings, campo))
+        except ValueError as erro:
+            raise ValueError(f"{campo.upper()}: {erro}") from None
+    return regras
+
+
+REGRAS = _carregar_regras()
+
+
+class BaldesMemoria:
+    """
+    Baldes no processo, com limite de chaves (LRU). Um balde descartado volta cheio, o que
+    só afrouxa o limite de quem ficou mais tempo sem aparecer.
+    """
+
+    def __init__(self, max_chaves: int):
+        self.max_chaves = max_chaves
+        self._baldes: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def consumir(self, chave: str, capacidade: int, taxa: float) -> float:
+        """Gasta uma ficha. Devolve 0 se passou, ou os segundos até haver uma ficha."""
+        agora = time.monotonic()
+        fichas, visto_em = self._baldes.pop(chave, (capacidade, agora))
+        fichas = min(capacidade, fichas + (agora - visto_em) * taxa)
+
+        espera = 0.0
+        if fichas >= 1:
+            fichas -= 1
+        else:
+            espera = (1 - fichas) / taxa
+
+        self._baldes[chave] = (fichas, agora)
+        if len(self._baldes) > self.max_chaves:
+            self._baldes.popitem(last=False)
+        return espera
+
+    def chaves(self) -> int:
+        return len(self._baldes)
+
+
+# Mesmo cálculo do BaldesMemoria, atômico no Redis; o relógio é o do servidor Redis
+_SCRIPT_REDIS = """
+local capacidade = tonumber(ARGV[1])
+local taxa = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local agora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local balde = redis.call('HMGET', KEYS[1], 'fichas', 'visto_em')
+local fichas = tonumber(balde[1]) or capacidade
+local visto_em = tonumber(balde[2]) or agora
+fichas = math.min(capacidade, fichas + (agora - visto_em) * taxa)
+local espera = 0
+if fichas >= 1 then
+    fichas = fichas - 1
+else
+    espera = (1 - fichas) / taxa
+end
+redis.call('HSET', KEYS[1], 'fichas', tostring(fichas), 'visto_em', tostring(agora))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacidade / taxa) + 1)
+return tostring(espera)
+"""
+
+
+class BaldesRedis:
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("LIMITES_BACKEND=redis requer o pacote redis (pip install redis).")
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(_SCRIPT_REDIS)
+
+    async def consumir(self, chave: str, capacidade: int, taxa: float) -> float:
+        espera = await self._script(keys=[f"repapp:limites:{chave}"], args=[capacidade, taxa])
+        return float(espera)
+
+    def chaves(self) -> int:
+        return 0 # ficam no Redis
+
+
+_baldes = None
+recusadas = 0 # requisições respondidas com 429 (exposto em /status/limites)
+
+
+def baldes():
+    global _baldes
+    if _baldes is None:
+        if settings.limites_backend == "redis":
+            _baldes = BaldesRedis(settings.redis_url)
+        else:
+            _baldes = BaldesMemoria(settings.limites_max_chaves)
+    return _baldes
+
+
+def ip_do_cliente(request: Request) -> str:
+    if settings.limites_confiar_proxy:
+        # Atrás de um proxy reverso: o último endereço do X-Forwarded-For é o que o proxy viu
+        encaminhado = request.headers.get("x-forwarded-for")
+        if encaminhado:
+            return encaminhado.split(",")[-1].strip()
+    return request.client.host if request.client else "desconhecido"
+
+
+async def verificar(nome: str, identificador) -> None:
+    """Gasta uma ficha do balde `nome:identificador` (regra REGRAS[nome]); sem ficha, levanta 429 com Retry-After."""
+    global recusadas
+    parametros = REGRAS[nome]
+    if not settings.limites_habilitados or parametros is None or identificador is None:
+        return
+    capacidade, taxa = parametros
+    espera = await baldes().consumir(f"{nome}:{identificador}", capacidade, taxa)
+    if espera > 0:
+        recusadas += 1
+        segundos = max(1, math.ceil(espera))
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Muitas requisições. Tente novamente em {segundos} segundo(s).",
+            headers={"Retry-After": str(segundos)},
+        )
+
+
+def conta_do_token(request: Request) -> Optional[int]:
+    # Só confere a assinatura (sem banco): quem manda token inválido recebe 401 da rota depois
+    autorizacao = request.headers.get("authorization", "")
+    if not autorizacao.lower().startswith("bearer "):
+        return None
+    try:
+        return jwt.decode(autorizacao[7:], settings.secret_key, algorithms=[settings.algorithm]).get("uid")
+    except JWTError:
+        return None
+
+
+# --- Dependências ---
+
+async def limitar_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    # Por IP (um atacante testando várias contas) e por conta vinda de cada IP (muitas senhas
+    # para a mesma conta). A conta sozinha não é chave: qualquer um travaria o login de
+    # outra pessoa só errando a senha dela; várias origens contra uma conta esbarram no limite por IP
+    ip = ip_do_cliente(request)
+    await verificar("login-ip", ip)
+    await verificar("login-conta", f"{form_data.username.strip().lower()}|{ip}")
+
+
+async def limitar_cadastro(request: Request):
+    await verificar("cadastro-ip", ip_do_cliente(request))
+
+
+async def limitar_escritas(request: Request):
+    """Para o router inteiro: só as escritas gastam ficha (as leituras têm ETag/cache)."""
+    if request.method not in METODOS_ESCRITA:
+        return
+    await verificar("escrita-ip", ip_do_cliente(request))
+    await verificar("escrita-conta", conta_do_token(request))
@@ -0,0 +1,198 @@
+"""
+Métricas de desempenho por requisição.
+
+Um middleware ASGI mede cada requisição e hooks do SQLAlchemy na engine somam, para a
+requisição em andamento, o tempo gasto no banco, o número de queries e as linhas lidas.
+Tudo é agregado por rota (o template, ex.: /financas/templates/{template_id}) e exposto:
+
+- em GET /metrics, no formato texto do Prometheus;
+- no cabeçalho Server-Timing de cada resposta (aparece no DevTools do navegador);
+- em GET /status/consultas-lentas, com as últimas queries acima de settings.slow_query_ms.
+
+Os contadores são do processo: com vários workers, cada um expõe os seus.
+"""
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+# Limites (em segundos / em queries) dos buckets dos histogramas
+BUCKETS_TEMPO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_QUERIES = (1, 2, 3, 5, 10, 20, 50, 100)
+SEM_ROTA = "<sem rota>"
+
+
+class MedicaoRequisicao:
+    __slots__ = ("inicio", "tempo_db", "queries", "linhas")
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.tempo_db = 0.0
+        self.queries = 0
+        self.linhas = 0
+
+
+_medicao_atual: ContextVar[Optional[MedicaoRequisicao]] = ContextVar("medicao_atual", default=None)
+
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * len(limites)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.soma += valor
+        self.total += 1
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.contagens[i] += 1
+
+
+class Registro:
+    """Agregados por (método, rota)."""
+
+    def __init__(self):
+        self.duracao = defaultdict(lambda: Histograma(BUCKETS_TEMPO))
+        self.tempo_db = defaultdict(lambda: Histograma(BUCKETS_TEMPO))
+        self.queries = defaultdict(lambda: Histograma(BUCKETS_QUERIES))
+        self.linhas = defaultdict(int)
+        self.respostas = defaultdict(int)  # (método, rota, status) -> total
+        self.consultas_lentas = deque(maxlen=50)
+
+    def registrar(self, metodo: str, rota: str, status: int, medicao: MedicaoRequisicao, duracao: float):
+        chave = (metodo, rota)
+        self.duracao[chave].observar(duracao)
+        self.tempo_db[chave].observar(medicao.tempo_db)
+        self.queries[chave].observar(medicao.queries)
+        self.linhas[chave] += medicao.linhas
+        self.respostas[(metodo, rota, status)] += 1
+
+    def limpar(self):
+        self.__init__()
+
+
+registro = Registro()
+
+
+# --- Hooks do SQLAlchemy ---
+
+# O início fica no contexto de execução da própria instrução (ou na conexão, nas raras sem
+# contexto): uma instrução que falha não passa por after_cursor_execute e não deixa nada
+# para trás que desencontre a medida das seguintes
+def _antes_da_query(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.inicio_query = time.perf_counter()
+    else:
+        conn.info["inicio_query"] = time.perf_counter()
+
+
+def _depois_da_query(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        inicio = context.inicio_query
+    else:
+        inicio = conn.info.pop("inicio_query")
+    duracao = time.perf_counter() - inicio
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return  # fora de uma requisição (CLI, migrações, startup)
+
+    medicao.tempo_db += duracao
+    medicao.queries += 1
+    # Os cursores dos drivers assíncronos (aiosqlite, asyncpg) já trazem o resultado
+    # inteiro em _rows; nos demais, vale o rowcount (linhas afetadas por UPDATE/DELETE)
+    linhas = getattr(cursor, "_rows", None)
+    medicao.linhas += len(linhas) if linhas is not None else max(cursor.rowcount, 0)
+
+    if duracao * 1000 >= settings.slow_query_ms:
+        registro.consultas_lentas.append({
+            "sql": " ".join(statement.split())[:500],
+            "ms": round(duracao * 1000, 2),
+            "executemany": executemany,
+            "em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+
+
+def instrumentar_engine(engine):
+    """Registra os hooks numa engine síncrona (para a assíncrona, passe async_engine.sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _antes_da_query)
+    event.listen(engine, "after_cursor_execute", _depois_da_query)
+
+
+# --- Middleware ---
+
+class MetricasMiddleware:
+    """Middleware ASGI puro: não envolve a resposta, só observa o início e o fim dela."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        medicao = MedicaoRequisicao()
+        token = _medicao_atual.set(medicao)
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                if settings.server_timing:
+                    total_ms = (time.perf_counter() - medicao.inicio) * 1000
+                    valor = (
+                        f'app;dur={total_ms:.1f}, '
+                        f'db;dur={medicao.tempo_db * 1000:.1f};desc="{medicao.queries} queries, {medicao.linhas} linhas"'
+                    )
+                    mensagem.setdefault("headers", []).append((b"server-timing", valor.encode()))
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicao_atual.reset(token)
+            # O router grava a rota encontrada no próprio scope
+            rota = getattr(scope.get("route"), "path", SEM_ROTA)
+            registro.registrar(scope["method"], rota, status, medicao, time.perf_counter() - medicao.inicio)
+
+
+# --- Exposição ---
+
+def _rotulos(**rotulos):
+    return ",".join(f'{nome}="{valor}"' for nome, valor in rotulos.items())
+
+
+def _histograma(linhas, nome, ajuda, dados):
+    linhas.append(f"# HELP {nome} {ajuda}")
+    linhas.append(f"# TYPE {nome} histogram")
+    for (metodo, rota), h in sorted(dados.items()):
+        for limite, contagem in zip(h.limites, h.contagens):
+            linhas.append(f'{nome}_bucket{{{_rotulos(method=metodo, route=rota, le=limite)}}} {contagem}')
+        linhas.append(f'{nome}_bucket{{{_rotulos(method=metodo, route=rota, le="+Inf")}}} {h.total}')
+        linhas.append(f'{nome}_sum{{{_rotulos(method=metodo, route=rota)}}} {h.soma}')
+        linhas.append(f'{nome}_count{{{_rotulos(method=metodo, route=rota)}}} {h.total}')
+
+
+def exportar_prometheus() -> str:
+    linhas = []
+    linhas.append("# HELP repapp_http_requests_total Requisições atendidas.")
+    linhas.append("# TYPE repapp_http_requests_total counter")
+    for (metodo, rota, status), total in sorted(registro.respostas.items()):
+        linhas.append(f'repapp_http_requests_total{{{_rotulos(method=metodo, route=rota, status=status)}}} {total}')
+
+    _histograma(linhas, "repapp_http_request_duration_seconds", "Tempo total da requisição.", registro.duracao)
+    _histograma(linhas, "repapp_http_request_db_seconds", "Tempo gasto no banco por requisição.", registro.tempo_db)
+    _histograma(linhas, "repapp_http_request_queries", "Queries SQL por requisição.", registro.queries)
+
+    linhas.append("# HELP repapp_db_rows_total Linhas lidas ou afetadas no banco.")
+    linhas.append("# TYPE repapp_db_rows_total counter")
+    for (metodo, rota), total in sorted(registro.linhas.items()):
+        linhas.append(f'repapp_db_rows_total{{{_rotulos(method=metodo, route=rota)}}} {total}')
+
+    return "\n".join(linhas) + "\n"
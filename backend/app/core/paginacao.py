@@ -0,0 +1,72 @@
+import base64
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import async_engine
+
+CABECALHO_PROXIMO = "X-Next-Cursor"
+
+
+def codificar_cursor(ultimo_id: int) -> str:
+    return base64.urlsafe_b64encode(str(ultimo_id).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> int:
+    try:
+        preenchido = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(preenchido.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido.")
+
+
+class Paginacao:
+    """
+    Paginação por cursor (keyset) sobre a coluna id, usada como dependência nas rotas de listagem.
+
+    Em vez de OFFSET (que lê e descarta todas as linhas anteriores), cada página
+    começa em WHERE id > último_id_da_página_anterior, usando o índice da chave primária.
+    O corpo da resposta continua sendo a lista; o cursor da próxima página vai no
+    cabeçalho X-Next-Cursor (ausente na última página).
+    """
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(default=None, description="Valor do cabeçalho X-Next-Cursor da página anterior"),
+        limit: int = Query(default=100, ge=1, le=500),
+    ):
+        self.apos_id = decodificar_cursor(cursor) if cursor else None
+        self.limit = limit
+
+    def aplicar(self, stmt, coluna_id, com_limite: bool = True):
+        if self.apos_id is not None:
+            stmt = stmt.where(coluna_id > self.apos_id)
+        stmt = stmt.order_by(coluna_id)
+        # Busca um item a mais só para saber se existe próxima página
+        return stmt.limit(self.limit + 1) if com_limite else stmt
+
+    def finalizar(self, itens, response: Response):
+        itens = list(itens)
+        if len(itens) > self.limit:
+            itens = itens[:self.limit]
+            response.headers[CABECALHO_PROXIMO] = codificar_cursor(itens[-1].id)
+        return itens
+
+
+def resposta_ndjson(stmt, schema, lote: int = 500, engine=None, escalares: bool = True):
+    """
+    Resposta em NDJSON (um objeto JSON por linha) lida de um cursor no servidor,
+    em lotes de `lote` linhas: a memória fica constante mesmo com anos de histórico.
+    Usa uma sessão própria no `engine` (o do shard da república; padrão: o principal),
+    que vive enquanto a resposta está sendo enviada. escalares=False para SELECTs de
+    colunas (ex.: uma UNION), em que cada linha já tem os atributos do schema.
+    """
+    async def linhas():
+        async with AsyncSession(engine or async_engine) as session:
+            resultado = await session.stream(stmt.execution_options(yield_per=lote))
+            async for obj in (resultado.scalars() if escalares else resultado):
+                yield schema.model_validate(obj, from_attributes=True).model_dump_json() + "\n"
+
+    return StreamingResponse(linhas(), media_type="application/x-ndjson")
@@ -0,0 +1,239 @@
+"""
+Réplicas de leitura.
+
+As leituras pesadas e frequentes (dashboard, devedores, extrato, despesas, templates,
+relatórios) usam get_session_leitura: uma sessão numa réplica do shard da república,
+escolhida em rodízio entre as saudáveis. O resto (escritas, /sync, moradores) continua
+no primário. Sem REPLICAS configurado, ou sem réplica saudável, a leitura vai para o
+primário como antes.
+
+- Saúde: um loop em segundo plano consulta cada réplica a cada
+  replicas_checagem segundos; a que falha (ou demora mais que replicas_timeout) sai do
+  rodízio até passar numa checagem. Um erro de conexão durante uma leitura também a tira.
+- Sem réplica disponível, a leitura vai para o primário; com SQLite em arquivo, pelo pool
+  só de leitura do shard (app/core/sqlite.py), que lê o mesmo arquivo.
+- Ler o que escreveu: a réplica pode estar alguns instantes atrás do primário. As rotas
+  de escrita marcam o usuário (marcar_escrita, dependência dos routers de finanças e
+  repúblicas) e, por replicas_ler_primario segundos, as leituras dele vão para o primário.
+  O marcador é plugável como os limites (settings.replicas_marcador_backend): "memoria"
+  vale só para o worker que atendeu a escrita; com vários workers, use "redis".
+"""
+import asyncio
+import logging
+from itertools import count
+from typing import Dict, List, Optional
+
+from fastapi import Depends, Request
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import CacheTTL
+from app.core.config import settings
+from app.core.limites import METODOS_ESCRITA, conta_do_token
+from app.core.security import get_current_user
+from app.core.shards import sessao_do_shard, shard_da_republica
+from app.database import URLS_REPLICAS, async_engines_leitura, async_engines_replicas, get_session
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class Replica:
+    def __init__(self, shard: int, url: str, engine):
+        self.shard = shard
+        self.url = url
+        self.engine = engine
+        self.saudavel = True
+        self.leituras = 0
+        self.falhas = 0
+        self.ultimo_erro: Optional[str] = None
+
+    def marcar_falha(self, erro: Exception):
+        if self.saudavel:
+            logger.warning("Réplica %s do shard %d fora do rodízio: %s", self.url, self.shard, erro)
+        self.saudavel = False
+        self.falhas += 1
+        self.ultimo_erro = f"{type(erro).__name__}: {erro}"[:300]
+
+    async def checar(self):
+        try:
+            async with self.engine.connect() as conn:
+                # Lê a versão das migrações: além de responder, a réplica precisa ter o schema
+                await asyncio.wait_for(conn.execute(text("SELECT version_num FROM alembic_version")), timeout=settings.replicas_timeout)
+        except Exception as erro:
+            self.marcar_falha(erro)
+            return
+        if not self.saudavel:
+            logger.info("Réplica %s do shard %d de volta ao rodízio", self.url, self.shard)
+        self.saudavel = True
+
+    def estado(self) -> dict:
+        # Sem usuário e senha da URL
+        return {
+            "shard": self.shard, "url": self.url.rsplit("@", 1)[-1], "saudavel": self.saudavel,
+            "leituras": self.leituras, "falhas": self.falhas, "ultimo_erro": self.ultimo_erro,
+        }
+
+
+REPLICAS: Dict[int, List[Replica]] = {
+    shard: [Replica(shard, url, engine) for url, engine in zip(URLS_REPLICAS[shard], engines)]
+    for shard, engines in async_engines_replicas.items()
+}
+_rodizio = {shard: count() for shard in REPLICAS}
+leituras_no_primario = 0 # leituras que poderiam ir para uma réplica e foram para o primário
+
+
+def escolher_replica(shard: int) -> Optional[Replica]:
+    """Próxima réplica saudável do shard, em rodízio; None se não houver."""
+    replicas = REPLICAS.get(shard)
+    if not replicas:
+        return None
+    inicio = next(_rodizio[shard])
+    for deslocamento in range(len(replicas)):
+        replica = replicas[(inicio + deslocamento) % len(replicas)]
+        if replica.saudavel:
+            return replica
+    return None
+
+
+# --- Marcador de escrita recente (ler o que escreveu) ---
+
+class MarcadorMemoria:
+    def __init__(self):
+        self._marcas = CacheTTL(ttl=settings.replicas_ler_primario, max_itens=100000)
+
+    async def marcar(self, user_id: int):
+        self._marcas.guardar(user_id, True)
+
+    async def escreveu_ha_pouco(self, user_id: int) -> bool:
+        return self._marcas.obter(user_id) is not None
+
+
+class MarcadorRedis:
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("REPLICAS_MARCADOR_BACKEND=redis requer o pacote redis (pip install redis).")
+        self._redis = redis.from_url(url)
+
+    async def marcar(self, user_id: int):
+        await self._redis.set(f"repapp:escrita:{user_id}", 1, px=int(settings.replicas_ler_primario * 1000))
+
+    async def escreveu_ha_pouco(self, user_id: int) -> bool:
+        return bool(await self._redis.exists(f"repapp:escrita:{user_id}"))
+
+
+_marcador = None
+
+
+def marcador():
+    global _marcador
+    if _marcador is None:
+        if settings.replicas_marcador_backend == "redis":
+            _marcador = MarcadorRedis(settings.redis_url)
+        else:
+            _marcador = MarcadorMemoria()
+    return _marcador
+
+
+# --- Dependências ---
+
+async def marcar_escrita(request: Request):
+    """
+    Para os routers com escritas: marca o autor antes (leituras em paralelo com a escrita
+    também vão para o primário) e de novo depois da rota, para o prazo contar do commit.
+    """
+    if not REPLICAS or request.method not in METODOS_ESCRITA:
+        yield
+        return
+    user_id = conta_do_token(request)
+    if user_id is not None:
+        await marcador().marcar(user_id)
+    yield
+    if user_id is not None:
+        await marcador().marcar(user_id)
+
+
+async def get_session_leitura(
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Dependência das leituras pesadas: réplica do shard da república, ou o primário (ver acima)."""
+    global leituras_no_primario
+    if current_user.republic_id is None:
+        yield session
+        return
+
+    shard = await shard_da_republica(session, current_user.republic_id)
+    replica = None
+    if REPLICAS.get(shard) and not await marcador().escreveu_ha_pouco(current_user.id):
+        replica = escolher_replica(shard)
+
+    if replica is None:
+        if REPLICAS.get(shard):
+            leituras_no_primario += 1
+        if shard in async_engines_leitura:
+            # SQLite: o mesmo arquivo do primário, por conexões que não disputam a vez de escrever
+            async with AsyncSession(async_engines_leitura[shard], expire_on_commit=False) as sessao:
+                yield sessao
+            return
+        async with sessao_do_shard(session, shard) as sessao:
+            yield sessao
+        return
+
+    replica.leituras += 1
+    async with AsyncSession(replica.engine, expire_on_commit=False) as sessao:
+        try:
+            yield sessao
+        except DBAPIError as erro:
+            # Réplica caiu no meio da leitura: sai do rodízio até a próxima checagem passar
+            if erro.connection_invalidated or isinstance(erro, OperationalError):
+                replica.marcar_falha(erro)
+            raise
+
+
+# --- Checagem de saúde em segundo plano ---
+
+_tarefa = None
+
+
+async def checar_todas():
+    await asyncio.gather(*(replica.checar() for replicas in REPLICAS.values() for replica in replicas))
+
+
+async def _loop():
+    while True:
+        try:
+            await checar_todas()
+        except Exception:
+            logger.exception("Erro na checagem das réplicas")
+        await asyncio.sleep(settings.replicas_checagem)
+
+
+def iniciar():
+    global _tarefa
+    if REPLICAS and _tarefa is None:
+        _tarefa = asyncio.get_running_loop().create_task(_loop())
+
+
+async def encerrar():
+    global _tarefa
+    if _tarefa is not None:
+        _tarefa.cancel()
+        try:
+            await _tarefa
+        except asyncio.CancelledError:
+            pass
+        _tarefa = None
+    for replicas in REPLICAS.values():
+        for replica in replicas:
+            await replica.engine.dispose()
+
+
+def estatisticas() -> dict:
+    return {
+        "replicas": [replica.estado() for replicas in REPLICAS.values() for replica in replicas],
+        "leituras_no_primario": leituras_no_primario,
+    }
@@ -1,13 +1,16 @@
 from datetime import datetime, timedelta
+from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlmodel import Session, select
-from passlib.context import CryptContext
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.database import get_session
 from app.models import User
 from app.core.config import settings
+from app.core.cache import CacheTTL
 
 SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
@@ -15,12 +18,15 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
 # Define onde o FastAPI deve procurar o token (na rota /login)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+# Mesma coisa, mas sem recusar a requisição quando não há token (rotas que podem ser abertas)
+oauth2_opcional = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
 
-# configura o de hashing de senhas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Cache de identidade: user_id -> colunas do User, para não ir ao banco a cada requisição autenticada.
+# Precisa ser invalidado (invalidar_usuario) sempre que cargo, república ou aluguel mudarem.
+identidades = CacheTTL(ttl=settings.auth_cache_ttl, max_itens=settings.auth_cache_max_itens)
 
-def hash_password(password: str):
-    return pwd_context.hash(password)
+def invalidar_usuario(user_id: int):
+    identidades.invalidar(user_id)
 
 # Função para criar o token JWT
 def create_access_token(data: dict):
@@ -32,7 +38,7 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 # Função para obter o usuário atual a partir do token
-async def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)):
     """
     Esta é a função que lê o token, valida a assinatura e retorna o objeto User do banco.
     """
@@ -45,15 +51,46 @@ async def get_current_user(token: str = Depends(oauth2_scheme), session: Session
         # Decodifica o token
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
+        user_id = payload.get("uid")
         if email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
-    # Busca o usuário no banco usando o e-mail que estava no token
-    user = session.exec(select(User).where(User.email == email)).first()
+
+    # Tokens antigos (sem "uid"): busca pelo e-mail, como antes
+    if user_id is None:
+        user = (await session.exec(select(User).where(User.email == email))).first()
+        if user is None:
+            raise credentials_exception
+        return user
+
+    dados = identidades.obter(user_id)
+    if dados is not None:
+        # Reconstrói o User a partir do cache e anexa na sessão sem nenhum SELECT;
+        # as rotas podem alterá-lo e dar commit normalmente (vira um UPDATE)
+        user = User(**dados)
+        make_transient_to_detached(user)
+        session.add(user)
+        return user
+
+    # Cache vazio/expirado: busca por chave primária
+    user = await session.get(User, user_id)
     if user is None:
         raise credentials_exception
+    identidades.guardar(user_id, user.model_dump())
     return user
 
-
+# Dependência de /metrics e /status/*: mostram SQL, latências e o estado interno dos pools
+async def acesso_status(token: Optional[str] = Depends(oauth2_opcional), session: AsyncSession = Depends(get_session)):
+    """Abertas com STATUS_PUBLICO=true (ex.: Prometheus numa rede interna); senão, só para administradores."""
+    if settings.status_publico:
+        return
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Não foi possível validar as credenciais",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user = await get_current_user(token, session)
+    if user.role_tag != "admin":
+        raise HTTPException(status_code=403, detail="Acesso negado: somente administradores podem acessar.")
@@ -0,0 +1,117 @@
+"""
+Hash e verificação de senhas (bcrypt) fora do event loop.
+
+O bcrypt leva centenas de milissegundos de CPU por chamada. Rodar isso numa thread
+ainda disputa o GIL com o resto da API, então as chamadas vão para um pool de
+processos dedicado e limitado. Quando a fila enche (pico de logins no começo do mês),
+a requisição espera no máximo hash_fila_timeout segundos e depois recebe 503 com
+Retry-After, em vez de empilhar trabalho e derrubar a latência de todas as rotas.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+
+@lru_cache
+def criar_contexto(rounds: int) -> CryptContext:
+    # min_rounds = max_rounds = rounds: qualquer hash com custo diferente do configurado
+    # é marcado como needs_update e refeito no próximo login
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+# Funções executadas dentro dos processos do pool (precisam ser de nível de módulo)
+
+def _aquecer(rounds: int) -> None:
+    criar_contexto(rounds)
+
+
+def _gerar_hash(senha: str, rounds: int) -> str:
+    return criar_contexto(rounds).hash(senha)
+
+
+def _verificar(senha: str, hash_salvo: str, rounds: int):
+    # verify_and_update devolve (senha_ok, novo_hash ou None)
+    return criar_contexto(rounds).verify_and_update(senha, hash_salvo)
+
+
+_pool = None
+_fila = None
+_fila_loop = None
+
+
+def _obter_pool():
+    global _pool
+    if _pool is None and settings.hash_workers > 0:
+        # spawn: não herda threads/conexões do processo do servidor
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.hash_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def _obter_fila():
+    # Um semáforo por event loop (o TestClient e os comandos criam loops próprios)
+    global _fila, _fila_loop
+    loop = asyncio.get_running_loop()
+    if _fila is None or _fila_loop is not loop:
+        _fila = asyncio.Semaphore(settings.hash_fila_max)
+        _fila_loop = loop
+    return _fila
+
+
+async def _executar(funcao, *args):
+    fila = _obter_fila()
+    try:
+        await asyncio.wait_for(fila.acquire(), timeout=settings.hash_fila_timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, tente novamente em instantes.",
+            headers={"Retry-After": "1"},
+        )
+
+    try:
+        pool = _obter_pool()
+        if pool is None:
+            # hash_workers = 0: usa o threadpool (desenvolvimento / ambientes sem multiprocessing)
+            return await run_in_threadpool(funcao, *args)
+        return await asyncio.get_running_loop().run_in_executor(pool, funcao, *args)
+    finally:
+        fila.release()
+
+
+async def gerar_hash(senha: str) -> str:
+    return await _executar(_gerar_hash, senha, settings.bcrypt_rounds)
+
+
+async def verificar_senha(senha: str, hash_salvo: str):
+    """Retorna (senha_ok, novo_hash). novo_hash vem preenchido quando o custo mudou."""
+    return await _executar(_verificar, senha, hash_salvo, settings.bcrypt_rounds)
+
+
+def iniciar():
+    # Sobe os processos já no startup, para o primeiro login não pagar o spawn
+    pool = _obter_pool()
+    if pool is not None:
+        list(pool.map(_aquecer, [settings.bcrypt_rounds] * settings.hash_workers))
+
+
+def encerrar():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
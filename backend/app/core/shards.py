@@ -0,0 +1,119 @@
+"""
+Roteamento das repúblicas entre shards.
+
+Os dados de cada república (despesas, fatias, compras, caixa, pagamentos, templates,
+ledger, resumos, jobs e sincronização) ficam num único shard: um dos bancos de
+settings.shards (arquivos SQLite locais, DSNs separados em produção). O shard 0 é a
+database_url e guarda também o diretório global: usuários (login, e-mail único),
+repúblicas (código de convite) e o shard de cada uma (Republic.shard). Assim a disputa
+por escrita e o tamanho das tabelas ficam por grupo de repúblicas, e os shards podem
+ficar em discos/máquinas diferentes.
+
+- As rotas com dados da república usam get_session_republica: a sessão no shard da
+  república do usuário. No shard 0 é a própria sessão do diretório (get_session), então
+  sem SHARDS configurado tudo continua numa única sessão e transação, como antes.
+- Os outros shards guardam cópias das linhas de Republic e User das suas repúblicas
+  (app/services/shards.py: espelhar_moradores), para os JOINs com moradores e as chaves
+  estrangeiras continuarem locais. O diretório é a fonte: mudanças de moradores são
+  gravadas nele primeiro e depois copiadas (confirmar()).
+- Cada processo guarda o shard de cada república por shards_cache_ttl segundos. Durante
+  uma troca de shard (python manage.py shards mover) a república fica com shard_moving e
+  as rotas dela respondem 503 com Retry-After.
+"""
+import math
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import CacheTTL
+from app.core.config import settings
+from app.core.security import get_current_user
+from app.database import async_engines_shards, get_session
+from app.models import Republic, User
+
+# republic_id -> (shard, shard_moving)
+_diretorio = CacheTTL(ttl=settings.shards_cache_ttl, max_itens=100000)
+
+
+def total_de_shards() -> int:
+    return len(async_engines_shards)
+
+
+def invalidar_republica(republic_id: int):
+    _diretorio.invalidar(republic_id)
+
+
+async def shard_da_republica(session: AsyncSession, republic_id: int) -> int:
+    """Shard da república segundo o diretório (com cache). 503 se ela estiver mudando de shard."""
+    if total_de_shards() == 1:
+        return 0
+
+    entrada = _diretorio.obter(republic_id)
+    if entrada is None:
+        linha = (await session.exec(
+            select(Republic.shard, Republic.shard_moving).where(Republic.id == republic_id)
+        )).first()
+        entrada = tuple(linha) if linha is not None else (0, False)
+        _diretorio.guardar(republic_id, entrada)
+
+    shard, mudando = entrada
+    if mudando:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="A república está sendo migrada de servidor. Tente novamente em instantes.",
+            headers={"Retry-After": str(math.ceil(settings.shards_cache_ttl) + 1)},
+        )
+    return shard
+
+
+async def escolher_shard(session: AsyncSession) -> int:
+    """Shard de uma república nova: o que tem menos repúblicas."""
+    total = total_de_shards()
+    if total == 1:
+        return 0
+    contagem = dict((await session.exec(
+        select(Republic.shard, func.count()).group_by(Republic.shard)
+    )).all())
+    return min(range(total), key=lambda indice: (contagem.get(indice, 0), indice))
+
+
+@asynccontextmanager
+async def sessao_do_shard(session: AsyncSession, shard: int):
+    """Sessão no shard; no shard 0, a própria sessão do diretório (mesma transação)."""
+    if shard == 0:
+        yield session
+        return
+    async with AsyncSession(async_engines_shards[shard], expire_on_commit=False) as sessao:
+        yield sessao
+
+
+@asynccontextmanager
+async def sessao_da_republica(session: AsyncSession, republic_id: int):
+    async with sessao_do_shard(session, await shard_da_republica(session, republic_id)) as sessao:
+        yield sessao
+
+
+async def get_session_republica(
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Dependência das rotas com dados da república: a sessão no shard dela."""
+    if current_user.republic_id is None:
+        yield session
+        return
+    async with sessao_da_republica(session, current_user.republic_id) as sessao:
+        yield sessao
+
+
+async def confirmar(session: AsyncSession, sessao_rep: AsyncSession):
+    """
+    Commit das rotas que mexem no diretório e no shard (entrar, sair, cargos, aluguéis):
+    primeiro o diretório, que é a fonte; se o shard falhar depois, a cópia é refeita com
+    `python manage.py shards espelhar`. No shard 0 é um commit só.
+    """
+    await session.commit()
+    if sessao_rep is not session:
+        await sessao_rep.commit()
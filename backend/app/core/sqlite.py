@@ -0,0 +1,139 @@
+"""
+Perfil de produção para bancos SQLite em arquivo (ignorado com PostgreSQL e em memória).
+
+O SQLite aceita vários leitores e um escritor por vez. Com as opções padrão (journal
+DELETE, fsync a cada commit e o busy handler do sqlite3 tentando de novo em intervalos),
+escritas concorrentes (pagamentos, despesas, o worker de jobs) ficam esperando umas às
+outras e, passando do timeout, falham com "database is locked". Aqui, por engine:
+
+- aplicar_pragmas(): em cada conexão nova, journal_mode=WAL (leitores não bloqueiam o
+  escritor e vice-versa), synchronous=NORMAL (no WAL, o fsync fica para os checkpoints:
+  vários commits seguidos custam um fsync, e um commit só se perde se a máquina cair, não
+  se o processo cair), mmap_size, cache_size, busy_timeout (espera por escritores de
+  outros processos) e foreign_keys (as chaves estrangeiras valem como no PostgreSQL);
+- serializar_escritas(): uma escrita por vez no processo. A primeira instrução de
+  escrita de uma transação espera a vez numa fila asyncio (sem ocupar thread nem ficar
+  tentando de novo no busy handler) e a vez passa para o próximo quando a conexão volta
+  ao pool, depois do commit ou do rollback. Quem espera mais que sqlite_busy_timeout
+  recebe OperationalError, como o próprio SQLite faria;
+- somente_leitura(): engine separada para as leituras pesadas (get_session_leitura),
+  com query_only, para elas nunca ocuparem as conexões de escrita.
+
+A fila é do processo: com SQLite, rode um worker da API (os outros processos, como
+`python manage.py jobs worker`, continuam protegidos pelo busy_timeout).
+"""
+import asyncio
+import re
+import time
+import weakref
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.util import await_
+
+from app.core.config import settings
+
+_ESCRITA = re.compile(r"\s*(INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+_VEZ = "sqlite_vez_de_escrever"
+
+
+def sqlite_em_arquivo(url: str) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:") and url.query.get("mode") != "memory"
+
+
+def aplicar_pragmas(engine):
+    """Pragmas de produção em cada conexão nova (engine síncrona; para a assíncrona, passe .sync_engine)."""
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout)}",
+        f"PRAGMA synchronous = {settings.sqlite_synchronous}",
+        f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}",
+        f"PRAGMA cache_size = {int(settings.sqlite_cache_size)}",
+        f"PRAGMA foreign_keys = {'ON' if settings.sqlite_foreign_keys else 'OFF'}",
+    ]
+    if settings.sqlite_wal:
+        pragmas.insert(0, "PRAGMA journal_mode = WAL")
+
+    @event.listens_for(engine, "connect")
+    def _ao_conectar(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def somente_leitura(engine):
+    """Conexões que recusam escritas (pool de leitura)."""
+    @event.listens_for(engine, "connect")
+    def _ao_conectar(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+
+class Escritor:
+    """A vez de escrever num arquivo SQLite, para as conexões de uma engine assíncrona."""
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        # Uma trava por event loop (o TestClient e o manage.py rodam cada um no seu)
+        self._travas = weakref.WeakKeyDictionary()
+        self.transacoes = 0
+        self.esperas = 0
+        self.tempo_esperando = 0.0
+        self.timeouts = 0
+
+    def _trava(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        trava = self._travas.get(loop)
+        if trava is None:
+            trava = self._travas[loop] = asyncio.Lock()
+        return trava
+
+    def antes_de_executar(self, conn, cursor, statement, parameters, context, executemany):
+        if _VEZ in conn.info or not _ESCRITA.match(statement):
+            return
+        trava = self._trava()
+        if trava.locked():
+            self.esperas += 1
+            inicio = time.perf_counter()
+            try:
+                # Roda dentro do greenlet da AsyncSession: suspende só esta requisição
+                await_(asyncio.wait_for(trava.acquire(), timeout=settings.sqlite_busy_timeout / 1000))
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise OperationalError(statement, parameters, TimeoutError("database is locked (fila de escrita)"))
+            finally:
+                self.tempo_esperando += time.perf_counter() - inicio
+        else:
+            await_(trava.acquire())
+        conn.info[_VEZ] = trava
+        self.transacoes += 1
+
+    def ao_devolver(self, dbapi_connection, connection_record):
+        trava = connection_record.info.pop(_VEZ, None)
+        if trava is not None:
+            trava.release()
+
+    def estado(self) -> dict:
+        return {
+            "banco": self.nome, "transacoes": self.transacoes, "esperas": self.esperas,
+            "tempo_esperando_s": round(self.tempo_esperando, 3), "timeouts": self.timeouts,
+        }
+
+
+ESCRITORES = []
+
+
+def serializar_escritas(async_engine) -> Escritor:
+    """Uma escrita por vez nas conexões da engine assíncrona (ver acima)."""
+    escritor = Escritor(async_engine.url.database)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", escritor.antes_de_executar)
+    event.listen(async_engine.sync_engine.pool, "checkin", escritor.ao_devolver)
+    ESCRITORES.append(escritor)
+    return escritor
+
+
+def estatisticas() -> list:
+    return [escritor.estado() for escritor in ESCRITORES]
@@ -1,11 +1,142 @@
-from sqlmodel import create_engine, SQLModel, Session
+from pathlib import Path
+from typing import Dict, List
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import settings
+from app.core.metricas import instrumentar_engine
+from app.core import sqlite as perfil_sqlite
+
+def url_assincrona(url: str) -> str:
+    """Troca o driver síncrono pelo equivalente assíncrono (aiosqlite / asyncpg)."""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+def opcoes_pool(url: str) -> dict:
+    # SQLite em memória usa um pool de conexão única, que não aceita esses parâmetros
+    if url.startswith("sqlite") and url.split("://", 1)[1] in ("", "/:memory:"):
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+
+def urls_dos_shards() -> List[str]:
+    """URLs de todos os shards; a primeira (shard 0) é a database_url, que guarda também o diretório."""
+    return [settings.database_url] + [url.strip() for url in settings.shards.split(",") if url.strip()]
+
+URLS_SHARDS = urls_dos_shards()
+
+# Engine síncrona: usada só por migrações, verificação de schema e comandos do manage.py
+engine = create_engine(settings.database_url, echo=settings.database_echo, **opcoes_pool(settings.database_url))
+
+# Engine assíncrona: usada pelas rotas, para um worker atender várias requisições ao mesmo tempo
+ASYNC_DATABASE_URL = settings.async_database_url or url_assincrona(settings.database_url)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=settings.database_echo, **opcoes_pool(ASYNC_DATABASE_URL))
+
+# Uma engine de cada tipo por shard (índice = número do shard); sem SHARDS, só o shard 0
+engines_shards = [engine] + [
+    create_engine(url, echo=settings.database_echo, **opcoes_pool(url)) for url in URLS_SHARDS[1:]
+]
+async_engines_shards = [async_engine] + [
+    create_async_engine(url_assincrona(url), echo=settings.database_echo, **opcoes_pool(url_assincrona(url)))
+    for url in URLS_SHARDS[1:]
+]
+
+def urls_das_replicas() -> Dict[int, List[str]]:
+    """{shard: [URLs das réplicas]} a partir de settings.replicas ("url" = shard 0, "N=url" = shard N)."""
+    replicas: Dict[int, List[str]] = {}
+    for item in settings.replicas.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        shard, separador, url = item.partition("=")
+        if separador and shard.strip().isdigit():
+            replicas.setdefault(int(shard), []).append(url.strip())
+        else:
+            replicas.setdefault(0, []).append(item)
+    return replicas
+
+URLS_REPLICAS = urls_das_replicas()
+
+# Engines assíncronas das réplicas de leitura, por shard (ver app/core/replicas.py)
+async_engines_replicas = {
+    shard: [
+        create_async_engine(url_assincrona(url), echo=settings.database_echo, **opcoes_pool(url_assincrona(url)))
+        for url in urls
+    ]
+    for shard, urls in URLS_REPLICAS.items()
+}
+
+# SQLite em arquivo (ver app/core/sqlite.py): pragmas em todas as conexões, uma escrita por
+# vez nas engines das rotas e um pool só de leitura por shard, usado por get_session_leitura
+async_engines_leitura = {}
+for _shard, _url in enumerate(URLS_SHARDS):
+    if not perfil_sqlite.sqlite_em_arquivo(_url):
+        continue
+    perfil_sqlite.aplicar_pragmas(engines_shards[_shard])
+    perfil_sqlite.aplicar_pragmas(async_engines_shards[_shard].sync_engine)
+    if settings.sqlite_escritor_unico:
+        perfil_sqlite.serializar_escritas(async_engines_shards[_shard])
+    if settings.sqlite_leitores > 0:
+        _url_leitura = url_assincrona(_url)
+        _leitura = create_async_engine(_url_leitura, echo=settings.database_echo, **{**opcoes_pool(_url_leitura), "pool_size": settings.sqlite_leitores})
+        perfil_sqlite.aplicar_pragmas(_leitura.sync_engine)
+        perfil_sqlite.somente_leitura(_leitura.sync_engine)
+        async_engines_leitura[_shard] = _leitura
+
+# Tempo de banco, queries e linhas de cada requisição (ver app/core/metricas.py)
+for _engine in [
+    *async_engines_shards, *async_engines_leitura.values(),
+    *(e for engines in async_engines_replicas.values() for e in engines),
+]:
+    instrumentar_engine(_engine.sync_engine)
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+def verificar_schema():
+    """
+    Confere se o banco está na última migração do Alembic.
+    O schema agora é criado/atualizado só por migrações (alembic upgrade head),
+    então a API se recusa a subir com o banco atrasado em vez de rodar com índices faltando.
+    """
+    script = ScriptDirectory.from_config(Config(str(ALEMBIC_INI)))
+    esperado = set(script.get_heads())
+
+    # Todos os shards têm o mesmo schema (o alembic upgrade head migra cada um)
+    for indice, engine_shard in enumerate(engines_shards):
+        with engine_shard.connect() as conn:
+            atual = set(MigrationContext.configure(conn).get_current_heads())
 
-engine = create_engine(settings.database_url, echo=True) # echo=True mostra o SQL no terminal
+        if atual != esperado:
+            raise RuntimeError(
+                f"Schema do banco desatualizado no shard {indice} (atual: {sorted(atual) or 'nenhuma'}, esperado: {sorted(esperado)}). "
+                "Rode 'alembic upgrade head' na pasta backend/."
+            )
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+def insert_do_dialeto(session, tabela):
+    """
+    insert() do dialeto do banco da sessão, que expõe on_conflict_do_nothing /
+    on_conflict_do_update (SQLite e PostgreSQL usam a mesma sintaxe ON CONFLICT).
+    """
+    if session.bind.dialect.name == "postgresql":
+        return postgresql.insert(tabela)
+    return sqlite.insert(tabela)
 
-def get_session():
-    with Session(engine) as session:
-        yield session
\ No newline at end of file
+async def get_session():
+    # expire_on_commit=False: em modo assíncrono não dá para recarregar atributos
+    # expirados de forma implícita depois do commit
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -1,17 +1,34 @@
+from collections import Counter
 from contextlib import asynccontextmanager
+from datetime import date
 from typing import List
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
+from fastapi.responses import PlainTextResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi.middleware.cors import CORSMiddleware
 
 # Importações internas do projeto
-from app.database import create_db_and_tables, get_session
-from app.api import republicas, usuarios, auth, financas
+from app.database import verificar_schema, async_engines_leitura, async_engines_shards
+from app.api import republicas, usuarios, auth, financas, eventos, sync, relatorios
+from app.core.config import settings
+from app.core.security import acesso_status, identidades
+from app.core import senhas, limites, replicas, sqlite
+from app.services import jobs
+from app.core.metricas import MetricasMiddleware, exportar_prometheus, registro
 
 # Gerenciador de Ciclo de Vida (Lifespan)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_db_and_tables()
+    verificar_schema()
+    senhas.iniciar()
+    jobs.iniciar()
+    replicas.iniciar()
     yield
+    await replicas.encerrar()
+    await jobs.encerrar()
+    senhas.encerrar()
+    for engine_shard in [*async_engines_shards, *async_engines_leitura.values()]:
+        await engine_shard.dispose()
 
 # Inicialização do App
 app = FastAPI(
@@ -27,15 +44,59 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", "Retry-After"], # cursor da próxima página nas listagens
 )
 
+# Adicionado por último para ficar por fora de todos: mede a requisição inteira
+app.add_middleware(MetricasMiddleware)
+
 app.include_router(republicas.router)
 app.include_router(usuarios.router)
 app.include_router(auth.router)
 app.include_router(financas.router)
+app.include_router(eventos.router)
+app.include_router(sync.router)
+app.include_router(relatorios.router)
 
 @app.get("/")
 def read_root():
     return {"status": "online", "message": "Bem-vindo à API do RepApp!"}
 
+@app.get("/status/cache", dependencies=[Depends(acesso_status)])
+def estatisticas_cache():
+    # Contadores do cache de identidade (autenticação)
+    return {"auth": identidades.estatisticas()}
+
+@app.get("/status/limites", dependencies=[Depends(acesso_status)])
+def estatisticas_limites():
+    # Requisições recusadas com 429 e baldes guardados neste processo
+    return {"backend": settings.limites_backend, "recusadas": limites.recusadas, "chaves": limites.baldes().chaves()}
+
+@app.get("/status/replicas", dependencies=[Depends(acesso_status)])
+def estatisticas_replicas():
+    # Réplicas de leitura: saúde, leituras atendidas e leituras desviadas para o primário
+    return replicas.estatisticas()
+
+@app.get("/status/sqlite", dependencies=[Depends(acesso_status)])
+def estatisticas_sqlite():
+    # Fila de escrita de cada banco SQLite: transações, quantas esperaram a vez e por quanto tempo
+    return sqlite.estatisticas()
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False, dependencies=[Depends(acesso_status)])
+def metricas():
+    # Formato texto do Prometheus
+    return PlainTextResponse(exportar_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/status/consultas-lentas", dependencies=[Depends(acesso_status)])
+def consultas_lentas():
+    # Últimas queries acima de SLOW_QUERY_MS (mais recente primeiro)
+    return list(reversed(registro.consultas_lentas))
 
+@app.get("/status/jobs", dependencies=[Depends(acesso_status)])
+async def estatisticas_jobs():
+    # Progresso da geração automática das contas do mês atual: {status: repúblicas}, somando os shards
+    total = Counter()
+    for engine_shard in async_engines_shards:
+        async with AsyncSession(engine_shard) as session:
+            total.update(await jobs.resumo(session, date.today()))
+    return {"mes": jobs.referencia(date.today()), "jobs": dict(total)}
@@ -1,3 +1,5 @@
 from .user import User
 from .republic import Republic
-from .finance import Expense, UserExpense, ResidentPurchase, CashTransaction
\ No newline at end of file
+from .finance import Expense, UserExpense, ResidentPurchase, CashTransaction, UserBalance, RepublicBalance
+from .job import Job
+from .sync import SyncTombstone
@@ -0,0 +1,85 @@
+"""
+Dinheiro guardado como centavos inteiros.
+
+No banco, toda coluna monetária é BIGINT em centavos: SUM e as somas do ledger são
+aritmética inteira, exata e mais barata que ponto flutuante. No Python, o valor é um
+Decimal em reais com duas casas (Decimal("12.34")), e no JSON continua sendo número.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Annotated, List
+
+from pydantic import AfterValidator, PlainSerializer
+from sqlalchemy import BigInteger, type_coerce
+from sqlalchemy.types import TypeDecorator
+
+CENTAVO = Decimal("0.01")
+
+
+def em_reais(valor) -> Decimal:
+    """Qualquer número (float, int, str, Decimal) como Decimal com duas casas."""
+    return Decimal(str(valor)).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def para_centavos(valor: Decimal) -> int:
+    """Reais em centavos inteiros, arredondando meio centavo para cima (como em_reais)."""
+    return int(em_reais(valor) * 100)
+
+
+def para_reais(centavos: int) -> Decimal:
+    return Decimal(centavos).scaleb(-2)
+
+
+def ratear_centavos(total: int, pesos: List[int]) -> List[int]:
+    """
+    Divide `total` centavos proporcionalmente aos pesos pelo método do maior resto:
+    cada parte recebe o piso da sua cota e os centavos que sobram vão, um a um, para
+    as maiores frações (empate: a primeira). As partes somam exatamente o total.
+    """
+    soma_pesos = sum(pesos)
+    if soma_pesos <= 0:
+        raise ValueError("A soma dos pesos deve ser positiva.")
+
+    partes = []
+    restos = []
+    for i, peso in enumerate(pesos):
+        parte, resto = divmod(total * peso, soma_pesos)
+        partes.append(parte)
+        restos.append((-resto, i))
+
+    for _, i in sorted(restos)[:total - sum(partes)]:
+        partes[i] += 1
+    return partes
+
+
+class Dinheiro(TypeDecorator):
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, valor, dialect):
+        if valor is None:
+            return None
+        return para_centavos(valor)
+
+    def process_result_value(self, valor, dialect):
+        if valor is None:
+            return None
+        return para_reais(int(valor))
+
+
+def soma_em_reais(expressao):
+    """
+    Tipa uma expressão SQL como Dinheiro. Necessário em contas entre colunas
+    (ex.: SUM(value - paid_amount)), que o SQLAlchemy tipa como o BIGINT de base
+    e devolveria em centavos.
+    """
+    return type_coerce(expressao, Dinheiro())
+
+
+# Tipo dos campos monetários nos models e schemas: arredonda a entrada para centavos
+# e serializa como número no JSON (o padrão do pydantic para Decimal é string)
+Reais = Annotated[Decimal, AfterValidator(em_reais), PlainSerializer(float, return_type=float, when_used="json")]
+
+# Campos monetários das respostas: o valor já sai do banco (Dinheiro) com duas casas, então
+# não passa de novo pelo em_reais; numa lista de milhares de linhas isso pesa
+# (ver benchmarks/serializacao.py)
+ReaisResposta = Annotated[Decimal, PlainSerializer(float, return_type=float, when_used="json")]
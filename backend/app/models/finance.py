@@ -1,6 +1,10 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index, text
 from typing import Optional, List, TYPE_CHECKING
-from datetime import date
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from .dinheiro import Dinheiro, Reais
 
 if TYPE_CHECKING:
     from .user import User
@@ -9,56 +13,191 @@ if TYPE_CHECKING:
 class ExpenseTemplate(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     description: str  # Ex: "Internet Vivo"
-    base_value: float # Valor que costuma vir
+    base_value: Reais = Field(sa_type=Dinheiro) # Valor que costuma vir
     category: str     # "fixo", "luz", "aluguel"
     
-    republic_id: int = Field(foreign_key="republic.id")
+    republic_id: int = Field(foreign_key="republic.id", index=True)
 
 class Expense(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_expense_republic_id_due_date", "republic_id", "due_date"),
+        # Uma única despesa por (república, template, mês): cliques repetidos em
+        # "gerar mensalidade" não duplicam contas. Despesas avulsas ficam com NULL.
+        Index("uq_expense_republic_template_mes", "republic_id", "template_id", "reference_month", unique=True),
+        Index("ix_expense_republic_id_sync_seq", "republic_id", "sync_seq"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     description: str
-    amount: float
+    amount: Reais = Field(sa_type=Dinheiro)
     due_date: date
     split_type: str  # "equal" ou "manual"
     category: str # "aluguel", "luz", "compras", etc.
 
     republic_id: int = Field(foreign_key="republic.id")
 
+    # Preenchidos só quando a despesa é gerada a partir de um template
+    template_id: Optional[int] = Field(default=None, foreign_key="expensetemplate.id")
+    reference_month: Optional[str] = None # "AAAA-MM"
+
+    # Sequência de sincronização (ver app/services/sync.py): versão da república em que a linha mudou
+    sync_seq: Optional[int] = None
+
     splits: List["UserExpense"] = Relationship(back_populates="expense")
+    # Fatias quitadas que já foram para o arquivo (só carregadas com historico=completo)
+    archived_splits: List["UserExpenseArchive"] = Relationship()
 
 class UserExpense(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_userexpense_user_id_is_paid", "user_id", "is_paid"),
+        # Só as fatias em aberto, já na ordem de quitação (mais antiga primeiro)
+        Index(
+            "ix_userexpense_aberto_user_id_id", "user_id", "id",
+            sqlite_where=text("is_paid = 0"),
+            postgresql_where=text("is_paid = false"),
+        ),
+        Index("ix_userexpense_republic_id_sync_seq", "republic_id", "sync_seq"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    value: float
+    value: Reais = Field(sa_type=Dinheiro)
     is_paid: bool = Field(default=False)
-    paid_amount: float = Field(default=0.0)
+    paid_amount: Reais = Field(default=Decimal(0), sa_type=Dinheiro)
     user_id: int = Field(foreign_key="user.id")
-    expense_id: int = Field(foreign_key="expense.id")
+    expense_id: int = Field(foreign_key="expense.id", index=True)
+    # Controle de concorrência otimista: todo UPDATE de pagamento exige a versão lida
+    version: int = Field(default=1)
+    # Cópia da república da despesa, para o /sync filtrar as fatias sem passar pelas despesas
+    republic_id: int = Field(foreign_key="republic.id")
+    sync_seq: Optional[int] = None
 
     expense: "Expense" = Relationship(back_populates="splits")
 
 class ResidentPurchase(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_residentpurchase_user_id_is_settled", "user_id", "is_settled"),
+        Index("ix_residentpurchase_republic_id_is_settled", "republic_id", "is_settled"),
+        Index("ix_residentpurchase_republic_id_sync_seq", "republic_id", "sync_seq"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     description: str
-    amount: float
+    amount: Reais = Field(sa_type=Dinheiro)
     purchase_date: date
     is_settled: bool = Field(default=False)
     user_id: int = Field(foreign_key="user.id")
     republic_id: int = Field(foreign_key="republic.id")
+    sync_seq: Optional[int] = None
 
 class CashTransaction(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_cashtransaction_republic_id_type", "republic_id", "type"),
+        Index("ix_cashtransaction_republic_id_sync_seq", "republic_id", "sync_seq"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     description: str
-    amount: float
+    amount: Reais = Field(sa_type=Dinheiro)
     transaction_date: date = Field(default_factory=date.today)
     type: str  # "in" para entrada, "out" para saída
 
     republic_id: int = Field(foreign_key="republic.id")
+    sync_seq: Optional[int] = None
 
 class PaymentHistory(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_paymenthistory_republic_id_sync_seq", "republic_id", "sync_seq"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     
-    user_expense_id: int = Field(foreign_key="userexpense.id")
-    amount: float
+    user_expense_id: int = Field(foreign_key="userexpense.id", index=True)
+    amount: Reais = Field(sa_type=Dinheiro)
     payment_date: date = Field(default_factory=date.today)
     
-    confirmed_by_id: int = Field(foreign_key="user.id")
\ No newline at end of file
+    confirmed_by_id: int = Field(foreign_key="user.id")
+    republic_id: int = Field(foreign_key="republic.id")
+    sync_seq: Optional[int] = None
+
+class IdempotencyKey(SQLModel, table=True):
+    # Resposta já enviada para uma chave Idempotency-Key: reenvios do app
+    # (rede móvel instável) recebem a mesma resposta em vez de pagar duas vezes.
+    # A chave vale por usuário e rota ("POST /financas/pagar-divida"); request_hash é o
+    # hash da query e do corpo, para recusar a mesma chave com outro pedido
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    endpoint: str = Field(primary_key=True, max_length=200)
+    key: str = Field(primary_key=True, max_length=100)
+    request_hash: Optional[str] = Field(default=None, max_length=64)
+    response_json: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+# --- Saldos consolidados (ledger) ---
+# Mantidos na mesma transação das escritas financeiras, para que o dashboard
+# seja uma leitura por chave primária em vez de vários SUM sobre as tabelas brutas.
+
+class UserBalance(SQLModel, table=True):
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    open_debts: Reais = Field(default=Decimal(0), sa_type=Dinheiro)   # soma de (value - paid_amount) das fatias em aberto
+    open_credits: Reais = Field(default=Decimal(0), sa_type=Dinheiro) # soma das compras de morador ainda não acertadas
+
+class RepublicBalance(SQLModel, table=True):
+    republic_id: int = Field(foreign_key="republic.id", primary_key=True)
+    cashbox_in: Reais = Field(default=Decimal(0), sa_type=Dinheiro)
+    cashbox_out: Reais = Field(default=Decimal(0), sa_type=Dinheiro)
+    total_expenses: Reais = Field(default=Decimal(0), sa_type=Dinheiro)
+
+class MonthlyRollup(SQLModel, table=True):
+    # Totais por república/mês/categoria para os relatórios (app/services/resumos.py).
+    # Compras de moradores e caixa não têm categoria: entram como "geral".
+    republic_id: int = Field(foreign_key="republic.id", primary_key=True)
+    month: str = Field(primary_key=True, max_length=7) # "AAAA-MM"
+    category: str = Field(primary_key=True)
+    expenses: Reais = Field(default=Decimal(0), sa_type=Dinheiro)  # despesas com vencimento no mês
+    payments: Reais = Field(default=Decimal(0), sa_type=Dinheiro)  # pagamentos de fatias feitos no mês
+    purchases: Reais = Field(default=Decimal(0), sa_type=Dinheiro) # compras de moradores
+    cashbox_in: Reais = Field(default=Decimal(0), sa_type=Dinheiro)
+    cashbox_out: Reais = Field(default=Decimal(0), sa_type=Dinheiro)
+
+# --- Arquivo (app/services/arquivo.py) ---
+# Linhas já fechadas que saíram das tabelas quentes: mesmas colunas e mesmos ids.
+
+class UserExpenseArchive(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True, sa_column_kwargs={"autoincrement": False})
+    value: Reais = Field(sa_type=Dinheiro)
+    is_paid: bool = Field(default=True)
+    paid_amount: Reais = Field(default=Decimal(0), sa_type=Dinheiro)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    expense_id: int = Field(foreign_key="expense.id", index=True)
+    version: int = Field(default=1)
+    republic_id: int = Field(foreign_key="republic.id")
+    sync_seq: Optional[int] = None
+
+class PaymentHistoryArchive(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True, sa_column_kwargs={"autoincrement": False})
+    user_expense_id: int = Field(foreign_key="userexpensearchive.id", index=True)
+    amount: Reais = Field(sa_type=Dinheiro)
+    payment_date: date
+    confirmed_by_id: int = Field(foreign_key="user.id")
+    republic_id: int = Field(foreign_key="republic.id")
+    sync_seq: Optional[int] = None
+
+class CashTransactionArchive(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_cashtransactionarchive_republic_id_id", "republic_id", "id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True, sa_column_kwargs={"autoincrement": False})
+    description: str
+    amount: Reais = Field(sa_type=Dinheiro)
+    transaction_date: date
+    type: str
+    republic_id: int = Field(foreign_key="republic.id")
+    sync_seq: Optional[int] = None
+
+class CashboxCarryForward(SQLModel, table=True):
+    # Saldo transportado: total das movimentações do caixa arquivadas, por república/mês.
+    # Entra nas somas do caixa (verificação do ledger, resumos) no lugar das linhas arquivadas.
+    republic_id: int = Field(foreign_key="republic.id", primary_key=True)
+    month: str = Field(primary_key=True, max_length=7) # "AAAA-MM"
+    cashbox_in: Reais = Field(default=Decimal(0), sa_type=Dinheiro)
+    cashbox_out: Reais = Field(default=Decimal(0), sa_type=Dinheiro)
@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+
+def agora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class Job(SQLModel, table=True):
+    """
+    Tarefa de fundo persistida (hoje: geração das contas do mês de uma república).
+    A chave única (kind, republic_id, reference_month) garante um único job por
+    república/mês, e o UPDATE que reivindica o job garante um único worker nele.
+    """
+    __table_args__ = (
+        Index("uq_job_kind_republic_id_reference_month", "kind", "republic_id", "reference_month", unique=True),
+        Index("ix_job_status_run_after", "status", "run_after"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str                      # "mensalidade"
+    republic_id: int = Field(foreign_key="republic.id")
+    reference_month: str           # "AAAA-MM"
+
+    status: str = Field(default="pendente") # pendente | executando | concluido | falhou
+    attempts: int = Field(default=0)
+    run_after: datetime = Field(default_factory=agora) # não roda antes disso (backoff das tentativas)
+    locked_by: Optional[str] = None
+    locked_at: Optional[datetime] = None
+
+    result: Optional[int] = None   # despesas criadas
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=agora)
+    finished_at: Optional[datetime] = None
@@ -10,6 +10,14 @@ class Republic(SQLModel, table=True):
     name: str
     address: str
     invite_code: str = Field(unique=True, index=True)
+    # Incrementada a cada escrita financeira ou de moradores da república; base dos ETags
+    data_version: int = Field(default=1)
+    # Shard com os dados financeiros da república (app/core/shards.py). Só vale no diretório
+    # (shard 0); nos outros shards a linha é uma cópia para as consultas e chaves estrangeiras
+    shard: int = Field(default=0)
+    shard_moving: bool = Field(default=False) # mudando de shard: as rotas respondem 503 até terminar
+    # Cursores do /sync com sequência menor que esta recomeçam do zero (os ids mudam na troca de shard)
+    sync_floor: int = Field(default=0)
     
     # Relação: Uma república tem muitos usuários (moradores)
     users: List["User"] = Relationship(back_populates="republic")
\ No newline at end of file
@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+from .job import agora
+
+
+class SyncTombstone(SQLModel, table=True):
+    """
+    Registro de remoção para o /sync: a linha some da república (ex.: um morador que
+    saiu), então não há mais o que devolver; o cliente recebe (entity, entity_id) e apaga
+    a cópia local. Carimbada com sync_seq como as demais linhas sincronizadas.
+    """
+    __table_args__ = (
+        Index("ix_synctombstone_republic_id_sync_seq", "republic_id", "sync_seq"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    republic_id: int = Field(foreign_key="republic.id")
+    entity: str      # "moradores", "despesas", ... (mesmos nomes das listas do /sync)
+    entity_id: int
+    sync_seq: Optional[int] = None
+    created_at: datetime = Field(default_factory=agora)
@@ -1,17 +1,27 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from typing import Optional, TYPE_CHECKING
+from decimal import Decimal
+
+from .dinheiro import Dinheiro, Reais
 
 if TYPE_CHECKING:
     from .republic import Republic
 
 class User(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_user_republic_id_sync_seq", "republic_id", "sync_seq"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     email: str = Field(unique=True, index=True)
     hashed_password: str
-    republic_id: Optional[int] = Field(default=None, foreign_key="republic.id")
+    republic_id: Optional[int] = Field(default=None, foreign_key="republic.id", index=True)
     
     republic: Optional["Republic"] = Relationship(back_populates="users")
 
-    fixed_rent: float = Field(default=0.0) # O valor base do quarto dele
-    role_tag: str = Field(default="morador")
\ No newline at end of file
+    fixed_rent: Reais = Field(default=Decimal(0), sa_type=Dinheiro) # O valor base do quarto dele
+    role_tag: str = Field(default="morador")
+    # Sequência de sincronização dos moradores (ver app/services/sync.py)
+    sync_seq: Optional[int] = None
@@ -0,0 +1,6 @@
+from pydantic import BaseModel, ConfigDict
+
+# Base das respostas montadas direto dos objetos do banco: model_validate(obj) lê os atributos,
+# sem passar por um dict intermediário (é também o que o FastAPI faz com o response_model)
+class RespostaORM(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
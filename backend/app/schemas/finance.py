@@ -1,34 +1,40 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import List, Optional
-from datetime import date
+from datetime import date, datetime
+
+from app.models.dinheiro import Reais, ReaisResposta
+from .base import RespostaORM
+
+class DetalheResponse(BaseModel):
+    detail: str
 
 # Schema para receber os dados
 class FixedRentUpdate(BaseModel):
     user_id: int
-    fixed_rent: float
+    fixed_rent: Reais
 
 class PaymentCreate(BaseModel):
     user_expense_id: Optional[int] = None
     user_id: Optional[int] = None
-    amount: float    
+    amount: Reais
 
 class UserSplitInput(BaseModel):
     user_id: int
-    value: float
+    value: Reais
 
 class ExpenseTemplateCreate(BaseModel):
     description: str
-    base_value: float
+    base_value: Reais
     category: str
 
 class ExpenseTemplateUpdate(BaseModel):
     description: Optional[str] = None
-    base_value: Optional[float] = None
+    base_value: Optional[Reais] = None
     category: Optional[str] = None
 
 class ExpenseCreateInput(BaseModel):
     description: str
-    total_value: float
+    total_value: Reais
     due_date: date
     category: str  # "aluguel", "luz", "compras"
     split_type: str = "equal" # "equal" ou "manual"
@@ -42,23 +48,130 @@ class ExpenseCreateInput(BaseModel):
             raise ValueError("O tipo de divisão deve ser 'equal' ou 'manual'")
         return v
     
-class ExpenseResponse(BaseModel):
+class UserExpenseResponse(RespostaORM):
+    id: int
+    user_id: int
+    value: ReaisResposta
+    paid_amount: ReaisResposta
+    is_paid: bool
+
+class ExpenseResponse(RespostaORM):
+    id: int
     description: str
-    amount: float
+    amount: ReaisResposta
     due_date: date
     category: str
     split_type: str
-    splits: List[UserSplitInput]
+    splits: List[UserExpenseResponse]
+
+class ExpenseHistoricoResponse(ExpenseResponse):
+    # historico=completo: as fatias quentes e as arquivadas na mesma lista, como antes do arquivamento
+    @model_validator(mode="before")
+    @classmethod
+    def juntar_fatias_arquivadas(cls, despesa):
+        if isinstance(despesa, dict):
+            return despesa
+        campos = {campo: getattr(despesa, campo) for campo in ExpenseResponse.model_fields}
+        campos["splits"] = sorted([*despesa.splits, *despesa.archived_splits], key=lambda fatia: fatia.id)
+        return campos
+
+class ExpenseTemplateResponse(RespostaORM):
+    id: int
+    description: str
+    base_value: ReaisResposta
+    category: str
     
 class ResidentPurchaseCreate(BaseModel):
     description: str
-    value: float
+    value: Reais
 
 class CashTransactionCreate(BaseModel):
-    amount: float
+    amount: Reais
     description: str
     type: str # "in" ou "out"
 
+class CashTransactionResponse(RespostaORM):
+    amount: ReaisResposta
+    description: str
+    type: str
+
+class CaixaTransacaoResponse(BaseModel):
+    detail: str
+    transacao: ReaisResposta
+
+class PagamentoResponse(BaseModel):
+    detail: str
+    sobra_em_caixa: float
+
+class FatiaPendente(BaseModel):
+    id: int
+    description: str
+    value: ReaisResposta
+    paid_amount: ReaisResposta
+
+class DevedorResponse(BaseModel):
+    id: int
+    name: str
+    total_owed: ReaisResposta
+    pending_count: int
+    pending_expenses: Optional[List[FatiaPendente]] = None # ausente com summary_only=true
+
+# Acerto de contas (app/services/acerto.py): saldo positivo = a casa deve ao morador
+class PosicaoAcerto(BaseModel):
+    user_id: int
+    name: str
+    debitos: ReaisResposta # fatias em aberto
+    creditos: ReaisResposta # compras ainda não acertadas
+    aluguel: ReaisResposta
+    saldo: ReaisResposta
+
+class TransferenciaAcerto(BaseModel):
+    de_user_id: Optional[int] = None # null = a casa
+    de_nome: str
+    para_user_id: Optional[int] = None
+    para_nome: str
+    valor: ReaisResposta
+
+class AcertoResponse(BaseModel):
+    versao: int # versão da república no cálculo; POST /financas/acerto exige a mesma
+    aluguel: bool
+    posicoes: List[PosicaoAcerto]
+    saldo_casa: ReaisResposta
+    transferencias: List[TransferenciaAcerto]
+
+class AcertoAplicar(BaseModel):
+    versao: int
+    aluguel: bool = False # o acerto aplicado não inclui o aluguel fixo (true é recusado)
+
+class AcertoAplicadoResponse(AcertoResponse):
+    detail: str
+    fatias_quitadas: int
+    compras_acertadas: int
+
+# Itens dos envios em lote: trazem a data (importação de notas/extrato, fila offline do app)
+class ResidentPurchaseLoteItem(ResidentPurchaseCreate):
+    purchase_date: Optional[date] = None # padrão: hoje
+    user_id: Optional[int] = None # padrão: quem envia; outro morador só para admin de finanças
+
+class CashTransactionLoteItem(CashTransactionCreate):
+    transaction_date: Optional[date] = None # padrão: hoje
+
+class ResultadoItemLote(BaseModel):
+    indice: int # posição do item no array enviado
+    status: str # "criado", "atualizado", "substituido", "rejeitado" ou "nao_aplicado"
+    id: Optional[int] = None
+    erro: Optional[str] = None
+
+class LoteResponse(BaseModel):
+    detail: str
+    aceitos: int
+    rejeitados: int
+    resultados: List[ResultadoItemLote]
+
+class AlugueisResponse(BaseModel):
+    mensagem: str
+    resultados: List[ResultadoItemLote]
+
 class DashboardResponse(BaseModel):
     fixed_rent_base: float
     variable_debts: float
@@ -66,4 +179,39 @@ class DashboardResponse(BaseModel):
     total_to_pay: float
     cashbox_balance: float
     total_republic_expenses: float 
-    user_balance: float            
\ No newline at end of file
+    user_balance: float            
+class MensalidadeJobResponse(RespostaORM):
+    id: int
+    reference_month: str
+    status: str # "pendente", "executando", "concluido" ou "falhou"
+    attempts: int
+    result: Optional[int] = None # despesas criadas
+    last_error: Optional[str] = None
+    finished_at: Optional[datetime] = None
+
+class MensalidadeResponse(BaseModel):
+    detail: str
+    job: Optional[MensalidadeJobResponse] = None # só quando a geração foi agendada no worker
+
+class RelatorioLinha(BaseModel):
+    month: Optional[str] = None # "AAAA-MM" (null quando agrupado só por categoria)
+    category: Optional[str] = None # null quando agrupado só por mês
+    expenses: ReaisResposta
+    payments: ReaisResposta
+    purchases: ReaisResposta
+    cashbox_in: ReaisResposta
+    cashbox_out: ReaisResposta
+
+class RelatorioTotais(BaseModel):
+    expenses: ReaisResposta
+    payments: ReaisResposta
+    purchases: ReaisResposta
+    cashbox_in: ReaisResposta
+    cashbox_out: ReaisResposta
+
+class RelatorioResponse(BaseModel):
+    de: str
+    ate: str
+    por: str
+    linhas: List[RelatorioLinha]
+    totais: RelatorioTotais
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
+from .base import RespostaORM
 from .user import UserPublic # Importamos o esquema público do usuário
 
 class RepublicBase(BaseModel):
@@ -10,7 +11,7 @@ class RepublicCreate(RepublicBase):
     name: str = Field(..., min_length=3, description="O nome deve ter pelo menos 3 letras")
     address: str = Field(..., min_length=5, description="Endereço completo")
 
-class RepublicPublic(RepublicBase):
+class RepublicPublic(RespostaORM, RepublicBase):
     id: int
     invite_code: str
 
@@ -18,6 +19,13 @@ class RepublicDetail(RepublicPublic):
     # Este esquema é usado quando queremos ver a república + seus moradores
     users: List[UserPublic] = []
 
+class MensagemResponse(BaseModel):
+    mensagem: str
+
+class RepublicaCriadaResponse(MensagemResponse):
+    republica: RepublicPublic
+    fundador: str
+
 # Schema para alteração de cargo
 class RoleUpdate(BaseModel):
     user_id: int
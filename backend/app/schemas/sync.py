@@ -0,0 +1,71 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date
+
+from app.models.dinheiro import ReaisResposta
+
+# Linhas devolvidas pelo /sync: o app faz upsert pelo id em cada lista
+
+class DespesaSync(BaseModel):
+    id: int
+    description: str
+    amount: ReaisResposta
+    due_date: date
+    split_type: str
+    category: str
+    template_id: Optional[int] = None
+    reference_month: Optional[str] = None
+
+class FatiaSync(BaseModel):
+    id: int
+    expense_id: int
+    user_id: int
+    value: ReaisResposta
+    paid_amount: ReaisResposta
+    is_paid: bool
+
+class CompraSync(BaseModel):
+    id: int
+    description: str
+    amount: ReaisResposta
+    purchase_date: date
+    is_settled: bool
+    user_id: int
+
+class MovimentacaoSync(BaseModel):
+    id: int
+    description: str
+    amount: ReaisResposta
+    transaction_date: date
+    type: str
+
+class PagamentoSync(BaseModel):
+    id: int
+    user_expense_id: int
+    amount: ReaisResposta
+    payment_date: date
+    confirmed_by_id: int
+
+class MoradorSync(BaseModel):
+    id: int
+    name: str
+    email: str
+    fixed_rent: ReaisResposta
+    role_tag: str
+
+class RemocaoSync(BaseModel):
+    tipo: str # nome da lista ("moradores", "despesas", ...)
+    id: int
+
+class SyncResponse(BaseModel):
+    republica_id: int
+    cursor: str # enviar no próximo /sync
+    tem_mais: bool # há mais mudanças: chamar de novo já com o cursor novo
+    reiniciar: bool # cursor inválido ou de outra república: apagar os dados locais antes de aplicar
+    despesas: List[DespesaSync]
+    fatias: List[FatiaSync]
+    compras: List[CompraSync]
+    caixa: List[MovimentacaoSync]
+    pagamentos: List[PagamentoSync]
+    moradores: List[MoradorSync]
+    removidos: List[RemocaoSync]
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+from .base import RespostaORM
 
 class UserBase(BaseModel):
     name: str
@@ -10,6 +11,10 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
 
-class UserPublic(UserBase):
+class UserPublic(RespostaORM, UserBase):
     id: int
-    republic_id: Optional[int]
\ No newline at end of file
+    republic_id: Optional[int]
+
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str
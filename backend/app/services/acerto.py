@@ -0,0 +1,254 @@
+"""
+Acerto de contas da república com o mínimo de transferências.
+
+Hoje cada fatia é paga à casa pelo /financas/pagar-divida e as compras dos moradores só
+abatem no dashboard. O acerto junta tudo numa posição por morador e diz quem paga quem:
+
+- calcular_posicoes(): uma única consulta agrupada (UNION ALL das fatias em aberto, das
+  compras não acertadas e do aluguel fixo dos moradores, GROUP BY usuário), em centavos.
+  Os pagamentos já entram pelas fatias (paid_amount sobe junto com cada PaymentHistory).
+  Saldo positivo = a casa deve ao morador; negativo = ele deve à casa. A casa (o caixa,
+  que paga as despesas e recebe o aluguel) entra como mais um participante, com o saldo
+  que zera a soma;
+- transferencias_minimas(): o menor número de transferências que zera todos os saldos.
+  São n - k, onde k é o maior número de grupos de soma zero em que os participantes se
+  dividem; até LIMITE_EXATO participantes isso é calculado exatamente (programação
+  dinâmica sobre subconjuntos), acima disso vale o guloso (maior credor com maior
+  devedor, no máximo n - 1 transferências);
+- aplicar_acerto(): registra o acerto numa transação, com instruções em lote: um
+  pagamento (PaymentHistory) do que falta em cada fatia em aberto, as fatias quitadas,
+  as compras marcadas como acertadas, o ledger e os resumos mensais. Só vale para a
+  versão da república em que o acerto foi calculado (qualquer escrita no meio dá 409).
+
+Bruto x líquido: os recibos (PaymentHistory) e os pagamentos dos resumos mensais guardam o
+valor bruto do que faltava em cada fatia, e as compras acertadas saem pelo valor cheio; já
+as transferências são o líquido de cada um (fatias menos compras). Ex.: com 66,67 em fatias
+e 5,00 em compras, o morador transfere 61,67, o recibo é de 66,67 e a compra de 5,00 conta
+como paga a ele pela casa. Por participante, recibos - compras = o que ele transfere.
+
+O aluguel fixo não é lançado em nenhuma tabela (como no dashboard): com aluguel=True ele
+entra nas posições e nas transferências do cálculo (GET), só para consulta. O acerto
+aplicado nunca o inclui: como nada dele seria gravado, o próximo cálculo pediria o mesmo
+aluguel de novo, e o morador pagaria duas vezes.
+"""
+import heapq
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import BigInteger, func, insert, literal, type_coerce, union_all, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Expense, Republic, ResidentPurchase, User, UserExpense
+from app.models.dinheiro import para_reais, soma_em_reais
+from app.models.finance import PaymentHistory
+from app.services import resumos
+from app.services.ledger import ajustar_saldos_usuarios
+from app.services.sync import carimbar
+
+CASA = None # chave da casa nas posições e transferências
+NOME_CASA = "Casa"
+# 2^n subconjuntos: com 12 participantes (11 moradores + a casa) são ~50 mil passos
+LIMITE_EXATO = 12
+
+
+class AcertoDesatualizado(Exception):
+    """A república mudou depois que o acerto foi calculado."""
+
+
+def _centavos(coluna):
+    # Soma direto os centavos do banco (Dinheiro é BIGINT em centavos), sem passar por reais
+    return type_coerce(coluna, BigInteger)
+
+
+async def calcular_posicoes(session: AsyncSession, republic_id: int, aluguel: bool = True) -> List[dict]:
+    """
+    Posição de cada morador (e de quem ainda tem fatias ou compras na república), em
+    centavos: {"user_id", "name", "debitos", "creditos", "aluguel", "saldo"}.
+    """
+    zero = literal(0, BigInteger)
+    partes = union_all(
+        select(UserExpense.user_id.label("user_id"), _centavos(UserExpense.value - UserExpense.paid_amount).label("debitos"),
+               zero.label("creditos"), zero.label("aluguel"))
+        .where(UserExpense.republic_id == republic_id, UserExpense.is_paid == False),
+        select(ResidentPurchase.user_id, zero, _centavos(ResidentPurchase.amount), zero)
+        .where(ResidentPurchase.republic_id == republic_id, ResidentPurchase.is_settled == False),
+        # Todos os moradores aparecem, mesmo sem nada em aberto
+        select(User.id, zero, zero, func.coalesce(_centavos(User.fixed_rent), 0) if aluguel else zero)
+        .where(User.republic_id == republic_id),
+    ).subquery()
+
+    linhas = (await session.exec(
+        select(
+            partes.c.user_id, User.name,
+            func.sum(partes.c.debitos), func.sum(partes.c.creditos), func.sum(partes.c.aluguel),
+        )
+        .join(User, User.id == partes.c.user_id)
+        .group_by(partes.c.user_id, User.name)
+        .order_by(partes.c.user_id)
+    )).all()
+    return [
+        {"user_id": user_id, "name": nome, "debitos": debitos, "creditos": creditos, "aluguel": valor_aluguel,
+         "saldo": creditos - debitos - valor_aluguel}
+        for user_id, nome, debitos, creditos, valor_aluguel in linhas
+    ]
+
+
+def saldos_com_a_casa(posicoes: List[dict]) -> Dict[Optional[int], int]:
+    """{user_id: saldo} mais a casa (CASA), com o saldo que zera a soma."""
+    saldos = {posicao["user_id"]: posicao["saldo"] for posicao in posicoes}
+    saldos[CASA] = -sum(saldos.values())
+    return saldos
+
+
+def _grupos_de_soma_zero(participantes: List[Tuple[Optional[int], int]]) -> List[List[Tuple[Optional[int], int]]]:
+    """
+    Divide os participantes no maior número de grupos de soma zero. melhor[m] é o maior
+    número de prefixos de soma zero numa ordem dos participantes do subconjunto m; a
+    ordem escolhida, lida de trás para frente, corta os grupos onde a soma zera.
+    """
+    n = len(participantes)
+    total = 1 << n
+    soma = [0] * total
+    melhor = [0] * total
+    escolha = [0] * total
+    for mascara in range(1, total):
+        bit = mascara & -mascara
+        soma[mascara] = soma[mascara ^ bit] + participantes[bit.bit_length() - 1][1]
+        maior, ultimo, resto = -1, 0, mascara
+        while resto:
+            bit = resto & -resto
+            if melhor[mascara ^ bit] > maior:
+                maior, ultimo = melhor[mascara ^ bit], bit.bit_length() - 1
+            resto ^= bit
+        melhor[mascara] = maior + (soma[mascara] == 0)
+        escolha[mascara] = ultimo
+
+    grupos, grupo, mascara = [], [], total - 1
+    while mascara:
+        i = escolha[mascara]
+        grupo.append(participantes[i])
+        mascara ^= 1 << i
+        if soma[mascara] == 0:
+            grupos.append(grupo)
+            grupo = []
+    return grupos
+
+
+def _quitar_guloso(grupo: List[Tuple[Optional[int], int]]) -> List[Tuple[Optional[int], Optional[int], int]]:
+    """Maior devedor paga ao maior credor até zerar um dos dois (no máximo len(grupo) - 1 transferências)."""
+    # O índice desempata (e evita comparar a chave da casa, None, com ids)
+    credores = [(-valor, i, chave) for i, (chave, valor) in enumerate(grupo) if valor > 0]
+    devedores = [(valor, i, chave) for i, (chave, valor) in enumerate(grupo) if valor < 0]
+    heapq.heapify(credores)
+    heapq.heapify(devedores)
+    transferencias = []
+    while credores and devedores:
+        a_receber, i, credor = heapq.heappop(credores)
+        a_pagar, j, devedor = heapq.heappop(devedores)
+        valor = min(-a_receber, -a_pagar)
+        transferencias.append((devedor, credor, valor))
+        if -a_receber > valor:
+            heapq.heappush(credores, (a_receber + valor, i, credor))
+        if -a_pagar > valor:
+            heapq.heappush(devedores, (a_pagar + valor, j, devedor))
+    return transferencias
+
+
+def transferencias_minimas(saldos: Dict[Optional[int], int]) -> List[Tuple[Optional[int], Optional[int], int]]:
+    """
+    saldos: {participante: centavos} somando zero (positivo recebe, negativo paga).
+    Devolve [(quem paga, quem recebe, centavos)], maiores primeiro.
+    """
+    participantes = sorted(((chave, valor) for chave, valor in saldos.items() if valor), key=lambda p: (p[0] is not None, p[0] or 0))
+    if sum(valor for _, valor in participantes) != 0:
+        raise ValueError("Os saldos não somam zero.")
+    grupos = _grupos_de_soma_zero(participantes) if len(participantes) <= LIMITE_EXATO else [participantes]
+    transferencias = [transferencia for grupo in grupos for transferencia in _quitar_guloso(grupo)]
+    return sorted(transferencias, key=lambda t: -t[2])
+
+
+def montar_resposta(versao: int, aluguel: bool, posicoes: List[dict]) -> dict:
+    """Posições e transferências em reais, no formato de AcertoResponse."""
+    nomes = {posicao["user_id"]: posicao["name"] for posicao in posicoes}
+    nomes[CASA] = NOME_CASA
+    saldos = saldos_com_a_casa(posicoes)
+    return {
+        "versao": versao,
+        "aluguel": aluguel,
+        "posicoes": [
+            {**posicao, **{campo: para_reais(posicao[campo]) for campo in ("debitos", "creditos", "aluguel", "saldo")}}
+            for posicao in posicoes
+        ],
+        "saldo_casa": para_reais(saldos[CASA]),
+        "transferencias": [
+            {"de_user_id": de, "de_nome": nomes[de], "para_user_id": para, "para_nome": nomes[para], "valor": para_reais(valor)}
+            for de, para, valor in transferencias_minimas(saldos)
+        ],
+    }
+
+
+async def aplicar_acerto(session: AsyncSession, republic_id: int, versao: int, confirmado_por_id: int) -> dict:
+    """
+    Registra o acerto calculado na `versao` da república, sem o aluguel fixo. Não faz commit.
+    Os recibos são brutos (o que faltava em cada fatia) e as compras saem pelo valor cheio;
+    as transferências devolvidas são o líquido (ver o início do módulo).
+    Devolve o acerto que foi aplicado, com as quantidades de fatias quitadas e compras acertadas.
+    """
+    # Sobe a versão só se ninguém escreveu depois do cálculo. É a primeira escrita da
+    # transação: trava a república (e, no SQLite, pega a vez de escrever) até o commit,
+    # então as leituras abaixo são as mesmas que as escritas vão usar
+    resultado = await session.exec(
+        update(Republic).where(Republic.id == republic_id, Republic.data_version == versao)
+        .values(data_version=Republic.data_version + 1)
+    )
+    if resultado.rowcount != 1:
+        raise AcertoDesatualizado()
+
+    posicoes = await calcular_posicoes(session, republic_id, aluguel=False)
+    if not any(posicao["debitos"] or posicao["creditos"] for posicao in posicoes):
+        raise HTTPException(status_code=400, detail="Não há fatias em aberto nem compras a acertar.")
+    acerto = montar_resposta(versao, False, posicoes)
+
+    hoje = date.today()
+    em_aberto = (UserExpense.republic_id == republic_id, UserExpense.is_paid == False)
+
+    # Resumos mensais: os pagamentos de hoje, por categoria da despesa
+    mensais = resumos.novos_deltas()
+    for categoria, total in (await session.exec(
+        select(Expense.category, soma_em_reais(func.sum(UserExpense.value - UserExpense.paid_amount)))
+        .join(Expense, Expense.id == UserExpense.expense_id)
+        .where(*em_aberto)
+        .group_by(Expense.category)
+    )).all():
+        resumos.acumular(mensais, republic_id, hoje, categoria, "payments", total)
+
+    # Um recibo do que falta em cada fatia, as fatias quitadas e as compras acertadas
+    await session.exec(insert(PaymentHistory.__table__).from_select(
+        ["user_expense_id", "amount", "payment_date", "confirmed_by_id", "republic_id"],
+        select(
+            UserExpense.id, _centavos(UserExpense.value - UserExpense.paid_amount),
+            literal(hoje), literal(confirmado_por_id), UserExpense.republic_id,
+        ).where(*em_aberto, UserExpense.value > UserExpense.paid_amount),
+    ))
+    tabela = UserExpense.__table__
+    fatias = (await session.exec(
+        update(tabela)
+        .where(tabela.c.republic_id == republic_id, tabela.c.is_paid == False)
+        .values(paid_amount=tabela.c.value, is_paid=True, version=tabela.c.version + 1, sync_seq=None)
+    )).rowcount
+    compras = (await session.exec(
+        update(ResidentPurchase.__table__)
+        .where(ResidentPurchase.republic_id == republic_id, ResidentPurchase.is_settled == False)
+        .values(is_settled=True, sync_seq=None)
+    )).rowcount
+
+    await ajustar_saldos_usuarios(session, {
+        posicao["user_id"]: {"open_debts": -para_reais(posicao["debitos"]), "open_credits": -para_reais(posicao["creditos"])}
+        for posicao in posicoes
+        if posicao["debitos"] or posicao["creditos"]
+    })
+    await resumos.ajustar_resumos(session, mensais)
+    await carimbar(session, [republic_id])
+    return {**acerto, "fatias_quitadas": fatias, "compras_acertadas": compras}
@@ -0,0 +1,149 @@
+"""
+Arquivamento: dados quentes e frios.
+
+Fatias quitadas nunca saem de userexpense, e paymenthistory e cashtransaction só crescem,
+então os índices e as somas dessas tabelas acompanham o histórico inteiro da casa. O que
+já está fechado vai para tabelas de arquivo com as mesmas colunas e os mesmos ids:
+
+- fatias quitadas de despesas que venceram antes do corte, junto com os pagamentos delas
+  (uma fatia quitada não muda mais: os pagamentos só pegam fatias em aberto);
+- movimentações do caixa com data antes do corte. O total arquivado de cada
+  república/mês vira uma linha de saldo transportado (CashboxCarryForward), que
+  calcular_saldos() e calcular_resumos() somam no lugar das linhas que saíram.
+
+O corte é o primeiro dia do mês, settings.arquivo_meses_quentes meses antes do atual.
+arquivar() anda em lotes de settings.arquivo_lote linhas, cada um numa transação curta
+(pode ser interrompido e rodado de novo); é a base de `python manage.py arquivo executar`.
+
+O ledger não muda (fatias quitadas não entram nos débitos em aberto e os totais do caixa
+já contam as movimentações), e nem os resumos mensais. As leituras usam só as tabelas
+quentes; com historico=completo, GET /financas/despesas e /financas/caixa/extrato juntam
+o arquivo. O /sync não registra remoções: o app mantém as cópias que já tem, e uma carga
+completa traz só o que está quente. Numa troca de shard as linhas arquivadas voltam às
+tabelas quentes no destino (app/services/shards.py) e o próximo arquivamento as devolve.
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Optional
+
+from sqlalchemy import delete, func, insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.models import CashTransaction, Expense, UserExpense
+from app.models.finance import CashboxCarryForward, CashTransactionArchive, PaymentHistory, PaymentHistoryArchive, UserExpenseArchive
+from app.services.ledger import ajustar_em_lote
+from app.services.resumos import mes
+from app.services.versoes import incrementar_versao
+
+# Tabela quente -> arquivo (mesmas colunas)
+ARQUIVOS = {
+    UserExpense.__table__: UserExpenseArchive.__table__,
+    PaymentHistory.__table__: PaymentHistoryArchive.__table__,
+    CashTransaction.__table__: CashTransactionArchive.__table__,
+}
+
+
+def corte_padrao(hoje: Optional[date] = None) -> date:
+    """Primeiro dia do mês settings.arquivo_meses_quentes meses antes do atual."""
+    hoje = hoje or date.today()
+    meses = hoje.year * 12 + hoje.month - 1 - settings.arquivo_meses_quentes
+    return date(meses // 12, meses % 12 + 1, 1)
+
+
+async def _copiar_para_o_arquivo(session: AsyncSession, quente, coluna, ids):
+    """INSERT ... SELECT no arquivo das linhas da tabela quente com `coluna` em `ids`."""
+    colunas = [c.name for c in quente.columns]
+    await session.exec(insert(ARQUIVOS[quente]).from_select(colunas, select(*quente.columns).where(coluna.in_(ids))))
+
+
+async def arquivar_fatias(session: AsyncSession, corte: date, lote: int):
+    """Um lote de fatias quitadas (e seus pagamentos). Devolve (fatias, pagamentos, repúblicas). Não faz commit."""
+    linhas = (await session.exec(
+        select(UserExpense.id, UserExpense.republic_id)
+        .join(Expense, Expense.id == UserExpense.expense_id)
+        .where(UserExpense.is_paid == True, Expense.due_date < corte)
+        .order_by(UserExpense.id)
+        .limit(lote)
+    )).all()
+    if not linhas:
+        return 0, 0, set()
+
+    ids = [fatia_id for fatia_id, _ in linhas]
+    # As fatias entram antes no arquivo (os pagamentos arquivados apontam para elas) e saem depois
+    await _copiar_para_o_arquivo(session, UserExpense.__table__, UserExpense.id, ids)
+    await _copiar_para_o_arquivo(session, PaymentHistory.__table__, PaymentHistory.user_expense_id, ids)
+    pagamentos = (await session.exec(delete(PaymentHistory).where(PaymentHistory.user_expense_id.in_(ids)))).rowcount
+    await session.exec(delete(UserExpense).where(UserExpense.id.in_(ids)))
+    return len(ids), pagamentos, {rep_id for _, rep_id in linhas}
+
+
+async def arquivar_caixa(session: AsyncSession, corte: date, lote: int):
+    """Um lote de movimentações do caixa, somadas no saldo transportado. Devolve (linhas, repúblicas). Não faz commit."""
+    linhas = (await session.exec(
+        select(CashTransaction.id, CashTransaction.republic_id, CashTransaction.transaction_date, CashTransaction.type, CashTransaction.amount)
+        .where(CashTransaction.transaction_date < corte)
+        .order_by(CashTransaction.id)
+        .limit(lote)
+    )).all()
+    if not linhas:
+        return 0, set()
+
+    deltas = defaultdict(lambda: defaultdict(Decimal))
+    for _, rep_id, dia, tipo, valor in linhas:
+        deltas[(rep_id, mes(dia))]["cashbox_in" if tipo == "in" else "cashbox_out"] += valor
+    await ajustar_em_lote(session, CashboxCarryForward, ("republic_id", "month"), deltas)
+    ids = [linha[0] for linha in linhas]
+    await _copiar_para_o_arquivo(session, CashTransaction.__table__, CashTransaction.id, ids)
+    await session.exec(delete(CashTransaction).where(CashTransaction.id.in_(ids)))
+    return len(ids), {linha[1] for linha in linhas}
+
+
+async def arquivar(session: AsyncSession, corte: Optional[date] = None, lote: Optional[int] = None, ao_concluir_lote=None) -> Dict[str, int]:
+    """
+    Arquiva tudo o que estiver antes do corte, um lote por transação. A versão das
+    repúblicas tocadas sobe (as listagens mudam, então os ETags também).
+    ao_concluir_lote(totais) é chamado depois de cada commit (progresso no manage.py).
+    """
+    corte = corte or corte_padrao()
+    lote = lote or settings.arquivo_lote
+    totais = {"fatias": 0, "pagamentos": 0, "caixa": 0}
+    while True:
+        fatias, pagamentos, republicas = await arquivar_fatias(session, corte, lote)
+        caixa, republicas_caixa = await arquivar_caixa(session, corte, lote)
+        if not fatias and not caixa:
+            return totais
+        await incrementar_versao(session, republicas | republicas_caixa)
+        await session.commit()
+        totais["fatias"] += fatias
+        totais["pagamentos"] += pagamentos
+        totais["caixa"] += caixa
+        if ao_concluir_lote:
+            ao_concluir_lote(totais)
+
+
+async def situacao(session: AsyncSession, corte: Optional[date] = None) -> Dict[str, Dict[str, int]]:
+    """Linhas quentes, arquiváveis (antes do corte) e já arquivadas de cada tabela."""
+    corte = corte or corte_padrao()
+
+    async def contar(stmt) -> int:
+        return (await session.exec(select(func.count()).select_from(stmt.subquery()))).one()
+
+    arquivaveis = {
+        "userexpense": (select(UserExpense.id).join(Expense, Expense.id == UserExpense.expense_id)
+                        .where(UserExpense.is_paid == True, Expense.due_date < corte)),
+        "paymenthistory": (select(PaymentHistory.id).join(UserExpense, UserExpense.id == PaymentHistory.user_expense_id)
+                           .join(Expense, Expense.id == UserExpense.expense_id)
+                           .where(UserExpense.is_paid == True, Expense.due_date < corte)),
+        "cashtransaction": select(CashTransaction.id).where(CashTransaction.transaction_date < corte),
+    }
+    resultado = {}
+    for quente, arquivo in ARQUIVOS.items():
+        resultado[quente.name] = {
+            "quentes": await contar(select(quente.c.id)),
+            "arquivaveis": await contar(arquivaveis[quente.name]),
+            "arquivadas": await contar(select(arquivo.c.id)),
+        }
+    return resultado
@@ -0,0 +1,120 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import insert
+
+from app.database import insert_do_dialeto
+from app.models import User, Expense, UserExpense
+from app.models.dinheiro import para_centavos, para_reais, ratear_centavos
+from app.models.finance import ExpenseTemplate
+from app.services.ledger import ajustar_saldos_usuarios, ajustar_saldos_republicas
+from app.services.versoes import incrementar_versao
+from app.services import resumos
+from app.core.eventos import publicar_apos_commit
+
+DIA_VENCIMENTO = 10 # Fixa para dia 10 (exemplo)
+
+
+async def moradores_por_republica(session: AsyncSession, republic_ids: List[int]):
+    """{republic_id: [user_id, ...]} com uma única consulta para todas as repúblicas."""
+    moradores = defaultdict(list)
+    for user_id, rep_id in (await session.exec(
+        select(User.id, User.republic_id)
+        .where(User.republic_id.in_(republic_ids))
+        .order_by(User.id)
+    )).all():
+        moradores[rep_id].append(user_id)
+    return moradores
+
+
+async def ratear_igualmente(session: AsyncSession, despesas, moradores: dict):
+    """
+    Divide cada despesa igualmente entre os moradores da república dela, em centavos
+    pelo maior resto: R$ 100,00 para 3 vira 33,34 + 33,33 + 33,33, somando o total exato.
+    despesas: lista de (expense_id, republic_id, amount) já inseridas.
+    Insere todas as fatias em um único INSERT em lote e ajusta o ledger em lote.
+    Não faz commit.
+    """
+    fatias = []
+    debitos = defaultdict(Decimal)
+    totais_republica = defaultdict(Decimal)
+
+    for expense_id, rep_id, valor in despesas:
+        totais_republica[rep_id] += valor
+        ids = moradores.get(rep_id) or []
+        if not ids:
+            continue
+        partes = ratear_centavos(para_centavos(valor), [1] * len(ids))
+        for user_id, centavos in zip(ids, partes):
+            valor_fatia = para_reais(centavos)
+            fatias.append({"user_id": user_id, "expense_id": expense_id, "republic_id": rep_id, "value": valor_fatia, "paid_amount": Decimal(0), "is_paid": False})
+            debitos[user_id] += valor_fatia
+
+    if fatias:
+        await session.exec(insert(UserExpense.__table__), params=fatias)
+    await ajustar_saldos_usuarios(session, {user_id: {"open_debts": v} for user_id, v in debitos.items()})
+    await ajustar_saldos_republicas(session, {rep_id: {"total_expenses": v} for rep_id, v in totais_republica.items()})
+
+
+async def gerar_mensalidades(session: AsyncSession, mes: date, republic_ids: Optional[List[int]] = None):
+    """
+    Gera as despesas do mês a partir dos templates, para uma ou várias repúblicas:
+    - 1 SELECT de templates e 1 de moradores para todo o lote;
+    - 1 INSERT ... ON CONFLICT DO NOTHING ... RETURNING com todas as despesas.
+      O índice único (república, template, mês) faz o banco ignorar as que já
+      existem e o RETURNING só devolve as criadas agora, então gerar de novo é seguro;
+    - as fatias e o ledger em lote (ratear_igualmente).
+    Não faz commit. Retorna {republic_id: despesas criadas} para as repúblicas com template.
+    """
+    stmt = select(ExpenseTemplate).order_by(ExpenseTemplate.republic_id, ExpenseTemplate.id)
+    if republic_ids is not None:
+        stmt = stmt.where(ExpenseTemplate.republic_id.in_(republic_ids))
+    templates = (await session.exec(stmt)).all()
+    if not templates:
+        return {}
+
+    criadas = {t.republic_id: 0 for t in templates}
+    moradores = await moradores_por_republica(session, list(criadas))
+
+    referencia = mes.strftime("%Y-%m")
+    linhas = [
+        {
+            "description": f"{t.description} - {mes.strftime('%m/%Y')}",
+            "amount": t.base_value,
+            "due_date": date(mes.year, mes.month, DIA_VENCIMENTO),
+            "category": t.category,
+            "split_type": "equal",
+            "republic_id": t.republic_id,
+            "template_id": t.id,
+            "reference_month": referencia,
+        }
+        for t in templates
+        if moradores.get(t.republic_id)
+    ]
+    if not linhas:
+        return criadas
+
+    tabela = Expense.__table__
+    insert_stmt = (
+        insert_do_dialeto(session, tabela)
+        .on_conflict_do_nothing(index_elements=["republic_id", "template_id", "reference_month"])
+        .returning(tabela.c.id, tabela.c.republic_id, tabela.c.amount, tabela.c.due_date, tabela.c.category)
+    )
+    novas = (await session.exec(insert_stmt, params=linhas)).all()
+
+    mensais = resumos.novos_deltas()
+    for _, rep_id, valor, vencimento, categoria in novas:
+        criadas[rep_id] += 1
+        resumos.acumular(mensais, rep_id, vencimento, categoria, "expenses", valor)
+
+    await ratear_igualmente(session, [(id_, rep_id, valor) for id_, rep_id, valor, _, _ in novas], moradores)
+    await resumos.ajustar_resumos(session, mensais)
+    await incrementar_versao(session, {rep_id for _, rep_id, _, _, _ in novas})
+    for rep_id, total in criadas.items():
+        if total:
+            publicar_apos_commit(session, rep_id, "mensalidade_gerada", reference_month=referencia, despesas=total)
+    return criadas
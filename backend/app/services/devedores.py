@@ -0,0 +1,62 @@
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import func
+
+from app.models import User, Expense, UserExpense
+from app.models.dinheiro import soma_em_reais
+
+
+async def gerar_relatorio_devedores(session: AsyncSession, republic_id: int, limit: int = 100, offset: int = 0, summary_only: bool = False):
+    """
+    Monta o resumo de devedores da república com no máximo duas consultas:
+    1. um GROUP BY que já devolve total devido e quantidade de fatias por morador;
+    2. (se summary_only=False) as fatias pendentes da página, com a descrição
+       da despesa vinda no mesmo JOIN (sem lazy load de f.expense).
+    """
+    resumo_stmt = (
+        select(
+            User.id,
+            User.name,
+            soma_em_reais(func.sum(UserExpense.value - UserExpense.paid_amount)),
+            func.count(UserExpense.id),
+        )
+        .join(UserExpense, UserExpense.user_id == User.id)
+        .where(User.republic_id == republic_id, UserExpense.is_paid == False)
+        .group_by(User.id, User.name)
+        .order_by(User.id)
+        .limit(limit)
+        .offset(offset)
+    )
+
+    resumo = []
+    por_usuario = {}
+    for user_id, nome, total_devido, quantidade in (await session.exec(resumo_stmt)).all():
+        item = {
+            "id": user_id,
+            "name": nome,
+            "total_owed": total_devido,
+            "pending_count": quantidade,
+        }
+        if not summary_only:
+            item["pending_expenses"] = []
+        resumo.append(item)
+        por_usuario[user_id] = item
+
+    if summary_only or not por_usuario:
+        return resumo
+
+    fatias_stmt = (
+        select(UserExpense.id, UserExpense.user_id, Expense.description, UserExpense.value, UserExpense.paid_amount)
+        .join(Expense, Expense.id == UserExpense.expense_id)
+        .where(UserExpense.user_id.in_(por_usuario.keys()), UserExpense.is_paid == False)
+        .order_by(UserExpense.user_id, UserExpense.id)
+    )
+    for fatia_id, user_id, descricao, valor, pago in (await session.exec(fatias_stmt)).all():
+        por_usuario[user_id]["pending_expenses"].append({
+            "id": fatia_id,
+            "description": descricao,
+            "value": valor,
+            "paid_amount": pago,
+        })
+
+    return resumo
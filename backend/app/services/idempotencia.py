@@ -0,0 +1,53 @@
+import hashlib
+import json
+from typing import Optional, Tuple
+
+from fastapi import Header, HTTPException, Request
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.finance import IdempotencyKey
+
+# (chave, "MÉTODO /caminho", hash da query e do corpo)
+Pedido = Tuple[str, str, str]
+
+
+async def pedido_idempotente(request: Request, idempotency_key: Optional[str] = Header(default=None, max_length=100)) -> Optional[Pedido]:
+    """
+    Dependência das rotas com Idempotency-Key: a chave vale só para o método e o caminho
+    em que foi usada, e guarda o hash do pedido para recusar a mesma chave com outro conteúdo.
+    None se o cabeçalho não veio.
+    """
+    if not idempotency_key:
+        return None
+    conteudo = hashlib.sha256(request.url.query.encode() + b"\n" + await request.body()).hexdigest()
+    return idempotency_key, f"{request.method} {request.url.path}", conteudo
+
+
+async def resposta_salva(session: AsyncSession, user_id: int, pedido: Optional[Pedido]):
+    """
+    Resposta já enviada para esta Idempotency-Key (ou None se for a primeira vez).
+    422 se a chave já foi usada, na mesma rota, com outro pedido.
+    """
+    if pedido is None:
+        return None
+    chave, endpoint, conteudo = pedido
+    registro = await session.get(IdempotencyKey, (user_id, endpoint, chave))
+    if registro is None:
+        return None
+    # Chaves gravadas antes do hash existir (request_hash NULL) não são conferidas
+    if registro.request_hash is not None and registro.request_hash != conteudo:
+        raise HTTPException(status_code=422, detail="Esta Idempotency-Key já foi usada com outro conteúdo.")
+    return json.loads(registro.response_json)
+
+
+def salvar_resposta(session: AsyncSession, user_id: int, pedido: Optional[Pedido], resposta: dict):
+    """
+    Guarda a resposta na mesma transação da operação: ou as duas ficam gravadas, ou nenhuma.
+    Se a mesma chave for gravada em paralelo, a chave primária faz o commit falhar com IntegrityError.
+    """
+    if pedido is None:
+        return
+    chave, endpoint, conteudo = pedido
+    session.add(IdempotencyKey(
+        user_id=user_id, endpoint=endpoint, key=chave, request_hash=conteudo, response_json=json.dumps(resposta),
+    ))
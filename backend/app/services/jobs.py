@@ -0,0 +1,312 @@
+"""
+Execução em segundo plano da geração das contas do mês.
+
+Cada república/mês vira uma linha na tabela Job. O worker (um loop asyncio iniciado
+junto com a API, ou `python manage.py jobs worker` num processo separado):
+
+1. no dia settings.mensalidade_dia em diante, agenda o mês corrente para todas as
+   repúblicas com template (idempotente: a chave única não deixa duplicar);
+2. devolve para a fila jobs presos em "executando" há mais de jobs_lease segundos
+   (worker que morreu no meio);
+3. reivindica até jobs_lote * jobs_concorrencia jobs pendentes num único UPDATE
+   (FOR UPDATE SKIP LOCKED no PostgreSQL), então dois workers nunca pegam o mesmo;
+4. processa em lotes paralelos, cada lote numa transação com gerar_mensalidades();
+   se o lote falha, os jobs dele são refeitos um por um, e só o que falhar sozinho volta
+   para a fila com backoff exponencial, até jobs_max_tentativas, e depois fica como
+   "falhou" com o erro registrado.
+
+Com shards (app/core/shards.py), cada shard tem a sua fila (os jobs ficam junto dos dados
+da república) e cada passada percorre todos eles. Jobs de uma república que está mudando
+de shard voltam para a fila sem gastar tentativa.
+"""
+import asyncio
+import logging
+import os
+import socket
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import bindparam, func, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.database import async_engines_shards, insert_do_dialeto
+from app.models import Job, Republic
+from app.models.finance import ExpenseTemplate
+from app.models.job import agora
+from app.services.despesas import gerar_mensalidades
+
+logger = logging.getLogger(__name__)
+
+MENSALIDADE = "mensalidade"
+WORKER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def referencia(mes: date) -> str:
+    return mes.strftime("%Y-%m")
+
+
+async def agendar_mensalidades(session: AsyncSession, mes: date, republic_ids: Optional[List[int]] = None) -> int:
+    """Cria os jobs pendentes do mês para as repúblicas com template. Idempotente; não faz commit."""
+    stmt = select(ExpenseTemplate.republic_id).distinct()
+    if republic_ids is not None:
+        stmt = stmt.where(ExpenseTemplate.republic_id.in_(republic_ids))
+    ids = (await session.exec(stmt)).all()
+    if not ids:
+        return 0
+
+    momento = agora()
+    linhas = [
+        {
+            "kind": MENSALIDADE, "republic_id": rep_id, "reference_month": referencia(mes),
+            "status": "pendente", "attempts": 0, "run_after": momento, "created_at": momento,
+        }
+        for rep_id in ids
+    ]
+    tabela = Job.__table__
+    resultado = await session.exec(
+        insert_do_dialeto(session, tabela).on_conflict_do_nothing(index_elements=["kind", "republic_id", "reference_month"]),
+        params=linhas,
+    )
+    return resultado.rowcount
+
+
+async def solicitar_mensalidade(session: AsyncSession, republic_id: int, mes: date) -> Job:
+    """
+    Pedido manual (rota gerar-mensalidade): cria o job ou recoloca na fila um já concluído
+    ou falho, para gerar contas de templates criados depois. Rodar de novo é seguro, a
+    geração é idempotente por template/mês. Não faz commit.
+    """
+    tabela = Job.__table__
+    momento = agora()
+    stmt = insert_do_dialeto(session, tabela).values(
+        kind=MENSALIDADE, republic_id=republic_id, reference_month=referencia(mes),
+        status="pendente", attempts=0, run_after=momento, created_at=momento,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["kind", "republic_id", "reference_month"],
+        set_={"status": "pendente", "attempts": 0, "run_after": momento, "last_error": None, "finished_at": None},
+        where=tabela.c.status != "executando",
+    )
+    await session.exec(stmt)
+    return await obter_job(session, republic_id, mes)
+
+
+async def obter_job(session: AsyncSession, republic_id: int, mes: date) -> Optional[Job]:
+    return (await session.exec(
+        select(Job).where(Job.kind == MENSALIDADE, Job.republic_id == republic_id, Job.reference_month == referencia(mes))
+    )).first()
+
+
+async def resumo(session: AsyncSession, mes: date):
+    """Progresso do mês: {status: quantidade}."""
+    linhas = (await session.exec(
+        select(Job.status, func.count()).where(Job.kind == MENSALIDADE, Job.reference_month == referencia(mes)).group_by(Job.status)
+    )).all()
+    return {status: total for status, total in linhas}
+
+
+async def liberar_travados(session: AsyncSession) -> int:
+    limite = agora() - timedelta(seconds=settings.jobs_lease)
+    resultado = await session.exec(
+        update(Job.__table__)
+        .where(Job.__table__.c.status == "executando", Job.__table__.c.locked_at < limite)
+        .values(status="pendente", locked_by=None, locked_at=None)
+    )
+    return resultado.rowcount
+
+
+async def reivindicar(session: AsyncSession, limite: int, worker: str = WORKER):
+    """Marca até `limite` jobs pendentes como executando por este worker e os devolve. Faz commit."""
+    tabela = Job.__table__
+    momento = agora()
+    disponiveis = (
+        select(tabela.c.id)
+        .where(tabela.c.status == "pendente", tabela.c.run_after <= momento)
+        .order_by(tabela.c.id)
+        .limit(limite)
+    )
+    if session.bind.dialect.name == "postgresql":
+        disponiveis = disponiveis.with_for_update(skip_locked=True)
+
+    reivindicados = (await session.exec(
+        update(tabela)
+        .where(tabela.c.id.in_(disponiveis.scalar_subquery()), tabela.c.status == "pendente")
+        .values(status="executando", locked_by=worker, locked_at=momento, attempts=tabela.c.attempts + 1)
+        .returning(tabela.c.id, tabela.c.republic_id, tabela.c.reference_month, tabela.c.attempts)
+    )).all()
+    await session.commit()
+    return reivindicados
+
+
+async def _finalizar(session: AsyncSession, linhas: List[dict]):
+    # Um UPDATE em lote (executemany) para todos os jobs do lote
+    tabela = Job.__table__
+    await session.exec(
+        update(tabela)
+        .where(tabela.c.id == bindparam("b_id"))
+        .values(
+            status=bindparam("b_status"), result=bindparam("b_result"), run_after=bindparam("b_run_after"),
+            finished_at=bindparam("b_finished_at"), last_error=bindparam("b_last_error"),
+            locked_by=None, locked_at=None,
+        ),
+        params=linhas,
+    )
+    await session.commit()
+
+
+async def _adiar_em_mudanca(session: AsyncSession, jobs, shard: int):
+    """Separa os jobs de repúblicas que estão mudando de shard (ou já saíram deste) e os devolve à fila."""
+    if len(async_engines_shards) == 1:
+        return jobs
+    async with AsyncSession(async_engines_shards[0]) as diretorio:
+        aqui = set((await diretorio.exec(
+            select(Republic.id).where(
+                Republic.id.in_({job.republic_id for job in jobs}), Republic.shard == shard, Republic.shard_moving == False
+            )
+        )).all())
+    adiados = [job for job in jobs if job.republic_id not in aqui]
+    if adiados:
+        tabela = Job.__table__
+        await session.exec(
+            update(tabela)
+            .where(tabela.c.id.in_([job.id for job in adiados]))
+            .values(status="pendente", attempts=tabela.c.attempts - 1, run_after=agora() + timedelta(seconds=settings.jobs_intervalo),
+                    locked_by=None, locked_at=None)
+        )
+        await session.commit()
+    return [job for job in jobs if job.republic_id in aqui]
+
+
+async def executar_lote(jobs, shard: int = 0) -> int:
+    """
+    Gera as contas das repúblicas do lote numa transação e registra o resultado de cada job.
+    Se o lote falha, cada job é refeito sozinho, na sua transação: uma república com
+    problema não desfaz as outras nem gasta as tentativas delas.
+    """
+    async with AsyncSession(async_engines_shards[shard], expire_on_commit=False) as session:
+        jobs = await _adiar_em_mudanca(session, jobs, shard)
+        if not jobs:
+            return 0
+        por_mes = defaultdict(list)
+        for job in jobs:
+            por_mes[job.reference_month].append(job.republic_id)
+
+        try:
+            criadas = {}
+            for ref, ids in por_mes.items():
+                for rep_id, total in (await gerar_mensalidades(session, date.fromisoformat(f"{ref}-01"), ids)).items():
+                    criadas[(ref, rep_id)] = total
+
+            momento = agora()
+            # Mesma transação das contas: ou as duas coisas ficam gravadas, ou nenhuma
+            await _finalizar(session, [
+                {
+                    "b_id": job.id, "b_status": "concluido", "b_result": criadas.get((job.reference_month, job.republic_id), 0),
+                    "b_run_after": momento, "b_finished_at": momento, "b_last_error": None,
+                }
+                for job in jobs
+            ])
+            return len(jobs)
+        except Exception as erro:
+            await session.rollback()
+            if len(jobs) == 1:
+                job = jobs[0]
+                logger.exception("Falha na mensalidade %s da república %d", job.reference_month, job.republic_id)
+                momento = agora()
+                esgotou = job.attempts >= settings.jobs_max_tentativas
+                await _finalizar(session, [{
+                    "b_id": job.id,
+                    "b_status": "falhou" if esgotou else "pendente",
+                    "b_result": None,
+                    "b_run_after": momento + timedelta(seconds=settings.jobs_intervalo * 2 ** job.attempts),
+                    "b_finished_at": momento if esgotou else None,
+                    "b_last_error": f"{type(erro).__name__}: {erro}"[:1000],
+                }])
+                return 0
+            logger.warning("Falha no lote de mensalidades (%d jobs), refazendo um por um: %s", len(jobs), erro)
+
+    # Fora da sessão do lote; a tentativa reivindicada continua sendo uma só
+    return sum([await executar_lote([job], shard) for job in jobs])
+
+
+_agendado = None
+
+
+async def ciclo(worker: str = WORKER) -> int:
+    """Uma passada do worker em cada shard: agenda, libera travados, reivindica e processa. Retorna quantos concluíram."""
+    global _agendado
+    hoje = date.today()
+    # Agenda uma vez por mês por processo (a inserção em si é idempotente)
+    agendar = hoje.day >= settings.mensalidade_dia and _agendado != referencia(hoje)
+
+    total = 0
+    for shard, engine_shard in enumerate(async_engines_shards):
+        async with AsyncSession(engine_shard, expire_on_commit=False) as session:
+            if agendar:
+                await agendar_mensalidades(session, hoje)
+                await session.commit()
+
+            await liberar_travados(session)
+            await session.commit()
+            jobs = await reivindicar(session, settings.jobs_lote * settings.jobs_concorrencia, worker)
+
+        if jobs:
+            lotes = [jobs[i:i + settings.jobs_lote] for i in range(0, len(jobs), settings.jobs_lote)]
+            total += sum(await asyncio.gather(*(executar_lote(lote, shard) for lote in lotes)))
+
+    if agendar:
+        _agendado = referencia(hoje)
+    return total
+
+
+_tarefa = None
+_acordar = None
+
+
+async def _loop():
+    while True:
+        try:
+            # Enquanto houver fila, emenda um ciclo no outro
+            while await ciclo():
+                pass
+        except Exception:
+            logger.exception("Erro no ciclo do worker de jobs")
+
+        _acordar.clear()
+        try:
+            await asyncio.wait_for(_acordar.wait(), timeout=settings.jobs_intervalo)
+        except asyncio.TimeoutError:
+            pass
+
+
+def acordar():
+    """Faz o worker deste processo rodar agora (ex.: logo depois de um pedido manual)."""
+    if _acordar is not None:
+        _acordar.set()
+
+
+async def rodar_worker():
+    global _acordar
+    _acordar = asyncio.Event()
+    await _loop()
+
+
+def iniciar():
+    global _tarefa
+    if settings.jobs_habilitados and _tarefa is None:
+        _tarefa = asyncio.get_running_loop().create_task(rodar_worker())
+
+
+async def encerrar():
+    global _tarefa, _acordar
+    if _tarefa is not None:
+        _tarefa.cancel()
+        try:
+            await _tarefa
+        except asyncio.CancelledError:
+            pass
+        _tarefa = None
+        _acordar = None
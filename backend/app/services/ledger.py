@@ -0,0 +1,188 @@
+from decimal import Decimal
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import func
+
+from app.database import insert_do_dialeto
+from app.models.dinheiro import soma_em_reais
+from app.models import Expense, UserExpense, ResidentPurchase, CashTransaction, UserBalance, RepublicBalance
+from app.models.finance import CashboxCarryForward
+from app.services.versoes import incrementar_versao
+
+ZERO = Decimal(0)
+
+
+async def ajustar_em_lote(session: AsyncSession, modelo, chave, deltas: dict):
+    """
+    Upsert em lote: INSERT ... ON CONFLICT (chave) DO UPDATE SET col = col + excluded.col.
+    Um único executemany, atômico no banco, cria a linha que faltar e soma os
+    deltas sem perder incrementos concorrentes.
+    chave: nome da coluna, ou tupla de nomes para chave composta (aí as chaves de
+    `deltas` também são tuplas).
+    """
+    if not deltas:
+        return
+    tabela = modelo.__table__
+    chaves = (chave,) if isinstance(chave, str) else tuple(chave)
+    campos = [c.name for c in tabela.columns if c.name not in chaves]
+    linhas = [
+        {**dict(zip(chaves, id_ if len(chaves) > 1 else (id_,))), **{campo: valores.get(campo, ZERO) for campo in campos}}
+        for id_, valores in deltas.items()
+    ]
+    stmt = insert_do_dialeto(session, tabela)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(chaves),
+        set_={campo: tabela.c[campo] + stmt.excluded[campo] for campo in campos},
+    )
+    await session.exec(stmt, params=linhas)
+
+
+async def ajustar_saldos_usuarios(session: AsyncSession, deltas: dict):
+    """
+    deltas: {user_id: {"open_debts": x, "open_credits": y}} (campos ausentes valem 0).
+    Não faz commit: o ajuste entra na mesma transação da escrita que o originou.
+    """
+    await ajustar_em_lote(session, UserBalance, "user_id", deltas)
+
+
+async def ajustar_saldos_republicas(session: AsyncSession, deltas: dict):
+    """deltas: {republic_id: {"cashbox_in": x, "cashbox_out": y, "total_expenses": z}}."""
+    await ajustar_em_lote(session, RepublicBalance, "republic_id", deltas)
+
+
+async def ajustar_saldo_usuario(session: AsyncSession, user_id: int, debitos: Decimal = ZERO, creditos: Decimal = ZERO):
+    """Soma os deltas no saldo consolidado de um usuário."""
+    await ajustar_saldos_usuarios(session, {user_id: {"open_debts": debitos, "open_credits": creditos}})
+
+
+async def ajustar_saldo_republica(session: AsyncSession, republic_id: int, entradas: Decimal = ZERO, saidas: Decimal = ZERO, despesas: Decimal = ZERO):
+    """Mesma ideia do ajuste de usuário, para os totais da república."""
+    await ajustar_saldos_republicas(session, {republic_id: {"cashbox_in": entradas, "cashbox_out": saidas, "total_expenses": despesas}})
+
+
+def _saldos_em_aberto(user_ids=None):
+    debitos = (
+        select(UserExpense.user_id, soma_em_reais(func.sum(UserExpense.value - UserExpense.paid_amount)))
+        .where(UserExpense.is_paid == False)
+        .group_by(UserExpense.user_id)
+    )
+    creditos = (
+        select(ResidentPurchase.user_id, func.sum(ResidentPurchase.amount))
+        .where(ResidentPurchase.is_settled == False)
+        .group_by(ResidentPurchase.user_id)
+    )
+    if user_ids is not None:
+        debitos = debitos.where(UserExpense.user_id.in_(user_ids))
+        creditos = creditos.where(ResidentPurchase.user_id.in_(user_ids))
+    return debitos, creditos
+
+
+async def calcular_saldos_usuarios(session: AsyncSession, user_ids=None):
+    """{user_id: {"open_debts": x, "open_credits": y}} recalculado das tabelas brutas (None = todos)."""
+    debitos, creditos = _saldos_em_aberto(user_ids)
+    usuarios = {}
+    for user_id, total in (await session.exec(debitos)).all():
+        usuarios.setdefault(user_id, {"open_debts": ZERO, "open_credits": ZERO})["open_debts"] = total or ZERO
+    for user_id, total in (await session.exec(creditos)).all():
+        usuarios.setdefault(user_id, {"open_debts": ZERO, "open_credits": ZERO})["open_credits"] = total or ZERO
+    return usuarios
+
+
+async def recalcular_saldos_usuarios(session: AsyncSession, user_ids):
+    """
+    Sobrescreve o saldo consolidado desses usuários com o valor recalculado (ex.: depois
+    de mover uma república de shard, app/services/shards.py). Não faz commit.
+    """
+    ids = sorted(set(user_ids))
+    if not ids:
+        return
+    usuarios = await calcular_saldos_usuarios(session, ids)
+    tabela = UserBalance.__table__
+    stmt = insert_do_dialeto(session, tabela)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={"open_debts": stmt.excluded.open_debts, "open_credits": stmt.excluded.open_credits},
+    )
+    await session.exec(stmt, params=[
+        {"user_id": user_id, **usuarios.get(user_id, {"open_debts": ZERO, "open_credits": ZERO})}
+        for user_id in ids
+    ])
+
+
+async def calcular_saldos(session: AsyncSession):
+    """
+    Recalcula os saldos a partir das tabelas brutas.
+    Usa um GROUP BY por tabela (e não uma consulta por usuário), então o custo
+    é o mesmo para uma ou mil repúblicas.
+    """
+    usuarios = await calcular_saldos_usuarios(session)
+
+    republicas = {}
+    for rep_id, tipo, total in (await session.exec(
+        select(CashTransaction.republic_id, CashTransaction.type, func.sum(CashTransaction.amount))
+        .group_by(CashTransaction.republic_id, CashTransaction.type)
+    )).all():
+        campo = "cashbox_in" if tipo == "in" else "cashbox_out"
+        republicas.setdefault(rep_id, {"cashbox_in": ZERO, "cashbox_out": ZERO, "total_expenses": ZERO})[campo] = total or ZERO
+
+    # Movimentações já arquivadas (app/services/arquivo.py) entram pelo saldo transportado
+    for rep_id, entradas, saidas in (await session.exec(
+        select(CashboxCarryForward.republic_id, func.sum(CashboxCarryForward.cashbox_in), func.sum(CashboxCarryForward.cashbox_out))
+        .group_by(CashboxCarryForward.republic_id)
+    )).all():
+        saldo = republicas.setdefault(rep_id, {"cashbox_in": ZERO, "cashbox_out": ZERO, "total_expenses": ZERO})
+        saldo["cashbox_in"] += entradas or ZERO
+        saldo["cashbox_out"] += saidas or ZERO
+
+    for rep_id, total in (await session.exec(
+        select(Expense.republic_id, func.sum(Expense.amount)).group_by(Expense.republic_id)
+    )).all():
+        republicas.setdefault(rep_id, {"cashbox_in": ZERO, "cashbox_out": ZERO, "total_expenses": ZERO})["total_expenses"] = total or ZERO
+
+    return usuarios, republicas
+
+
+async def verificar_saldos(session: AsyncSession, corrigir: bool = False):
+    """
+    Compara o ledger com os valores recalculados e devolve a lista de divergências.
+    Com corrigir=True, sobrescreve o ledger com os valores recalculados (rebuild).
+    """
+    usuarios, republicas = await calcular_saldos(session)
+    divergencias = []
+
+    salvos = {s.user_id: s for s in (await session.exec(select(UserBalance))).all()}
+    for user_id in set(usuarios) | set(salvos):
+        esperado = usuarios.get(user_id, {"open_debts": ZERO, "open_credits": ZERO})
+        saldo = salvos.get(user_id) or UserBalance(user_id=user_id)
+        for campo, valor in esperado.items():
+            atual = getattr(saldo, campo) or ZERO
+            # Centavos inteiros: qualquer diferença é divergência de verdade
+            if atual != valor:
+                divergencias.append({"tabela": "userbalance", "id": user_id, "campo": campo, "ledger": atual, "calculado": valor})
+            if corrigir:
+                setattr(saldo, campo, valor)
+        if corrigir:
+            session.add(saldo)
+
+    salvos = {s.republic_id: s for s in (await session.exec(select(RepublicBalance))).all()}
+    for rep_id in set(republicas) | set(salvos):
+        esperado = republicas.get(rep_id, {"cashbox_in": ZERO, "cashbox_out": ZERO, "total_expenses": ZERO})
+        saldo = salvos.get(rep_id) or RepublicBalance(republic_id=rep_id)
+        for campo, valor in esperado.items():
+            atual = getattr(saldo, campo) or ZERO
+            # Centavos inteiros: qualquer diferença é divergência de verdade
+            if atual != valor:
+                divergencias.append({"tabela": "republicbalance", "id": rep_id, "campo": campo, "ledger": atual, "calculado": valor})
+            if corrigir:
+                setattr(saldo, campo, valor)
+        if corrigir:
+            session.add(saldo)
+
+    if corrigir:
+        if divergencias:
+            # Os saldos mudaram por fora das rotas: invalida os ETags de todas as repúblicas
+            await incrementar_versao(session)
+        await session.commit()
+
+    return divergencias
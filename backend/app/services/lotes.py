@@ -0,0 +1,158 @@
+"""
+Escritas em lote: várias compras, movimentações de caixa ou aluguéis numa requisição.
+
+Pensado para importar um mês de notas ou um extrato bancário e para o app, depois de
+ficar offline, descarregar a fila inteira de uma vez. Cada função:
+
+- valida os itens (validar_*) e separa os rejeitados (com o motivo), sem abortar os demais;
+- confere todos os usuários citados com uma única consulta de pertencimento;
+- grava os aceitos (gravar_*) com um INSERT/UPDATE em lote e ajusta o ledger uma vez só.
+
+Nenhuma faz commit: a rota decide (e, no modo atômico, não grava nada se algo foi rejeitado).
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import bindparam, insert, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import CashTransaction, ResidentPurchase, User
+from app.services import resumos
+from app.services.ledger import ajustar_saldos_republicas, ajustar_saldos_usuarios
+
+TIPOS_CAIXA = ("in", "out")
+
+
+def resultado(indice: int, status: str, id: Optional[int] = None, erro: Optional[str] = None) -> dict:
+    return {"indice": indice, "status": status, "id": id, "erro": erro}
+
+
+async def membros_da_republica(session: AsyncSession, republic_id: int, user_ids: Iterable[int]) -> Set[int]:
+    """Quais desses usuários moram na república (uma consulta para o lote todo)."""
+    ids = set(user_ids)
+    if not ids:
+        return set()
+    return set((await session.exec(
+        select(User.id).where(User.id.in_(ids), User.republic_id == republic_id)
+    )).all())
+
+
+async def _inserir(session: AsyncSession, tabela, linhas: List[dict]) -> List[int]:
+    # executemany com RETURNING; sort_by_parameter_order garante os ids na ordem das linhas
+    if not linhas:
+        return []
+    return list((await session.exec(
+        insert(tabela).returning(tabela.c.id, sort_by_parameter_order=True),
+        params=linhas,
+    )).scalars())
+
+
+async def validar_compras(session: AsyncSession, autor: User, itens, pode_lancar_para_outros: bool):
+    """
+    Compras de moradores. Sem user_id, a compra é do próprio autor; lançar para outro
+    morador exige ser admin de finanças. Devolve (resultados, linhas a gravar).
+    """
+    republic_id = autor.republic_id
+    membros = await membros_da_republica(session, republic_id, {item.user_id for item in itens if item.user_id is not None})
+
+    resultados = [None] * len(itens)
+    aceitos = []
+    for indice, item in enumerate(itens):
+        dono = item.user_id if item.user_id is not None else autor.id
+        if dono != autor.id and not pode_lancar_para_outros:
+            resultados[indice] = resultado(indice, "rejeitado", erro="Somente administradores de finanças podem lançar compras de outros moradores.")
+        elif dono != autor.id and dono not in membros:
+            resultados[indice] = resultado(indice, "rejeitado", erro="Usuário não pertence à república.")
+        elif item.value <= 0:
+            resultados[indice] = resultado(indice, "rejeitado", erro="O valor deve ser positivo.")
+        else:
+            aceitos.append((indice, {
+                "description": item.description, "amount": item.value,
+                "purchase_date": item.purchase_date or date.today(), "is_settled": False,
+                "user_id": dono, "republic_id": republic_id,
+            }))
+    return resultados, aceitos
+
+
+async def gravar_compras(session: AsyncSession, resultados: list, aceitos: list):
+    ids = await _inserir(session, ResidentPurchase.__table__, [linha for _, linha in aceitos])
+    creditos = defaultdict(lambda: {"open_credits": 0})
+    mensais = resumos.novos_deltas()
+    for (indice, linha), id_ in zip(aceitos, ids):
+        resultados[indice] = resultado(indice, "criado", id=id_)
+        creditos[linha["user_id"]]["open_credits"] += linha["amount"]
+        resumos.acumular(mensais, linha["republic_id"], linha["purchase_date"], resumos.CATEGORIA_GERAL, "purchases", linha["amount"])
+    await ajustar_saldos_usuarios(session, creditos)
+    await resumos.ajustar_resumos(session, mensais)
+
+
+def validar_transacoes(republic_id: int, itens):
+    """Movimentações do caixa. Devolve (resultados, linhas a gravar)."""
+    resultados = [None] * len(itens)
+    aceitos = []
+    for indice, item in enumerate(itens):
+        if item.type not in TIPOS_CAIXA:
+            resultados[indice] = resultado(indice, "rejeitado", erro="Tipo de transação inválido. Use 'in' ou 'out'.")
+        elif item.amount <= 0:
+            resultados[indice] = resultado(indice, "rejeitado", erro="O valor deve ser positivo.")
+        else:
+            aceitos.append((indice, {
+                "description": item.description, "amount": item.amount,
+                "transaction_date": item.transaction_date or date.today(), "type": item.type,
+                "republic_id": republic_id,
+            }))
+    return resultados, aceitos
+
+
+async def gravar_transacoes(session: AsyncSession, republic_id: int, resultados: list, aceitos: list):
+    ids = await _inserir(session, CashTransaction.__table__, [linha for _, linha in aceitos])
+    totais = {"cashbox_in": 0, "cashbox_out": 0}
+    mensais = resumos.novos_deltas()
+    for (indice, linha), id_ in zip(aceitos, ids):
+        resultados[indice] = resultado(indice, "criado", id=id_)
+        campo = "cashbox_in" if linha["type"] == "in" else "cashbox_out"
+        totais[campo] += linha["amount"]
+        resumos.acumular(mensais, republic_id, linha["transaction_date"], resumos.CATEGORIA_GERAL, campo, linha["amount"])
+    if aceitos:
+        await ajustar_saldos_republicas(session, {republic_id: totais})
+        await resumos.ajustar_resumos(session, mensais)
+
+
+async def validar_alugueis(session: AsyncSession, republic_id: int, itens):
+    """Aluguéis fixos. Devolve (resultados, {user_id: aluguel} a gravar); o último valor de um usuário vale."""
+    membros = await membros_da_republica(session, republic_id, {item.user_id for item in itens})
+    resultados = [None] * len(itens)
+    aceitos: Dict[int, tuple] = {}
+    for indice, item in enumerate(itens):
+        if item.user_id not in membros:
+            resultados[indice] = resultado(indice, "rejeitado", erro="Usuário não pertence à república.")
+        elif item.fixed_rent < 0:
+            resultados[indice] = resultado(indice, "rejeitado", erro="O aluguel não pode ser negativo.")
+        else:
+            anterior = aceitos.get(item.user_id)
+            if anterior is not None:
+                resultados[anterior[0]] = resultado(anterior[0], "substituido", id=item.user_id)
+            aceitos[item.user_id] = (indice, item.fixed_rent)
+    return resultados, aceitos
+
+
+async def gravar_alugueis(session: AsyncSession, resultados: list, aceitos: Dict[int, tuple]):
+    if not aceitos:
+        return
+    tabela = User.__table__
+    # Um UPDATE em lote (executemany) em vez de um session.get + UPDATE por morador
+    await session.exec(
+        update(tabela).where(tabela.c.id == bindparam("b_id")).values(fixed_rent=bindparam("b_fixed_rent"), sync_seq=None),
+        params=[{"b_id": user_id, "b_fixed_rent": aluguel} for user_id, (_, aluguel) in aceitos.items()],
+    )
+    for user_id, (indice, _) in aceitos.items():
+        resultados[indice] = resultado(indice, "atualizado", id=user_id)
+
+
+def marcar_nao_aplicados(resultados: list):
+    """Modo atômico com rejeições: os itens válidos também não são gravados."""
+    for indice, item in enumerate(resultados):
+        if item is None:
+            resultados[indice] = resultado(indice, "nao_aplicado")
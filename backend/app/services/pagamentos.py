@@ -0,0 +1,138 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import bindparam, insert, update
+
+from app.models import Expense, UserExpense
+from app.models.dinheiro import para_centavos, para_reais
+from app.models.finance import PaymentHistory, UserExpenseArchive
+from app.services import resumos
+from app.services.ledger import ajustar_saldos_usuarios
+
+
+class ConflitoDePagamento(Exception):
+    """Outra transação alterou alguma das fatias entre a leitura e a escrita."""
+
+
+async def alocar_pagamento(
+    session: AsyncSession,
+    valor: Decimal,
+    confirmado_por_id: int,
+    republic_id: int,
+    user_expense_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+):
+    """
+    Distribui o pagamento nas fatias em aberto, da mais antiga para a mais nova.
+
+    - Toda a conta é feita em centavos inteiros: a fatia só fica quitada quando
+      faltam exatamente 0 centavos.
+    - As fatias são lidas com SELECT ... FOR UPDATE (PostgreSQL). No SQLite, que não
+      tem lock de linha, o UPDATE exige a mesma `version` lida; se outra transação
+      pagou antes, nenhuma linha bate e ConflitoDePagamento é levantado para o
+      chamador desfazer e tentar de novo.
+    - As fatias e os recibos (PaymentHistory) são gravados em lote.
+
+    Não faz commit. Retorna a sobra em reais.
+    """
+    # A categoria da despesa vem junto, para os resumos mensais de pagamentos
+    statement = (
+        select(UserExpense, Expense.category)
+        .join(Expense, Expense.id == UserExpense.expense_id)
+        .where(Expense.republic_id == republic_id, UserExpense.is_paid == False)
+        .order_by(UserExpense.id)
+        .with_for_update(of=UserExpense)
+    )
+
+    # --- CAMINHO A: Pagar um item específico ---
+    if user_expense_id:
+        dividas = (await session.exec(statement.where(UserExpense.id == user_expense_id))).all()
+        if not dividas:
+            # Fatias quitadas podem já estar no arquivo (app/services/arquivo.py); só as da
+            # própria república, para não revelar se a fatia de outra existe
+            for modelo in (UserExpense, UserExpenseArchive):
+                quitada = (await session.exec(
+                    select(modelo.is_paid).where(modelo.id == user_expense_id, modelo.republic_id == republic_id)
+                )).first()
+                if quitada is not None:
+                    break
+            if quitada:
+                raise HTTPException(status_code=400, detail="Esta conta já está quitada.")
+            raise HTTPException(status_code=404, detail="Dívida não encontrada.")
+
+    # --- CAMINHO B: Pagamento Inteligente (Distribuição) ---
+    elif user_id:
+        dividas = (await session.exec(statement.where(UserExpense.user_id == user_id))).all()
+        if not dividas:
+            raise HTTPException(status_code=400, detail="Este usuário não possui dívidas pendentes.")
+
+    else:
+        raise HTTPException(status_code=400, detail="Informe o ID da dívida ou o ID do usuário.")
+
+    disponivel = para_centavos(valor)
+    fatias = []
+    recibos = []
+    debitos = defaultdict(Decimal)
+    mensais = resumos.novos_deltas()
+    hoje = date.today()
+
+    for conta, categoria in dividas:
+        if disponivel <= 0:
+            break
+
+        valor_centavos = para_centavos(conta.value)
+        pago_centavos = para_centavos(conta.paid_amount)
+        pagar_agora = min(disponivel, valor_centavos - pago_centavos)
+        if pagar_agora <= 0:
+            continue
+
+        pago_centavos += pagar_agora
+        quitada = pago_centavos == valor_centavos
+        novo_pago = para_reais(pago_centavos)
+
+        fatias.append({
+            "b_id": conta.id,
+            "b_version": conta.version,
+            "b_paid_amount": novo_pago,
+            "b_is_paid": quitada,
+        })
+        recibos.append({
+            "user_expense_id": conta.id,
+            "amount": para_reais(pagar_agora),
+            "confirmed_by_id": confirmado_por_id,
+            "republic_id": republic_id,
+            "payment_date": hoje,
+        })
+        debitos[conta.user_id] -= para_reais(pagar_agora)
+        resumos.acumular(mensais, republic_id, hoje, categoria, "payments", para_reais(pagar_agora))
+        disponivel -= pagar_agora
+
+    if fatias:
+        tabela = UserExpense.__table__
+        resultado = await session.exec(
+            update(tabela)
+            .where(tabela.c.id == bindparam("b_id"), tabela.c.version == bindparam("b_version"))
+            .values(
+                paid_amount=bindparam("b_paid_amount"), is_paid=bindparam("b_is_paid"),
+                version=tabela.c.version + 1, sync_seq=None,
+            ),
+            params=fatias,
+        )
+        dialeto = session.bind.dialect
+        if dialeto.supports_sane_multi_rowcount and resultado.rowcount != len(fatias):
+            raise ConflitoDePagamento()
+
+        await session.exec(insert(PaymentHistory.__table__), params=recibos)
+        await ajustar_saldos_usuarios(session, {uid: {"open_debts": v} for uid, v in debitos.items()})
+        await resumos.ajustar_resumos(session, mensais)
+
+    # Os objetos lidos acima ficaram desatualizados pelo UPDATE em lote
+    for conta, _ in dividas:
+        session.expunge(conta)
+
+    return para_reais(disponivel)
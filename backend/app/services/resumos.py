@@ -0,0 +1,164 @@
+"""
+Resumos mensais para os relatórios.
+
+MonthlyRollup guarda, por república/mês/categoria, os totais de despesas, pagamentos,
+compras de moradores e entradas/saídas do caixa. Como o ledger, é mantido nas próprias
+escritas (mesma transação, upsert em lote somando os deltas), então um relatório mensal
+ou anual é uma leitura por faixa da chave primária em vez de somar o histórico inteiro.
+
+calcular_resumos() refaz os totais a partir das tabelas brutas; verificar_resumos() é a
+base de `python manage.py resumos verificar|reconstruir`.
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, func, insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import CashTransaction, Expense, ResidentPurchase, UserExpense
+from app.models.finance import CashboxCarryForward, MonthlyRollup, PaymentHistory, PaymentHistoryArchive, UserExpenseArchive
+from app.services.ledger import ZERO, ajustar_em_lote
+
+CATEGORIA_GERAL = "geral" # compras de moradores e caixa, que não têm categoria
+CAMPOS = ("expenses", "payments", "purchases", "cashbox_in", "cashbox_out")
+CHAVE = ("republic_id", "month", "category")
+
+
+def mes(data) -> str:
+    # date no PostgreSQL, texto "AAAA-MM-DD" no SQLite
+    return str(data)[:7]
+
+
+def novos_deltas():
+    """{(republic_id, "AAAA-MM", categoria): {campo: valor}}, acumulados com acumular()."""
+    return defaultdict(lambda: defaultdict(Decimal))
+
+
+def acumular(deltas, republic_id: int, data, categoria: str, campo: str, valor: Decimal):
+    deltas[(republic_id, mes(data), categoria)][campo] += valor
+
+
+async def ajustar_resumos(session: AsyncSession, deltas: dict):
+    """Soma os deltas nos resumos. Não faz commit: entra na transação da escrita."""
+    await ajustar_em_lote(session, MonthlyRollup, CHAVE, deltas)
+
+
+async def registrar(session: AsyncSession, republic_id: int, data, categoria: str, campo: str, valor: Decimal):
+    """Atalho para uma escrita só (ex.: uma compra, uma movimentação do caixa)."""
+    deltas = novos_deltas()
+    acumular(deltas, republic_id, data, categoria, campo, valor)
+    await ajustar_resumos(session, deltas)
+
+
+# --- Relatórios ---
+
+AGRUPAMENTOS = {
+    "mes": (MonthlyRollup.month,),
+    "categoria": (MonthlyRollup.category,),
+    "mes_categoria": (MonthlyRollup.month, MonthlyRollup.category),
+}
+
+
+async def relatorio(session: AsyncSession, republic_id: int, de: str, ate: str, por: str) -> List[dict]:
+    """Totais entre os meses `de` e `ate` (inclusive, "AAAA-MM"), agrupados por mês, categoria ou ambos."""
+    colunas = AGRUPAMENTOS[por]
+    linhas = (await session.exec(
+        select(*colunas, *(func.sum(getattr(MonthlyRollup, campo)) for campo in CAMPOS))
+        .where(MonthlyRollup.republic_id == republic_id, MonthlyRollup.month >= de, MonthlyRollup.month <= ate)
+        .group_by(*colunas)
+        .order_by(*colunas)
+    )).all()
+
+    nomes = [coluna.key for coluna in colunas]
+    return [
+        {**dict(zip(nomes, linha[:len(nomes)])), **{campo: valor or ZERO for campo, valor in zip(CAMPOS, linha[len(nomes):])}}
+        for linha in linhas
+    ]
+
+
+def totais(linhas: List[dict]) -> Dict[str, Decimal]:
+    return {campo: sum((linha[campo] for linha in linhas), ZERO) for campo in CAMPOS}
+
+
+# --- Reconstrução ---
+
+async def calcular_resumos(session: AsyncSession) -> Dict[Tuple[int, str, str], Dict[str, Decimal]]:
+    """
+    Recalcula os resumos a partir das tabelas brutas: um GROUP BY por tabela, por dia
+    (agrupar por dia em vez de por mês evita funções de data diferentes em cada banco).
+    """
+    deltas = novos_deltas()
+
+    for rep_id, dia, categoria, total in (await session.exec(
+        select(Expense.republic_id, Expense.due_date, Expense.category, func.sum(Expense.amount))
+        .group_by(Expense.republic_id, Expense.due_date, Expense.category)
+    )).all():
+        acumular(deltas, rep_id, dia, categoria, "expenses", total)
+
+    # Pagamentos quentes e arquivados (app/services/arquivo.py)
+    for pagamento, fatia in ((PaymentHistory, UserExpense), (PaymentHistoryArchive, UserExpenseArchive)):
+        for rep_id, dia, categoria, total in (await session.exec(
+            select(pagamento.republic_id, pagamento.payment_date, Expense.category, func.sum(pagamento.amount))
+            .join(fatia, fatia.id == pagamento.user_expense_id)
+            .join(Expense, Expense.id == fatia.expense_id)
+            .group_by(pagamento.republic_id, pagamento.payment_date, Expense.category)
+        )).all():
+            acumular(deltas, rep_id, dia, categoria, "payments", total)
+
+    for rep_id, dia, total in (await session.exec(
+        select(ResidentPurchase.republic_id, ResidentPurchase.purchase_date, func.sum(ResidentPurchase.amount))
+        .group_by(ResidentPurchase.republic_id, ResidentPurchase.purchase_date)
+    )).all():
+        acumular(deltas, rep_id, dia, CATEGORIA_GERAL, "purchases", total)
+
+    for rep_id, dia, tipo, total in (await session.exec(
+        select(CashTransaction.republic_id, CashTransaction.transaction_date, CashTransaction.type, func.sum(CashTransaction.amount))
+        .group_by(CashTransaction.republic_id, CashTransaction.transaction_date, CashTransaction.type)
+    )).all():
+        acumular(deltas, rep_id, dia, CATEGORIA_GERAL, "cashbox_in" if tipo == "in" else "cashbox_out", total)
+
+    # Caixa arquivado: o saldo transportado já vem por mês
+    for rep_id, mes_arquivado, entradas, saidas in (await session.exec(
+        select(CashboxCarryForward.republic_id, CashboxCarryForward.month, CashboxCarryForward.cashbox_in, CashboxCarryForward.cashbox_out)
+    )).all():
+        acumular(deltas, rep_id, mes_arquivado, CATEGORIA_GERAL, "cashbox_in", entradas)
+        acumular(deltas, rep_id, mes_arquivado, CATEGORIA_GERAL, "cashbox_out", saidas)
+
+    return deltas
+
+
+async def verificar_resumos(session: AsyncSession, corrigir: bool = False):
+    """
+    Compara os resumos gravados com os recalculados e devolve as divergências.
+    Com corrigir=True, regrava a tabela inteira com os valores recalculados.
+    """
+    esperados = await calcular_resumos(session)
+    salvos = {
+        (r.republic_id, r.month, r.category): r
+        for r in (await session.exec(select(MonthlyRollup))).all()
+    }
+
+    divergencias = []
+    for chave in set(esperados) | set(salvos):
+        esperado = esperados.get(chave, {})
+        salvo = salvos.get(chave)
+        for campo in CAMPOS:
+            atual = getattr(salvo, campo) if salvo else ZERO
+            valor = esperado.get(campo, ZERO)
+            if atual != valor:
+                divergencias.append({"tabela": "monthlyrollup", "id": "/".join(map(str, chave)), "campo": campo, "ledger": atual, "calculado": valor})
+
+    if corrigir:
+        await session.exec(delete(MonthlyRollup))
+        linhas = [
+            {**dict(zip(CHAVE, chave)), **{campo: valores.get(campo, ZERO) for campo in CAMPOS}}
+            for chave, valores in esperados.items()
+        ]
+        if linhas:
+            await session.exec(insert(MonthlyRollup.__table__), params=linhas)
+        await session.commit()
+
+    return divergencias
@@ -0,0 +1,255 @@
+"""
+Cópias do diretório nos shards e troca de shard de uma república (rebalanceamento).
+
+O roteamento fica em app/core/shards.py. Aqui:
+
+- espelhar_moradores(): copia para o shard a linha da república e as dos usuários citados
+  (moradores e ex-moradores com fatias, compras ou pagamentos lá), sem a senha, que só
+  existe no diretório. Chamado pelas rotas de moradores depois de gravar no diretório.
+- mover_republica(): base de `python manage.py shards mover <república> <shard>`.
+  1. marca shard_moving no diretório e espera o cache dos outros processos expirar
+     (a partir daí as rotas da república respondem 503);
+  2. copia as linhas da república para o destino, com ids novos (cada shard tem suas
+     próprias sequências), na ordem das chaves estrangeiras;
+  3. aponta o diretório para o destino e tira a marca;
+  4. apaga as linhas da origem e recalcula o ledger dos usuários envolvidos nos dois shards.
+  Se algo falhar antes do passo 3, o destino é desfeito e a república continua na origem.
+
+Como os ids mudam, o destino recebe data_version e sync_floor novos: os cursores do /sync
+anteriores à troca recomeçam com uma carga completa, e os ETags antigos deixam de casar.
+As remoções do /sync (SyncTombstone) não são copiadas (a carga completa já não tem as
+linhas removidas) e nem as Idempotency-Key (um reenvio depois da troca é processado de novo).
+As linhas arquivadas (app/services/arquivo.py) chegam ao destino como quentes, sem saldo
+transportado; o próximo arquivamento do destino as devolve ao arquivo.
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, List
+
+from sqlalchemy import delete, insert, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.shards import invalidar_republica, total_de_shards
+from app.database import async_engine, async_engines_shards, insert_do_dialeto
+from app.models import CashTransaction, Expense, Job, Republic, RepublicBalance, ResidentPurchase, SyncTombstone, User, UserExpense
+from app.models.finance import CashboxCarryForward, ExpenseTemplate, MonthlyRollup, PaymentHistory
+from app.services.arquivo import ARQUIVOS
+from app.services.ledger import recalcular_saldos_usuarios
+
+logger = logging.getLogger(__name__)
+
+# Tabelas com dados da república, na ordem das chaves estrangeiras (apagar = ordem inversa),
+# com as colunas que apontam para ids de outra tabela copiada
+TABELAS = [
+    (ExpenseTemplate.__table__, {}),
+    (Expense.__table__, {"template_id": "expensetemplate"}),
+    (UserExpense.__table__, {"expense_id": "expense"}),
+    (PaymentHistory.__table__, {"user_expense_id": "userexpense"}),
+    (ResidentPurchase.__table__, {}),
+    (CashTransaction.__table__, {}),
+    (Job.__table__, {}),
+    (RepublicBalance.__table__, {}),
+    (MonthlyRollup.__table__, {}),
+]
+# Não copiadas, só apagadas da origem (as linhas arquivadas vão junto com as quentes, em _ler;
+# o saldo transportado deixa de valer porque no destino elas voltam a ser quentes)
+DESCARTADAS = [SyncTombstone.__table__, CashboxCarryForward.__table__, *reversed(list(ARQUIVOS.values()))]
+
+
+async def espelhar_moradores(diretorio: AsyncSession, sessao_rep: AsyncSession, shard: int, republic_id: int, user_ids: Iterable[int]):
+    """
+    Copia (upsert) a república e esses usuários do diretório para o shard. Na cópia, o
+    usuário só fica com republic_id se a república dele também estiver neste shard; a
+    república espelhada conta como estando aqui (no meio de uma troca ela ainda não está).
+    No shard 0 não faz nada: lá as linhas são as do diretório. Não faz commit.
+    """
+    if shard == 0:
+        return
+
+    republica = await diretorio.get(Republic, republic_id)
+    if republica is not None:
+        stmt = insert_do_dialeto(sessao_rep, Republic.__table__).values(
+            id=republica.id, name=republica.name, address=republica.address,
+            invite_code=republica.invite_code, shard=shard,
+        )
+        await sessao_rep.exec(stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={"name": stmt.excluded.name, "address": stmt.excluded.address, "invite_code": stmt.excluded.invite_code},
+        ))
+
+    ids = sorted(set(user_ids))
+    if not ids:
+        return
+    usuarios = (await diretorio.exec(
+        select(User.id, User.name, User.email, User.fixed_rent, User.role_tag, User.republic_id, Republic.shard)
+        .outerjoin(Republic, Republic.id == User.republic_id)
+        .where(User.id.in_(ids))
+    )).all()
+
+    linhas = [
+        {
+            "id": user_id, "name": nome, "email": email, "hashed_password": "", "fixed_rent": aluguel, "role_tag": cargo,
+            "republic_id": rep_id if rep_id == republic_id or shard_da_rep == shard else None,
+            "sync_seq": None,
+        }
+        for user_id, nome, email, aluguel, cargo, rep_id, shard_da_rep in usuarios
+    ]
+    stmt = insert_do_dialeto(sessao_rep, User.__table__)
+    await sessao_rep.exec(
+        stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={campo: stmt.excluded[campo] for campo in ("name", "email", "fixed_rent", "role_tag", "republic_id", "sync_seq")},
+        ),
+        params=linhas,
+    )
+
+
+async def usuarios_citados(sessao_rep: AsyncSession, republic_id: int) -> List[int]:
+    """Usuários que as linhas da república referenciam no shard (moradores atuais ou não)."""
+    ids = set()
+    for coluna, filtro in (
+        (UserExpense.user_id, UserExpense.republic_id),
+        (ResidentPurchase.user_id, ResidentPurchase.republic_id),
+        (PaymentHistory.confirmed_by_id, PaymentHistory.republic_id),
+        (User.id, User.republic_id),
+    ):
+        ids.update((await sessao_rep.exec(select(coluna).where(filtro == republic_id).distinct())).all())
+    return sorted(ids)
+
+
+async def _ler(sessao: AsyncSession, tabela, republic_id: int) -> List[dict]:
+    chave = tabela.c.id if "id" in tabela.c else tabela.c.republic_id
+    resultado = await sessao.exec(select(*tabela.columns).where(tabela.c.republic_id == republic_id).order_by(chave))
+    linhas = [dict(linha._mapping) for linha in resultado.all()]
+    arquivo = ARQUIVOS.get(tabela)
+    if arquivo is not None:
+        # Mesmas colunas e ids da tabela quente: no destino, voltam a ser linhas quentes
+        resultado = await sessao.exec(select(*arquivo.columns).where(arquivo.c.republic_id == republic_id))
+        linhas = sorted(linhas + [dict(linha._mapping) for linha in resultado.all()], key=lambda linha: linha["id"])
+    return linhas
+
+
+async def _apagar(sessao: AsyncSession, republic_id: int):
+    for tabela in [*DESCARTADAS, *reversed([tabela for tabela, _ in TABELAS])]:
+        await sessao.exec(delete(tabela).where(tabela.c.republic_id == republic_id))
+
+
+async def apagar_republica(sessao: AsyncSession, republic_id: int, shard: int):
+    """
+    Apaga do shard os dados da república, na ordem das chaves estrangeiras, e recalcula o
+    ledger de quem tinha fatias ou compras nela. Fora do shard 0 a cópia da república sai
+    junto; os usuários copiados ficam (outras repúblicas de lá podem citá-los). Não faz commit.
+    """
+    user_ids = await usuarios_citados(sessao, republic_id)
+    await _apagar(sessao, republic_id)
+    if shard != 0:
+        await sessao.exec(update(User).where(User.republic_id == republic_id).values(republic_id=None))
+        await sessao.exec(delete(Republic).where(Republic.id == republic_id))
+    await recalcular_saldos_usuarios(sessao, user_ids)
+
+
+async def _copiar(sessao: AsyncSession, tabela, linhas: List[dict], trocas: Dict[str, str], novos_ids: Dict[str, Dict[int, int]], seq: int):
+    if not linhas:
+        return
+    com_id = "id" in tabela.c
+    copias = []
+    for linha in linhas:
+        copia = dict(linha)
+        if com_id:
+            del copia["id"]
+        for coluna, referenciada in trocas.items():
+            if copia[coluna] is not None:
+                copia[coluna] = novos_ids[referenciada][copia[coluna]]
+        if "sync_seq" in copia:
+            copia["sync_seq"] = seq
+        if tabela.name == "job" and copia["status"] == "executando":
+            # O worker da origem não termina este job no destino: volta para a fila
+            copia.update(status="pendente", locked_by=None, locked_at=None)
+        copias.append(copia)
+
+    if not com_id:
+        await sessao.exec(insert(tabela), params=copias)
+        return
+    ids = (await sessao.exec(
+        insert(tabela).returning(tabela.c.id, sort_by_parameter_order=True), params=copias,
+    )).scalars()
+    novos_ids[tabela.name] = dict(zip((linha["id"] for linha in linhas), ids))
+
+
+async def mover_republica(republic_id: int, destino: int) -> Dict[str, int]:
+    """Move os dados da república para o shard `destino`. Devolve {tabela: linhas copiadas}."""
+    if not 0 <= destino < total_de_shards():
+        raise ValueError(f"Shard {destino} não existe (configurados: 0 a {total_de_shards() - 1}).")
+
+    async with AsyncSession(async_engine, expire_on_commit=False) as diretorio:
+        republica = await diretorio.get(Republic, republic_id)
+        if republica is None:
+            raise ValueError(f"República {republic_id} não encontrada.")
+        if republica.shard_moving:
+            raise ValueError(f"A república {republic_id} já está sendo movida (ou uma troca anterior falhou no meio).")
+        origem = republica.shard
+        if origem == destino:
+            return {}
+
+        republica.shard_moving = True
+        diretorio.add(republica)
+        await diretorio.commit()
+        invalidar_republica(republic_id)
+        # Os outros processos só veem a marca quando o cache deles expira
+        await asyncio.sleep(settings.shards_cache_ttl + 1)
+
+        copiadas = {}
+        try:
+            async with AsyncSession(async_engines_shards[origem]) as sessao:
+                linhas = {tabela.name: await _ler(sessao, tabela, republic_id) for tabela, _ in TABELAS}
+                versao = (await sessao.exec(select(Republic.data_version).where(Republic.id == republic_id))).one() + 1
+                user_ids = await usuarios_citados(sessao, republic_id)
+
+            async with AsyncSession(async_engines_shards[destino]) as sessao:
+                # Restos de uma tentativa anterior que falhou
+                await _apagar(sessao, republic_id)
+                await espelhar_moradores(diretorio, sessao, destino, republic_id, user_ids)
+                novos_ids = {}
+                for tabela, trocas in TABELAS:
+                    await _copiar(sessao, tabela, linhas[tabela.name], trocas, novos_ids, versao)
+                    copiadas[tabela.name] = len(linhas[tabela.name])
+                await sessao.exec(
+                    update(Republic).where(Republic.id == republic_id).values(data_version=versao, sync_floor=versao)
+                )
+                await recalcular_saldos_usuarios(sessao, user_ids)
+                await sessao.commit()
+        except Exception:
+            await diretorio.rollback()
+            await diretorio.exec(update(Republic).where(Republic.id == republic_id).values(shard_moving=False))
+            await diretorio.commit()
+            invalidar_republica(republic_id)
+            raise
+
+        await diretorio.exec(
+            update(Republic).where(Republic.id == republic_id).values(shard=destino, shard_moving=False)
+        )
+        await diretorio.commit()
+        invalidar_republica(republic_id)
+
+    async with AsyncSession(async_engines_shards[origem]) as sessao:
+        await apagar_republica(sessao, republic_id, origem)
+        await sessao.commit()
+
+    logger.info("República %d movida do shard %d para o %d: %s", republic_id, origem, destino, copiadas)
+    return copiadas
+
+
+async def espelhar_tudo() -> int:
+    """Refaz as cópias do diretório em todos os shards (ex.: depois de uma falha entre os dois commits de uma rota)."""
+    total = 0
+    async with AsyncSession(async_engine, expire_on_commit=False) as diretorio:
+        republicas = (await diretorio.exec(select(Republic.id, Republic.shard).where(Republic.shard != 0))).all()
+        for republic_id, shard in republicas:
+            async with AsyncSession(async_engines_shards[shard]) as sessao:
+                moradores = (await diretorio.exec(select(User.id).where(User.republic_id == republic_id))).all()
+                await espelhar_moradores(diretorio, sessao, shard, republic_id, [*moradores, *await usuarios_citados(sessao, republic_id)])
+                await sessao.commit()
+            total += 1
+    return total
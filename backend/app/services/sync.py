@@ -0,0 +1,182 @@
+"""
+Sincronização incremental do app (GET /sync).
+
+A sequência de cada república é a própria Republic.data_version, que já sobe uma vez por
+transação de escrita (incrementar_versao). As tabelas sincronizadas têm a coluna sync_seq
+com a versão em que a linha mudou pela última vez:
+
+- INSERT deixa sync_seq NULL e UPDATE pelo ORM volta a NULL (hooks abaixo; menos quando só
+  mudam colunas fora do /sync, NAO_SINCRONIZADAS); os UPDATE em lote do Core passam
+  sync_seq=None explicitamente;
+- a sessão anota quais tabelas sincronizadas foram escritas e incrementar_versao(), logo
+  depois de subir a versão, carimba com ela as linhas NULL dessas tabelas (carimbar()).
+
+O UPDATE da versão trava a linha da república até o commit, então as escritas de uma
+república são confirmadas na ordem das sequências: quem leu a versão N e todas as linhas
+com sync_seq <= N não perde nada que venha depois. O cliente guarda um cursor (república +
+última sequência) e recebe só as linhas alteradas depois dele, mais as remoções
+(SyncTombstone): o custo acompanha o volume de mudanças, não o tamanho do histórico.
+"""
+import base64
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import flag_modified
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import CashTransaction, Expense, Republic, ResidentPurchase, SyncTombstone, User, UserExpense
+from app.models.finance import PaymentHistory
+
+# Nome da lista na resposta do /sync -> model (o nome também identifica a entidade nas remoções)
+ENTIDADES = {
+    "despesas": Expense,
+    "fatias": UserExpense,
+    "compras": ResidentPurchase,
+    "caixa": CashTransaction,
+    "pagamentos": PaymentHistory,
+    "moradores": User,
+}
+SINCRONIZADAS = {modelo.__table__.name: modelo.__table__ for modelo in (*ENTIDADES.values(), SyncTombstone)}
+PENDENTES = "sync_tabelas_pendentes"
+# Colunas que não vão para o /sync: mudar só elas (ex.: o novo hash da senha no login, que
+# não passa por incrementar_versao) não zera o sync_seq, senão a linha sumiria do /sync
+NAO_SINCRONIZADAS = {User.__table__.name: {"hashed_password"}}
+
+
+# --- Escrita: marcar e carimbar ---
+
+def _anotar(session, nome_tabela: str):
+    session.info.setdefault(PENDENTES, set()).add(nome_tabela)
+
+
+def _linha_alterada(mapper, connection, alvo):
+    # flag_modified: entra no UPDATE mesmo que o valor carregado (ex.: do cache de usuários) já seja None
+    alvo.sync_seq = None
+    flag_modified(alvo, "sync_seq")
+    session = object_session(alvo)
+    if session is not None:
+        _anotar(session, mapper.local_table.name)
+
+
+def _linha_atualizada(mapper, connection, alvo):
+    ignoradas = NAO_SINCRONIZADAS.get(mapper.local_table.name, set())
+    if any(atributo.history.has_changes() for atributo in inspect(alvo).attrs if atributo.key not in ignoradas):
+        _linha_alterada(mapper, connection, alvo)
+
+
+for _modelo in (*ENTIDADES.values(), SyncTombstone):
+    event.listen(_modelo, "before_insert", _linha_alterada)
+    event.listen(_modelo, "before_update", _linha_atualizada)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _escrita_em_lote(estado):
+    # INSERT/UPDATE em lote (session.exec(insert(Tabela), params=[...])) não passam pelos hooks do ORM
+    if estado.is_insert or estado.is_update:
+        nome = estado.statement.table.name
+        if nome in SINCRONIZADAS:
+            _anotar(estado.session, nome)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_soft_rollback")
+def _limpar_pendentes(session, *args):
+    session.info.pop(PENDENTES, None)
+
+
+async def carimbar(session: AsyncSession, republic_ids=None):
+    """
+    Grava a versão atual da república no sync_seq das linhas escritas nesta transação
+    (as que estão NULL). Chamada por incrementar_versao(), depois de subir a versão.
+    """
+    pendentes = session.info.pop(PENDENTES, None)
+    if not pendentes:
+        return
+    for nome in sorted(pendentes):
+        tabela = SINCRONIZADAS[nome]
+        versao = select(Republic.data_version).where(Republic.id == tabela.c.republic_id).scalar_subquery()
+        stmt = update(tabela).where(tabela.c.sync_seq.is_(None)).values(sync_seq=versao)
+        if republic_ids is not None:
+            stmt = stmt.where(tabela.c.republic_id.in_(republic_ids))
+        await session.exec(stmt)
+    # Os próprios UPDATE acima se anotaram como pendentes
+    session.info.pop(PENDENTES, None)
+
+
+def registrar_remocao(session: AsyncSession, republic_id: int, entidade: str, entity_id: int):
+    """A linha deixou de pertencer à república: o /sync avisa o cliente para apagá-la. Não faz commit."""
+    session.add(SyncTombstone(republic_id=republic_id, entity=entidade, entity_id=entity_id))
+
+
+# --- Leitura: mudanças desde o cursor ---
+
+def codificar_cursor(republic_id: int, seq: int) -> str:
+    return base64.urlsafe_b64encode(f"{republic_id}:{seq}".encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Optional[Tuple[int, int]]:
+    """(república, sequência), ou None se o cursor não for válido (o cliente recomeça do zero)."""
+    try:
+        preenchido = cursor + "=" * (-len(cursor) % 4)
+        republic_id, seq = base64.urlsafe_b64decode(preenchido.encode()).decode().split(":")
+        return int(republic_id), int(seq)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+async def _alteradas(session: AsyncSession, modelo, republic_id: int, apos: int, ate: int, limite: Optional[int]):
+    stmt = (
+        select(modelo)
+        .where(modelo.republic_id == republic_id, modelo.sync_seq > apos, modelo.sync_seq <= ate)
+        .order_by(modelo.sync_seq, modelo.id)
+    )
+    if limite is not None:
+        stmt = stmt.limit(limite)
+    return list((await session.exec(stmt)).all())
+
+
+async def mudancas(session: AsyncSession, republic_id: int, cursor: Optional[str], limite: int) -> Dict:
+    """
+    Linhas alteradas e remoções desde o cursor, no máximo ~`limite` por lista. A página
+    termina numa sequência completa (uma transação nunca fica pela metade entre páginas);
+    se uma única sequência passar do limite, ela vem inteira.
+    """
+    atual, piso = (await session.exec(
+        select(Republic.data_version, Republic.sync_floor).where(Republic.id == republic_id)
+    )).one()
+
+    apos, reiniciar = 0, cursor is not None
+    if cursor is not None:
+        decodificado = decodificar_cursor(cursor)
+        # Cursor de outra república (o morador mudou), inválido ou anterior a uma troca de
+        # shard (as linhas foram copiadas com ids novos, app/services/shards.py): recomeça do zero
+        if decodificado is not None and decodificado[0] == republic_id and piso <= decodificado[1] <= atual:
+            apos, reiniciar = decodificado[1], False
+
+    modelos = {**ENTIDADES, "removidos": SyncTombstone}
+    # Lê um a mais para saber onde cada lista foi cortada
+    linhas = {nome: await _alteradas(session, modelo, republic_id, apos, atual, limite + 1) for nome, modelo in modelos.items()}
+
+    ate = atual
+    for lista in linhas.values():
+        if len(lista) > limite:
+            # Tudo antes da sequência do primeiro item que ficou de fora está completo nesta lista
+            ate = min(ate, lista[limite].sync_seq - 1)
+    if ate <= apos < atual:
+        # Uma só sequência maior que o limite (ex.: a primeira carga depois da migração): vem inteira
+        ate = min(lista[0].sync_seq for lista in linhas.values() if lista)
+        for nome, modelo in modelos.items():
+            if len(linhas[nome]) > limite:
+                linhas[nome] = await _alteradas(session, modelo, republic_id, apos, ate, None)
+
+    resposta = {nome: [linha for linha in lista if linha.sync_seq <= ate] for nome, lista in linhas.items()}
+    resposta["removidos"] = [{"tipo": linha.entity, "id": linha.entity_id} for linha in resposta["removidos"]]
+    resposta.update({
+        "republica_id": republic_id,
+        "cursor": codificar_cursor(republic_id, ate),
+        "tem_mais": ate < atual,
+        "reiniciar": reiniciar,
+    })
+    return resposta
@@ -0,0 +1,30 @@
+from typing import Iterable, Optional
+
+from sqlalchemy import update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Republic
+from app.services.sync import carimbar
+
+
+async def incrementar_versao(session: AsyncSession, republic_ids: Optional[Iterable[int]] = None):
+    """
+    Marca que os dados das repúblicas mudaram (None = todas). Deve rodar na mesma
+    transação da escrita, depois dela: os ETags das leituras são derivados de
+    Republic.data_version, e as linhas escritas recebem a versão nova como sequência
+    de sincronização (app/services/sync.py).
+    """
+    stmt = update(Republic).values(data_version=Republic.data_version + 1)
+    ids = None
+    if republic_ids is not None:
+        ids = [i for i in set(republic_ids) if i is not None]
+        if not ids:
+            return
+        stmt = stmt.where(Republic.id.in_(ids))
+    await session.exec(stmt)
+    await carimbar(session, ids)
+
+
+async def versao_atual(session: AsyncSession, republic_id: int) -> Optional[int]:
+    return (await session.exec(select(Republic.data_version).where(Republic.id == republic_id))).first()
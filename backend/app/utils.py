@@ -10,4 +10,4 @@ def gerar_codigo_convite(nome_republica: str):
     alfabeto = string.ascii_uppercase + string.digits
     sufixo = ''.join(secrets.choice(alfabeto) for _ in range(4))
     
-    return f"REP-{prefixo}-{sufixo}"
\ No newline at end of file
+    return f"REP-{prefixo}-{sufixo}"
@@ -0,0 +1,264 @@
+"""
+Benchmark de carga das rotas principais sobre uma massa de dados sintética.
+
+Semeia milhares de repúblicas (ver benchmarks/dados_sinteticos.py) num banco novo e,
+para cada cenário, mede latência p50/p95/p99, vazão (req/s) e quantas queries SQL
+cada requisição executa. As requisições passam pela aplicação inteira (middlewares,
+dependências, autenticação), em processo, sem o custo de rede.
+
+Cenários: login, dashboard, devedores, pagar-divida, gerar-mensalidade, relatorio.
+
+Uso (a partir da pasta backend/):
+    python -m benchmarks.api                                   # roda tudo e compara com o baseline
+    python -m benchmarks.api --cenarios dashboard devedores --requisicoes 500
+    python -m benchmarks.api --salvar benchmarks/baseline.json # atualiza o baseline versionado
+    python -m benchmarks.api --database-url postgresql://...   # banco vazio, será migrado
+
+Toda mudança de desempenho deve vir acompanhada da comparação com o baseline,
+rodada com os mesmos parâmetros (eles ficam gravados no próprio arquivo).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from benchmarks import percentil
+
+BASELINE = Path(__file__).parent / "baseline.json"
+CENARIOS = ["login", "dashboard", "devedores", "pagar-divida", "gerar-mensalidade", "relatorio"]
+
+
+class Cenarios:
+    """Monta a i-ésima requisição de cada cenário a partir da massa semeada."""
+
+    def __init__(self, massa, semente: int):
+        from app.core.security import create_access_token
+
+        self.massa = massa
+        self.rnd = random.Random(semente)
+        self.republicas = sorted(massa.admins)
+        self.usuarios = sorted(massa.emails)
+        self._token = create_access_token
+        self._cabecalhos = {}
+        # Cada república só gera a mensalidade uma vez: cada requisição usa uma república nova
+        self._proxima_mensalidade = itertools.count()
+
+    def cabecalho(self, user_id: int):
+        if user_id not in self._cabecalhos:
+            token = self._token({"sub": self.massa.emails[user_id], "uid": user_id})
+            self._cabecalhos[user_id] = {"Authorization": f"Bearer {token}"}
+        return self._cabecalhos[user_id]
+
+    def requisicao(self, cenario: str):
+        """Devolve (método, url, kwargs do httpx)."""
+        if cenario == "login":
+            user_id = self.rnd.choice(self.usuarios)
+            return "POST", "/login", {"data": {"username": self.massa.emails[user_id], "password": "senha123"}}
+
+        if cenario == "dashboard":
+            return "GET", "/financas/dashboard", {"headers": self.cabecalho(self.rnd.choice(self.usuarios))}
+
+        if cenario == "devedores":
+            rep_id = self.rnd.choice(self.republicas)
+            return "GET", "/financas/devedores", {"headers": self.cabecalho(self.massa.admins[rep_id])}
+
+        if cenario == "pagar-divida":
+            rep_id = self.rnd.choice(self.republicas)
+            devedor = self.rnd.choice(self.massa.moradores[rep_id] or [self.massa.admins[rep_id]])
+            return "POST", "/financas/pagar-divida", {
+                "headers": self.cabecalho(self.massa.admins[rep_id]),
+                "json": {"user_id": devedor, "amount": 1.0},
+            }
+
+        if cenario == "gerar-mensalidade":
+            indice = next(self._proxima_mensalidade)
+            if indice >= len(self.republicas):
+                raise RuntimeError("gerar-mensalidade precisa de uma república nova por requisição: aumente --republicas")
+            rep_id = self.republicas[indice]
+            return "POST", "/financas/gerar-mensalidade", {"headers": self.cabecalho(self.massa.admins[rep_id])}
+
+        if cenario == "relatorio":
+            return "GET", "/relatorios/?por=mes_categoria", {"headers": self.cabecalho(self.rnd.choice(self.usuarios))}
+
+        raise ValueError(cenario)
+
+
+async def medir(cliente, cenarios: Cenarios, cenario: str, requisicoes: int, concorrencia: int, amostra_queries: int):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app.core.metricas import _medicao_atual
+
+    # 1) Contagem de queries: requisições em sequência, para atribuir cada query à sua requisição.
+    # Em todas as engines (primário, pool de leitura do SQLite, réplicas, shards), só as que
+    # rodam dentro de uma requisição (o worker de jobs fica de fora)
+    queries = []
+
+    def contar(*_):
+        if _medicao_atual.get() is not None:
+            queries.append(1)
+
+    event.listen(Engine, "before_cursor_execute", contar)
+    try:
+        por_requisicao = []
+        for _ in range(amostra_queries):
+            metodo, url, kwargs = cenarios.requisicao(cenario)
+            queries.clear()
+            r = await cliente.request(metodo, url, **kwargs)
+            if r.status_code >= 400:
+                raise RuntimeError(f"{cenario}: {r.status_code} {r.text}")
+            por_requisicao.append(len(queries))
+    finally:
+        event.remove(Engine, "before_cursor_execute", contar)
+
+    # 2) Latência e vazão com `concorrencia` requisições em paralelo
+    latencias = []
+    erros = 0
+    limite = asyncio.Semaphore(concorrencia)
+
+    async def uma(metodo, url, kwargs):
+        nonlocal erros
+        async with limite:
+            inicio = time.perf_counter()
+            r = await cliente.request(metodo, url, **kwargs)
+            if r.status_code >= 400:
+                erros += 1
+            else:
+                latencias.append(time.perf_counter() - inicio)
+
+    pedidos = [cenarios.requisicao(cenario) for _ in range(requisicoes)]
+    inicio = time.perf_counter()
+    await asyncio.gather(*(uma(*p) for p in pedidos))
+    duracao = time.perf_counter() - inicio
+
+    return {
+        "requisicoes": requisicoes,
+        "erros": erros,
+        "req_por_s": round(len(latencias) / duracao, 1),
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+        "queries_por_requisicao": round(sum(por_requisicao) / max(len(por_requisicao), 1), 2),
+        "queries_max": max(por_requisicao, default=0),
+    }
+
+
+async def rodar(args, massa):
+    import httpx
+    from app.main import app
+
+    cenarios = Cenarios(massa, args.semente)
+    resultados = {}
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            for cenario in args.cenarios:
+                resultados[cenario] = await medir(
+                    cliente, cenarios, cenario, args.requisicoes, args.concorrencia, args.amostra_queries
+                )
+                imprimir_linha(cenario, resultados[cenario])
+    return resultados
+
+
+def imprimir_linha(cenario, r, base=None):
+    linha = (
+        f"{cenario:<18} req/s={r['req_por_s']:8.1f}  p50={r['p50_ms']:8.2f}ms  p95={r['p95_ms']:8.2f}ms  "
+        f"p99={r['p99_ms']:8.2f}ms  queries/req={r['queries_por_requisicao']:5.1f}  erros={r['erros']}"
+    )
+    if base:
+        def delta(campo):
+            return (r[campo] - base[campo]) / base[campo] * 100 if base[campo] else 0.0
+        linha += f"  | p95 {delta('p95_ms'):+.0f}%  req/s {delta('req_por_s'):+.0f}%  queries {r['queries_por_requisicao'] - base['queries_por_requisicao']:+.1f}"
+    print(linha)
+
+
+def comparar(resultado, caminho: Path):
+    if not caminho.exists():
+        print(f"\nSem baseline em {caminho}; rode com --salvar {caminho} para criar.")
+        return
+    base = json.loads(caminho.read_text())
+    if base["parametros"] != resultado["parametros"]:
+        print(f"\nAtenção: parâmetros diferentes do baseline ({base['parametros']}); a comparação é só indicativa.")
+    print(f"\nComparação com {caminho} ({base['data']}):")
+    for cenario, r in resultado["cenarios"].items():
+        imprimir_linha(cenario, r, base["cenarios"].get(cenario))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cenarios", nargs="+", choices=CENARIOS, default=CENARIOS)
+    parser.add_argument("--republicas", type=int, default=1000)
+    parser.add_argument("--moradores", type=int, default=5, help="moradores por república (incluindo o admin)")
+    parser.add_argument("--despesas", type=int, default=12, help="despesas por república, nos 6 meses anteriores")
+    parser.add_argument("--requisicoes", type=int, default=200, help="requisições medidas por cenário")
+    parser.add_argument("--concorrencia", type=int, default=10)
+    parser.add_argument("--amostra-queries", type=int, default=20, help="requisições sequenciais para contar queries")
+    parser.add_argument("--bcrypt-rounds", type=int, default=None, help="custo do bcrypt (padrão: o do settings)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--database-url", help="banco vazio a usar (padrão: SQLite temporário)")
+    parser.add_argument("--salvar", type=Path, help="grava o resultado em JSON (ex.: benchmarks/baseline.json)")
+    parser.add_argument("--comparar", type=Path, default=BASELINE, help="baseline para comparação")
+    args = parser.parse_args()
+
+    # O banco precisa estar definido antes de importar a aplicação
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_api.db')}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+    # Mede a capacidade da API, não o limitador de requisições (tudo sai do mesmo IP)
+    os.environ["LIMITES_HABILITADOS"] = "false"
+    if args.bcrypt_rounds:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+    from alembic import command
+    from alembic.config import Config
+    from app.core.config import settings
+    from app.core.senhas import criar_contexto
+    from app.database import ALEMBIC_INI, engine
+    from benchmarks.dados_sinteticos import semear
+
+    inicio = time.perf_counter()
+    command.upgrade(Config(str(ALEMBIC_INI)), "head")
+    massa = semear(
+        engine,
+        criar_contexto(settings.bcrypt_rounds).hash("senha123"),
+        republicas=args.republicas,
+        moradores=args.moradores,
+        despesas=args.despesas,
+        semente=args.semente,
+    )
+    print(f"Massa semeada em {time.perf_counter() - inicio:.1f}s: {massa.contagens}\n")
+
+    resultado = {
+        "data": date.today().isoformat(),
+        "parametros": {
+            "republicas": args.republicas,
+            "moradores": args.moradores,
+            "despesas": args.despesas,
+            "requisicoes": args.requisicoes,
+            "concorrencia": args.concorrencia,
+            "bcrypt_rounds": settings.bcrypt_rounds,
+            "banco": engine.dialect.name,
+        },
+        "ambiente": {"python": platform.python_version(), "cpus": os.cpu_count()},
+        "cenarios": asyncio.run(rodar(args, massa)),
+    }
+
+    if args.salvar:
+        args.salvar.write_text(json.dumps(resultado, indent=2, ensure_ascii=False) + "\n")
+        print(f"\nResultado gravado em {args.salvar}")
+    if args.comparar and (not args.salvar or args.comparar.resolve() != args.salvar.resolve()):
+        comparar(resultado, args.comparar)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
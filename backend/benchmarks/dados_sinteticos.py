@@ -0,0 +1,172 @@
+"""
+Massa de dados sintética para os benchmarks.
+
+Gera repúblicas com moradores, templates, despesas dos meses anteriores já rateadas
+(parte quitada, parte em aberto), compras de moradores e movimentações de caixa.
+Os dados são determinísticos para a mesma semente, e os inserts são feitos em lote
+direto nas tabelas (sem passar pela API), para semear milhares de repúblicas em segundos.
+O ledger (UserBalance / RepublicBalance) é reconstruído no final, como faria
+`python manage.py saldos reconstruir`.
+"""
+import asyncio
+import random
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List
+
+from sqlalchemy import insert, update
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+SENHA = "senha123"
+CATEGORIAS = ["luz", "agua", "gas", "compras", "limpeza", "manutencao"]
+
+
+@dataclass
+class MassaDeDados:
+    """O que os cenários precisam saber sobre os dados semeados."""
+    # república -> id do admin e ids dos demais moradores
+    admins: Dict[int, int] = field(default_factory=dict)
+    moradores: Dict[int, List[int]] = field(default_factory=dict)
+    emails: Dict[int, str] = field(default_factory=dict)
+    contagens: Dict[str, int] = field(default_factory=dict)
+
+
+def _mes_anterior(mes: date, n: int) -> date:
+    total = mes.year * 12 + (mes.month - 1) - n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def semear(
+    engine,
+    hash_senha: str,
+    republicas: int = 1000,
+    moradores: int = 5,
+    despesas: int = 12,
+    caixa: int = 10,
+    compras: int = 5,
+    semente: int = 42,
+    lote: int = 5000,
+) -> MassaDeDados:
+    """
+    Insere a massa de dados no banco (já migrado) e devolve os ids usados pelos cenários.
+    `despesas`, `caixa` e `compras` são quantidades por república.
+    """
+    from app.models import Republic, User, Expense, UserExpense, ResidentPurchase, CashTransaction
+    from app.models.finance import ExpenseTemplate
+    from app.models.dinheiro import para_centavos, para_reais, ratear_centavos
+
+    rnd = random.Random(semente)
+    hoje = date.today()
+    massa = MassaDeDados()
+
+    linhas_rep, linhas_user, linhas_template = [], [], []
+    linhas_despesa, linhas_fatia, linhas_compra, linhas_caixa = [], [], [], []
+
+    user_id = 0
+    expense_id = 0
+    for rep_id in range(1, republicas + 1):
+        linhas_rep.append({"id": rep_id, "name": f"Rep {rep_id}", "address": f"Rua {rep_id}", "invite_code": f"BENCH-{rep_id}"})
+
+        ids = []
+        for m in range(moradores):
+            user_id += 1
+            ids.append(user_id)
+            email = f"u{user_id}@bench.com"
+            massa.emails[user_id] = email
+            linhas_user.append({
+                "id": user_id,
+                "name": f"Morador {user_id}",
+                "email": email,
+                "hashed_password": hash_senha,
+                "republic_id": rep_id,
+                "fixed_rent": float(rnd.choice([0, 450, 500, 600])),
+                "role_tag": "admin" if m == 0 else "morador",
+            })
+        massa.admins[rep_id] = ids[0]
+        massa.moradores[rep_id] = ids[1:]
+
+        for descricao, valor, categoria in (("Internet", 100.0, "fixo"), ("Aluguel", 2500.0, "aluguel"), ("Condomínio", 350.0, "fixo")):
+            linhas_template.append({"description": descricao, "base_value": valor, "category": categoria, "republic_id": rep_id})
+
+        for d in range(despesas):
+            expense_id += 1
+            # Espalhadas pelos meses anteriores: as mais antigas tendem a estar quitadas
+            meses_atras = 1 + d * 6 // max(despesas, 1)
+            vencimento = _mes_anterior(hoje, meses_atras).replace(day=10)
+            valor = round(rnd.uniform(30, 600), 2)
+            linhas_despesa.append({
+                "id": expense_id,
+                "description": f"Despesa {d + 1}",
+                "amount": valor,
+                "due_date": vencimento,
+                "split_type": "equal",
+                "category": rnd.choice(CATEGORIAS),
+                "republic_id": rep_id,
+                "template_id": None,
+                "reference_month": None,
+            })
+            partes = ratear_centavos(para_centavos(valor), [1] * len(ids))
+            for uid, centavos in zip(ids, partes):
+                parte = para_reais(centavos)
+                sorteio = rnd.random()
+                if sorteio < 0.15 * meses_atras:
+                    pago, quitada = parte, True
+                elif sorteio < 0.15 * meses_atras + 0.1:
+                    pago, quitada = para_reais(centavos // 2), False
+                else:
+                    pago, quitada = 0, False
+                linhas_fatia.append({"value": parte, "is_paid": quitada, "paid_amount": pago, "user_id": uid, "expense_id": expense_id, "republic_id": rep_id, "version": 1})
+
+        for c in range(caixa):
+            linhas_caixa.append({
+                "description": f"Movimentação {c + 1}",
+                "amount": round(rnd.uniform(10, 400), 2),
+                "transaction_date": _mes_anterior(hoje, rnd.randint(0, 5)).replace(day=rnd.randint(1, 28)),
+                "type": rnd.choice(["in", "out"]),
+                "republic_id": rep_id,
+            })
+
+        for c in range(compras):
+            linhas_compra.append({
+                "description": f"Compra {c + 1}",
+                "amount": round(rnd.uniform(5, 150), 2),
+                "purchase_date": _mes_anterior(hoje, rnd.randint(0, 2)).replace(day=rnd.randint(1, 28)),
+                "is_settled": rnd.random() < 0.5,
+                "user_id": rnd.choice(ids),
+                "republic_id": rep_id,
+            })
+
+    tabelas = [
+        (Republic, linhas_rep),
+        (User, linhas_user),
+        (ExpenseTemplate, linhas_template),
+        (Expense, linhas_despesa),
+        (UserExpense, linhas_fatia),
+        (CashTransaction, linhas_caixa),
+        (ResidentPurchase, linhas_compra),
+    ]
+    with Session(engine) as session:
+        for modelo, linhas in tabelas:
+            for inicio in range(0, len(linhas), lote):
+                session.exec(insert(modelo.__table__), params=linhas[inicio:inicio + lote])
+            massa.contagens[modelo.__tablename__] = len(linhas)
+            if "sync_seq" in modelo.__table__.c:
+                # Como a migração faz com as linhas antigas: tudo na versão inicial da república
+                session.exec(update(modelo.__table__).values(sync_seq=1))
+        session.commit()
+
+    asyncio.run(_reconstruir_ledger())
+    return massa
+
+
+async def _reconstruir_ledger():
+    from app.database import async_engine
+    from app.services.ledger import verificar_saldos
+    from app.services.resumos import verificar_resumos
+
+    async with AsyncSession(async_engine) as session:
+        await verificar_saldos(session, corrigir=True)
+        await session.commit()
+        await verificar_resumos(session, corrigir=True)
+    await async_engine.dispose()
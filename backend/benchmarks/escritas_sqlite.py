@@ -0,0 +1,141 @@
+"""
+Benchmark de escritas concorrentes no SQLite: opções padrão x perfil de produção.
+
+Cada transação é a de POST /financas/caixa/transacoes (movimentação do caixa, saldo da
+república, resumo mensal e versão/sync), feita direto pelos serviços, sem HTTP. E tarefas
+escrevem ao mesmo tempo, cada uma T transações, enquanto L tarefas leem o saldo das
+repúblicas a cada 10ms (com ritmo fixo, para não disputarem a CPU com os escritores). Os dois modos usam cópias do mesmo banco migrado:
+
+- padrao: journal DELETE, synchronous FULL e o busy handler do sqlite3 (como era antes);
+- producao: os pragmas e a fila de escrita de app/core/sqlite.py (WAL, synchronous=NORMAL...),
+  com os leitores no pool só de leitura, como get_session_leitura.
+
+Mostra transações/s, p50/p95 de cada transação (contando a espera pela vez), erros
+"database is locked" e p50/p95 das leituras.
+
+Uso (a partir da pasta backend/):
+    python -m benchmarks.escritas_sqlite --escritores 32 --transacoes 50 --leitores 4
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+
+from benchmarks import percentil
+
+# O benchmark usa um banco SQLite temporário próprio
+_pasta = tempfile.mkdtemp()
+_db = os.path.join(_pasta, "bench_escritas.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db}"
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+
+def preparar_banco(republicas: int):
+    from alembic import command
+    from alembic.config import Config
+    from sqlmodel import Session
+    from app.database import ALEMBIC_INI, engine
+    from app.models import Republic
+
+    command.upgrade(Config(str(ALEMBIC_INI)), "head")
+    with Session(engine) as session:
+        for i in range(republicas):
+            session.add(Republic(name=f"r{i}", address="-", invite_code=f"bench{i}"))
+        session.commit()
+    engine.dispose()
+
+
+async def uma_transacao(session, republic_id: int, valor: Decimal):
+    from app.models import CashTransaction
+    from app.services import resumos
+    from app.services.ledger import ajustar_saldo_republica
+    from app.services.versoes import incrementar_versao
+
+    transacao = CashTransaction(description="bench", amount=valor, republic_id=republic_id, type="in")
+    session.add(transacao)
+    await ajustar_saldo_republica(session, republic_id, entradas=valor)
+    await resumos.registrar(session, republic_id, transacao.transaction_date, resumos.CATEGORIA_GERAL, "cashbox_in", valor)
+    await incrementar_versao(session, [republic_id])
+    await session.commit()
+
+
+async def rodar(modo: str, args):
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlmodel import func, select
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    from app.core import sqlite as perfil_sqlite
+    from app.core.config import settings
+    from app.database import opcoes_pool
+    from app.models import RepublicBalance
+
+    arquivo = os.path.join(_pasta, f"{modo}.db")
+    shutil.copy(_db, arquivo)
+    url = f"sqlite+aiosqlite:///{arquivo}"
+    engine = engine_leitura = create_async_engine(url, **opcoes_pool(url))
+    if modo == "producao":
+        perfil_sqlite.aplicar_pragmas(engine.sync_engine)
+        perfil_sqlite.serializar_escritas(engine)
+        engine_leitura = create_async_engine(url, **{**opcoes_pool(url), "pool_size": settings.sqlite_leitores})
+        perfil_sqlite.aplicar_pragmas(engine_leitura.sync_engine)
+        perfil_sqlite.somente_leitura(engine_leitura.sync_engine)
+
+    latencias, lat_leitura, erros = [], [], 0
+    terminou = asyncio.Event()
+
+    async def escritor(i: int):
+        nonlocal erros
+        for j in range(args.transacoes):
+            inicio = time.perf_counter()
+            try:
+                async with AsyncSession(engine) as session:
+                    await uma_transacao(session, (i + j) % args.republicas + 1, Decimal("1.50"))
+            except OperationalError:
+                erros += 1
+                continue
+            latencias.append(time.perf_counter() - inicio)
+
+    async def leitor():
+        while not terminou.is_set():
+            inicio = time.perf_counter()
+            async with AsyncSession(engine_leitura) as session:
+                await session.exec(select(func.sum(RepublicBalance.cashbox_in)))
+            lat_leitura.append(time.perf_counter() - inicio)
+            await asyncio.sleep(0.01)
+
+    tarefas_leitura = [asyncio.create_task(leitor()) for _ in range(args.leitores)]
+    inicio = time.perf_counter()
+    await asyncio.gather(*(escritor(i) for i in range(args.escritores)))
+    duracao = time.perf_counter() - inicio
+    terminou.set()
+    await asyncio.gather(*tarefas_leitura)
+    await engine.dispose()
+    await engine_leitura.dispose()
+
+    print(
+        f"{modo:<9} tx/s={len(latencias) / duracao:7.1f} "
+        f"p50={percentil(latencias, 50) * 1000:7.1f}ms p95={percentil(latencias, 95) * 1000:7.1f}ms "
+        f"locked={erros:<4} | leitura p50={percentil(lat_leitura, 50) * 1000:6.1f}ms p95={percentil(lat_leitura, 95) * 1000:6.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escritores", type=int, default=32)
+    parser.add_argument("--transacoes", type=int, default=50, help="transações por escritor")
+    parser.add_argument("--leitores", type=int, default=4)
+    parser.add_argument("--republicas", type=int, default=100)
+    args = parser.parse_args()
+
+    preparar_banco(args.republicas)
+    for modo in ("padrao", "producao"):
+        asyncio.run(rodar(modo, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark de login sob concorrência: threadpool x pool de processos de hash.
+
+Dispara N logins com C em paralelo e, ao mesmo tempo, mede a latência de uma rota
+leve (GET /) para ver o quanto o bcrypt atrapalha o resto da API.
+
+Uso (a partir da pasta backend/):
+    python -m benchmarks.login_concorrente --logins 200 --concorrencia 50 --workers 2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks import percentil
+
+# O benchmark usa um banco SQLite temporário próprio
+_db = os.path.join(tempfile.mkdtemp(), "bench_login.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db}"
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+# Mede a capacidade da API, não o limitador de requisições (tudo sai do mesmo IP)
+os.environ["LIMITES_HABILITADOS"] = "false"
+
+
+async def rodar(modo: str, workers: int, logins: int, concorrencia: int, usuarios: int):
+    import httpx
+    from app.core.config import settings
+    from app.main import app
+
+    settings.hash_workers = workers
+
+    lat_login, lat_probe = [], []
+    recusados = 0
+    terminou = asyncio.Event()
+
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+
+            async def probe():
+                while not terminou.is_set():
+                    inicio = time.perf_counter()
+                    await cliente.get("/")
+                    lat_probe.append(time.perf_counter() - inicio)
+                    await asyncio.sleep(0.01)
+
+            limite = asyncio.Semaphore(concorrencia)
+
+            async def um_login(i):
+                nonlocal recusados
+                async with limite:
+                    inicio = time.perf_counter()
+                    r = await cliente.post("/login", data={"username": f"u{i % usuarios}@bench.com", "password": "senha123"})
+                    if r.status_code == 503:
+                        recusados += 1
+                    elif r.status_code != 200:
+                        raise RuntimeError(f"login falhou: {r.status_code} {r.text}")
+                    else:
+                        lat_login.append(time.perf_counter() - inicio)
+
+            tarefa_probe = asyncio.create_task(probe())
+            inicio = time.perf_counter()
+            await asyncio.gather(*(um_login(i) for i in range(logins)))
+            duracao = time.perf_counter() - inicio
+            terminou.set()
+            await tarefa_probe
+
+    print(
+        f"{modo:<12} workers={workers:<2} logins/s={len(lat_login) / duracao:7.1f} "
+        f"login p50={percentil(lat_login, 50) * 1000:7.1f}ms p95={percentil(lat_login, 95) * 1000:7.1f}ms | "
+        f"GET / p50={percentil(lat_probe, 50) * 1000:6.1f}ms p95={percentil(lat_probe, 95) * 1000:6.1f}ms | 503={recusados}"
+    )
+
+
+def preparar_banco(usuarios: int):
+    from alembic import command
+    from alembic.config import Config
+    from sqlmodel import Session
+    from app.core.config import settings
+    from app.core.senhas import criar_contexto
+    from app.database import ALEMBIC_INI, engine
+    from app.models import User
+
+    command.upgrade(Config(str(ALEMBIC_INI)), "head")
+    # Um único hash reaproveitado: o custo de verificação é o mesmo
+    hash_senha = criar_contexto(settings.bcrypt_rounds).hash("senha123")
+    with Session(engine) as session:
+        for i in range(usuarios):
+            session.add(User(name=f"u{i}", email=f"u{i}@bench.com", hashed_password=hash_senha))
+        session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=50)
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="processos de hash no modo 'processos'")
+    args = parser.parse_args()
+
+    preparar_banco(args.usuarios)
+    asyncio.run(rodar("threadpool", 0, args.logins, args.concorrencia, args.usuarios))
+    asyncio.run(rodar("processos", args.workers, args.logins, args.concorrencia, args.usuarios))
+
+
+if __name__ == "__main__":
+    main()
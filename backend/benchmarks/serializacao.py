@@ -0,0 +1,129 @@
+"""
+Microbenchmark de serialização: quanto custa transformar 10 mil linhas do banco em JSON.
+
+Compara, para cada payload, os caminhos que uma rota pode seguir no FastAPI:
+
+- sem_schema: a rota devolve os objetos do ORM sem response_model (jsonable_encoder +
+  json.dumps, campo a campo em Python; era o caso do GET /financas/alugueis-fixos);
+- sem_schema_orjson: o mesmo, trocando o json.dumps pelo orjson (ORJSONResponse);
+- schema_orjson: response_model + ORJSONResponse como classe de resposta (valida com o
+  schema, gera dicts em Python e o orjson os codifica; qualquer classe de resposta
+  diferente da padrão desliga o caminho abaixo);
+- schema: response_model com a classe de resposta padrão, o caminho das rotas hoje
+  (o pydantic-core valida lendo os atributos e escreve os bytes JSON direto).
+
+Os objetos são montados em memória (sem banco), para medir só a serialização. As
+variantes com orjson só aparecem se ele estiver instalado (pip install orjson).
+
+Uso (a partir da pasta backend/):
+    python -m benchmarks.serializacao --linhas 10000 --repeticoes 5
+"""
+import argparse
+import json
+import os
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+
+def montar_payloads(linhas: int):
+    from app.models import CashTransaction, Expense, User, UserExpense
+    from app.schemas.finance import CashTransactionResponse, ExpenseResponse
+    from app.schemas.user import UserPublic
+
+    hoje = date.today()
+    despesas = []
+    for i in range(linhas):
+        despesa = Expense(
+            id=i + 1, description=f"Despesa {i}", amount=Decimal("300.00"), due_date=hoje - timedelta(days=i % 365),
+            category="luz", split_type="equal", republic_id=1,
+        )
+        # Três moradores por despesa
+        despesa.splits = [
+            UserExpense(id=i * 3 + j + 1, expense_id=i + 1, user_id=j + 1, republic_id=1,
+                        value=Decimal("100.00"), paid_amount=Decimal("0.00"), is_paid=False)
+            for j in range(3)
+        ]
+        despesas.append(despesa)
+
+    transacoes = [
+        CashTransaction(id=i + 1, description=f"Movimentação {i}", amount=Decimal("12.34"),
+                        transaction_date=hoje, type="in" if i % 2 else "out", republic_id=1)
+        for i in range(linhas)
+    ]
+    usuarios = [
+        User(id=i + 1, name=f"Morador {i}", email=f"m{i}@rep.com", hashed_password="$2b$12$" + "x" * 53,
+             fixed_rent=Decimal("850.00"), role_tag="morador", republic_id=1)
+        for i in range(linhas)
+    ]
+    return {
+        "despesas (3 fatias cada)": (despesas, ExpenseResponse),
+        "extrato do caixa": (transacoes, CashTransactionResponse),
+        "moradores": (usuarios, UserPublic),
+    }
+
+
+def caminhos(schema):
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    adaptador = TypeAdapter(List[schema])
+
+    def sem_schema(objetos):
+        return json.dumps(jsonable_encoder(objetos)).encode()
+
+    def schema_padrao(objetos):
+        return adaptador.dump_json(adaptador.validate_python(objetos, from_attributes=True))
+
+    try:
+        import orjson
+    except ImportError:
+        # Sem o orjson instalado, compara só os dois caminhos do FastAPI puro
+        return {"sem_schema": sem_schema, "schema": schema_padrao}
+
+    def sem_schema_orjson(objetos):
+        return orjson.dumps(jsonable_encoder(objetos))
+
+    def schema_orjson(objetos):
+        validados = adaptador.validate_python(objetos, from_attributes=True)
+        return orjson.dumps(adaptador.dump_python(validados, mode="json"))
+
+    return {
+        "sem_schema": sem_schema,
+        "sem_schema_orjson": sem_schema_orjson,
+        "schema_orjson": schema_orjson,
+        "schema": schema_padrao,
+    }
+
+
+def medir(funcao, objetos, repeticoes: int):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        corpo = funcao(objetos)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), len(corpo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=10000)
+    parser.add_argument("--repeticoes", type=int, default=5, help="vale o melhor tempo")
+    args = parser.parse_args()
+
+    for nome, (objetos, schema) in montar_payloads(args.linhas).items():
+        print(f"\n{nome}: {args.linhas} linhas")
+        base = None
+        for caminho, funcao in caminhos(schema).items():
+            tempo, tamanho = medir(funcao, objetos, args.repeticoes)
+            base = base or tempo
+            print(f"  {caminho:<18} {tempo * 1000:8.1f} ms  {base / tempo:5.1f}x  {tamanho / 1024:8.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Comandos de manutenção do backend.
+
+Uso (a partir da pasta backend/):
+    python manage.py saldos verificar     # compara o ledger com as tabelas brutas
+    python manage.py saldos reconstruir   # recalcula e sobrescreve o ledger
+    python manage.py resumos verificar|reconstruir
+                                          # o mesmo para os resumos mensais (relatórios)
+    python manage.py mensalidade [--mes AAAA-MM] [--republicas 1 2 3] [--lote 200]
+                                          # gera as contas do mês (templates) em lote
+    python manage.py jobs worker          # worker de jobs num processo separado da API
+    python manage.py jobs status [--mes AAAA-MM]
+    python manage.py shards listar        # repúblicas por shard
+    python manage.py shards mover <república> <shard>
+                                          # move os dados de uma república para outro shard
+    python manage.py shards espelhar      # refaz as cópias de repúblicas/usuários nos shards
+    python manage.py replicas status      # checa a saúde das réplicas de leitura
+    python manage.py replicas sincronizar # copia cada banco SQLite para as réplicas dele (testes locais)
+    python manage.py arquivo executar [--corte AAAA-MM-DD] [--lote 1000]
+                                          # leva fatias quitadas e caixa de meses fechados para o arquivo
+    python manage.py arquivo status       # linhas quentes, arquiváveis e arquivadas
+
+Com SHARDS configurado, saldos, resumos, mensalidade, jobs e arquivo percorrem todos os shards.
+"""
+import argparse
+import asyncio
+import sys
+from collections import Counter
+from datetime import date
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import async_engines_shards
+
+
+def _relatar_divergencias(divergencias, corrigir: bool, consistente: str):
+    for d in divergencias:
+        print(f"{d['tabela']} id={d['id']} {d['campo']}: ledger={d['ledger']:.2f} calculado={d['calculado']:.2f}")
+
+    if not divergencias:
+        print(consistente)
+        return 0
+    if corrigir:
+        print(f"{len(divergencias)} divergência(s) corrigida(s).")
+        return 0
+    print(f"{len(divergencias)} divergência(s) encontrada(s).")
+    return 1
+
+
+def cmd_saldos(args):
+    from app.services.ledger import verificar_saldos
+
+    corrigir = args.acao == "reconstruir"
+
+    async def executar():
+        divergencias = []
+        for engine_shard in async_engines_shards:
+            async with AsyncSession(engine_shard) as session:
+                divergencias += await verificar_saldos(session, corrigir=corrigir)
+        return divergencias
+
+    return _relatar_divergencias(asyncio.run(executar()), corrigir, "Ledger consistente com as tabelas brutas.")
+
+
+def cmd_resumos(args):
+    from app.services.resumos import verificar_resumos
+
+    corrigir = args.acao == "reconstruir"
+
+    async def executar():
+        divergencias = []
+        for engine_shard in async_engines_shards:
+            async with AsyncSession(engine_shard) as session:
+                divergencias += await verificar_resumos(session, corrigir=corrigir)
+        return divergencias
+
+    return _relatar_divergencias(asyncio.run(executar()), corrigir, "Resumos mensais consistentes com as tabelas brutas.")
+
+
+def cmd_mensalidade(args):
+    from app.models.finance import ExpenseTemplate
+    from app.services.despesas import gerar_mensalidades
+
+    mes = date.fromisoformat(f"{args.mes}-01") if args.mes else date.today()
+
+    async def executar():
+        total = 0
+        # Os templates ficam no shard da república: cada shard gera as suas
+        for engine_shard in async_engines_shards:
+            async with AsyncSession(engine_shard, expire_on_commit=False) as session:
+                stmt = select(ExpenseTemplate.republic_id).distinct().order_by(ExpenseTemplate.republic_id)
+                if args.republicas:
+                    stmt = stmt.where(ExpenseTemplate.republic_id.in_(args.republicas))
+                ids = (await session.exec(stmt)).all()
+
+                # Cada lote é uma transação: um erro no meio não desfaz os lotes anteriores,
+                # e rodar de novo só cria o que faltou (a geração é idempotente por mês)
+                for inicio in range(0, len(ids), args.lote):
+                    lote = ids[inicio:inicio + args.lote]
+                    criadas = await gerar_mensalidades(session, mes, lote)
+                    await session.commit()
+                    total += sum(criadas.values())
+                    print(f"{min(inicio + args.lote, len(ids))}/{len(ids)} repúblicas processadas ({total} despesas criadas)")
+        return total
+
+    total = asyncio.run(executar())
+    print(f"Mensalidade {mes.strftime('%m/%Y')}: {total} despesa(s) criada(s).")
+    return 0
+
+
+def cmd_jobs(args):
+    from app.services import jobs
+
+    if args.acao == "worker":
+        print(f"Worker {jobs.WORKER} processando a fila de jobs (Ctrl+C para sair)...")
+        try:
+            asyncio.run(jobs.rodar_worker())
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    mes = date.fromisoformat(f"{args.mes}-01") if args.mes else date.today()
+
+    async def executar():
+        total = Counter()
+        for engine_shard in async_engines_shards:
+            async with AsyncSession(engine_shard) as session:
+                total.update(await jobs.resumo(session, mes))
+        return total
+
+    resumo = asyncio.run(executar())
+    print(f"Mensalidade {mes.strftime('%m/%Y')}: " + (", ".join(f"{s}={n}" for s, n in sorted(resumo.items())) or "nenhum job"))
+    return 0
+
+
+def cmd_shards(args):
+    from sqlalchemy import func
+    from app.models import Republic
+    from app.services import shards
+
+    if args.acao == "mover":
+        if args.republica is None or args.shard is None:
+            print("Uso: python manage.py shards mover <república> <shard>")
+            return 2
+        try:
+            copiadas = asyncio.run(shards.mover_republica(args.republica, args.shard))
+        except ValueError as erro:
+            print(erro)
+            return 1
+        if not copiadas:
+            print(f"A república {args.republica} já está no shard {args.shard}.")
+        else:
+            print(f"República {args.republica} movida para o shard {args.shard}: " + ", ".join(f"{t}={n}" for t, n in copiadas.items()))
+        return 0
+
+    if args.acao == "espelhar":
+        print(f"{asyncio.run(shards.espelhar_tudo())} república(s) espelhada(s).")
+        return 0
+
+    async def executar():
+        async with AsyncSession(async_engines_shards[0]) as session:
+            return dict((await session.exec(select(Republic.shard, func.count()).group_by(Republic.shard))).all())
+
+    contagem = asyncio.run(executar())
+    for indice in range(len(async_engines_shards)):
+        print(f"shard {indice}: {contagem.get(indice, 0)} república(s)")
+    return 0
+
+
+def cmd_replicas(args):
+    from sqlalchemy.engine import make_url
+    from app.core import replicas
+    from app.database import URLS_REPLICAS, URLS_SHARDS
+
+    if not URLS_REPLICAS:
+        print("Nenhuma réplica configurada (REPLICAS).")
+        return 0
+
+    if args.acao == "sincronizar":
+        import sqlite3
+        from contextlib import closing
+
+        # Só para desenvolvimento: em produção quem mantém as réplicas é a replicação do banco
+        for shard, urls in URLS_REPLICAS.items():
+            origem = make_url(URLS_SHARDS[shard])
+            if not origem.drivername.startswith("sqlite"):
+                print(f"shard {shard}: não é SQLite, use a replicação do próprio banco.")
+                return 1
+            with closing(sqlite3.connect(origem.database)) as primario:
+                for url in urls:
+                    with closing(sqlite3.connect(make_url(url).database)) as copia:
+                        primario.backup(copia)
+                    print(f"shard {shard}: {origem.database} -> {make_url(url).database}")
+        return 0
+
+    async def executar():
+        await replicas.checar_todas()
+        estado = replicas.estatisticas()["replicas"]
+        await replicas.encerrar()
+        return estado
+
+    estado = asyncio.run(executar())
+    for replica in estado:
+        situacao = "ok" if replica["saudavel"] else f"fora do rodízio ({replica['ultimo_erro']})"
+        print(f"shard {replica['shard']} {replica['url']}: {situacao}")
+    return 0 if all(replica["saudavel"] for replica in estado) else 1
+
+
+def cmd_arquivo(args):
+    from app.services import arquivo
+
+    corte = date.fromisoformat(args.corte) if args.corte else arquivo.corte_padrao()
+
+    if args.acao == "status":
+        async def executar():
+            total = {}
+            for engine_shard in async_engines_shards:
+                async with AsyncSession(engine_shard) as session:
+                    for tabela, contagem in (await arquivo.situacao(session, corte)).items():
+                        total.setdefault(tabela, Counter()).update(contagem)
+            return total
+
+        print(f"Corte: {corte.isoformat()}")
+        for tabela, contagem in asyncio.run(executar()).items():
+            print(f"{tabela}: {contagem['quentes']} quentes ({contagem['arquivaveis']} arquiváveis), {contagem['arquivadas']} arquivadas")
+        return 0
+
+    def progresso(totais):
+        print(f"  {totais['fatias']} fatias, {totais['pagamentos']} pagamentos e {totais['caixa']} movimentações do caixa arquivadas")
+
+    async def executar():
+        total = Counter()
+        for indice, engine_shard in enumerate(async_engines_shards):
+            if len(async_engines_shards) > 1:
+                print(f"shard {indice}:")
+            async with AsyncSession(engine_shard) as session:
+                total.update(await arquivo.arquivar(session, corte, args.lote, ao_concluir_lote=progresso))
+        return total
+
+    print(f"Arquivando o que está antes de {corte.isoformat()}...")
+    total = asyncio.run(executar())
+    print(f"Concluído: {total['fatias']} fatias, {total['pagamentos']} pagamentos e {total['caixa']} movimentações do caixa arquivadas.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comandos de manutenção do RepApp")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_saldos = sub.add_parser("saldos", help="Verifica ou reconstrói os saldos consolidados")
+    p_saldos.add_argument("acao", choices=["verificar", "reconstruir"])
+    p_saldos.set_defaults(func=cmd_saldos)
+
+    p_resumos = sub.add_parser("resumos", help="Verifica ou reconstrói os resumos mensais dos relatórios")
+    p_resumos.add_argument("acao", choices=["verificar", "reconstruir"])
+    p_resumos.set_defaults(func=cmd_resumos)
+
+    p_mensalidade = sub.add_parser("mensalidade", help="Gera as contas do mês a partir dos templates, em lote")
+    p_mensalidade.add_argument("--mes", help="Mês de referência no formato AAAA-MM (padrão: mês atual)")
+    p_mensalidade.add_argument("--republicas", type=int, nargs="+", help="IDs das repúblicas (padrão: todas com template)")
+    p_mensalidade.add_argument("--lote", type=int, default=200, help="Repúblicas por transação")
+    p_mensalidade.set_defaults(func=cmd_mensalidade)
+
+    p_jobs = sub.add_parser("jobs", help="Worker e andamento dos jobs de fundo")
+    p_jobs.add_argument("acao", choices=["worker", "status"])
+    p_jobs.add_argument("--mes", help="Mês de referência do status (AAAA-MM)")
+    p_jobs.set_defaults(func=cmd_jobs)
+
+    p_shards = sub.add_parser("shards", help="Distribuição das repúblicas entre os shards")
+    p_shards.add_argument("acao", choices=["listar", "mover", "espelhar"])
+    p_shards.add_argument("republica", type=int, nargs="?", help="ID da república (mover)")
+    p_shards.add_argument("shard", type=int, nargs="?", help="Shard de destino (mover)")
+    p_shards.set_defaults(func=cmd_shards)
+
+    p_replicas = sub.add_parser("replicas", help="Saúde e cópia local das réplicas de leitura")
+    p_replicas.add_argument("acao", choices=["status", "sincronizar"])
+    p_replicas.set_defaults(func=cmd_replicas)
+
+    p_arquivo = sub.add_parser("arquivo", help="Arquivamento de fatias quitadas, pagamentos e caixa de meses fechados")
+    p_arquivo.add_argument("acao", choices=["executar", "status"])
+    p_arquivo.add_argument("--corte", help="Arquiva o que for anterior a esta data AAAA-MM-DD (padrão: ARQUIVO_MESES_QUENTES)")
+    p_arquivo.add_argument("--lote", type=int, help="Linhas por transação (padrão: ARQUIVO_LOTE)")
+    p_arquivo.set_defaults(func=cmd_arquivo)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+from sqlmodel import SQLModel
+
+from app.core.config import settings
+from app.database import urls_dos_shards
+import app.models  # noqa: F401  (registra todas as tabelas no metadata)
+
+config = context.config
+config.set_main_option("sqlalchemy.url", settings.database_url)
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = SQLModel.metadata
+
+
+def run_migrations_offline():
+    """Gera o SQL sem conectar no banco (alembic upgrade head --sql)."""
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _urls_a_migrar():
+    # upgrade/downgrade/stamp valem para todos os shards (mesmo schema em todos);
+    # revision --autogenerate e check comparam só o shard 0
+    comando = getattr(config.cmd_opts, "cmd", None)
+    if comando is None or comando[0].__name__ in ("upgrade", "downgrade", "stamp"):
+        return urls_dos_shards()
+    return [settings.database_url]
+
+
+def run_migrations_online():
+    for url in _urls_a_migrar():
+        secao = config.get_section(config.config_ini_section, {})
+        secao["sqlalchemy.url"] = url
+        connectable = engine_from_config(secao, prefix="sqlalchemy.", poolclass=pool.NullPool)
+        with connectable.connect() as connection:
+            # render_as_batch: o SQLite não suporta a maioria dos ALTER TABLE
+            context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+            with context.begin_transaction():
+                context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
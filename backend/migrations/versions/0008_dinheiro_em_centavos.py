@@ -0,0 +1,130 @@
+"""dinheiro em centavos
+
+Colunas monetárias passam de FLOAT (reais) para BIGINT (centavos). As fatias antigas,
+divididas em float (33.333...), são corrigidas para somar exatamente o valor da
+despesa (e os recibos das quitadas, para somar o valor da fatia), e o ledger é
+recalculado a partir das tabelas brutas.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 20:13:09.730081
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (tabela, coluna) de todos os valores em dinheiro
+COLUNAS = [
+    ("expensetemplate", "base_value"),
+    ("expense", "amount"),
+    ("userexpense", "value"),
+    ("userexpense", "paid_amount"),
+    ("residentpurchase", "amount"),
+    ("cashtransaction", "amount"),
+    ("paymenthistory", "amount"),
+    ("user", "fixed_rent"),
+    ("userbalance", "open_debts"),
+    ("userbalance", "open_credits"),
+    ("republicbalance", "cashbox_in"),
+    ("republicbalance", "cashbox_out"),
+    ("republicbalance", "total_expenses"),
+]
+
+
+def _alterar_tipo(tipo_novo, tipo_antigo, expressao):
+    for tabela, coluna in COLUNAS:
+        op.execute(f'UPDATE "{tabela}" SET {coluna} = {expressao.format(coluna=coluna)}')
+        with op.batch_alter_table(tabela, schema=None) as batch_op:
+            batch_op.alter_column(
+                coluna,
+                existing_type=tipo_antigo,
+                type_=tipo_novo,
+                existing_nullable=False,
+                postgresql_using=f"{coluna}::{tipo_novo().compile(dialect=op.get_bind().dialect)}",
+            )
+
+
+def _corrigir_fatias(conexao):
+    """
+    Distribui o resíduo de centavos (total - soma das fatias) um centavo por fatia, a partir
+    da de menor id, e acerta os recibos das fatias quitadas para somarem o valor delas.
+    """
+    divergentes = conexao.execute(sa.text("""
+        SELECT e.id, e.amount - SUM(ue.value), COUNT(ue.id)
+        FROM expense e JOIN userexpense ue ON ue.expense_id = e.id
+        GROUP BY e.id, e.amount
+        HAVING SUM(ue.value) <> e.amount
+    """)).all()
+    for expense_id, diferenca, fatias in divergentes:
+        # Só resíduo de arredondamento (menos de 1 centavo por fatia); o resto é dado de verdade
+        if abs(diferenca) >= fatias:
+            continue
+        passo = 1 if diferenca > 0 else -1
+        ids = conexao.execute(
+            sa.text("SELECT id FROM userexpense WHERE expense_id = :e ORDER BY id LIMIT :n"),
+            {"e": expense_id, "n": abs(diferenca)},
+        ).scalars().all()
+        conexao.execute(
+            sa.text("UPDATE userexpense SET value = value + :p WHERE id = :id"),
+            [{"p": passo, "id": i} for i in ids],
+        )
+    # Fatia quitada tem pago = valor; pago nunca passa do valor
+    conexao.execute(sa.text("UPDATE userexpense SET paid_amount = value WHERE is_paid OR paid_amount > value"))
+
+    # Recibos das fatias quitadas: o resíduo (o centavo somado acima e o arredondamento de
+    # cada recibo) vai para o último recibo da fatia
+    residuos = conexao.execute(sa.text("""
+        SELECT ue.value - SUM(ph.amount), MAX(ph.id), COUNT(ph.id)
+        FROM userexpense ue JOIN paymenthistory ph ON ph.user_expense_id = ue.id
+        WHERE ue.is_paid
+        GROUP BY ue.id, ue.value
+        HAVING SUM(ph.amount) <> ue.value
+    """)).all()
+    for diferenca, ultimo_recibo, recibos in residuos:
+        # Mais que isso não é arredondamento: o recibo fica como está
+        if abs(diferenca) > recibos + 1:
+            continue
+        conexao.execute(
+            sa.text("UPDATE paymenthistory SET amount = amount + :d WHERE id = :id"),
+            {"d": diferenca, "id": ultimo_recibo},
+        )
+
+
+def _recalcular_ledger():
+    op.execute("DELETE FROM userbalance")
+    op.execute("DELETE FROM republicbalance")
+    op.execute("""
+        INSERT INTO userbalance (user_id, open_debts, open_credits)
+        SELECT u.id,
+               COALESCE((SELECT SUM(ue.value - ue.paid_amount) FROM userexpense ue WHERE ue.user_id = u.id AND NOT ue.is_paid), 0),
+               COALESCE((SELECT SUM(rp.amount) FROM residentpurchase rp WHERE rp.user_id = u.id AND NOT rp.is_settled), 0)
+        FROM "user" u
+    """)
+    op.execute("""
+        INSERT INTO republicbalance (republic_id, cashbox_in, cashbox_out, total_expenses)
+        SELECT r.id,
+               COALESCE((SELECT SUM(ct.amount) FROM cashtransaction ct WHERE ct.republic_id = r.id AND ct.type = 'in'), 0),
+               COALESCE((SELECT SUM(ct.amount) FROM cashtransaction ct WHERE ct.republic_id = r.id AND ct.type = 'out'), 0),
+               COALESCE((SELECT SUM(e.amount) FROM expense e WHERE e.republic_id = r.id), 0)
+        FROM republic r
+    """)
+
+
+def upgrade() -> None:
+    _alterar_tipo(sa.BigInteger, sa.Float(), "ROUND({coluna} * 100)")
+    _corrigir_fatias(op.get_bind())
+    _recalcular_ledger()
+
+
+def downgrade() -> None:
+    _alterar_tipo(sa.Float, sa.BigInteger(), "{coluna} / 100.0")
@@ -0,0 +1,77 @@
+"""sincronizacao incremental
+
+Coluna sync_seq nas tabelas sincronizadas pelo /sync, republic_id copiado da despesa
+para as fatias e os pagamentos, e a tabela de remoções (synctombstone). As linhas que
+já existem recebem a versão atual da república: a primeira sincronização traz tudo.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 20:21:12.062476
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SINCRONIZADAS = ["expense", "userexpense", "residentpurchase", "cashtransaction", "paymenthistory", "user"]
+
+
+def upgrade() -> None:
+    op.create_table('synctombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('republic_id', sa.Integer(), nullable=False),
+    sa.Column('entity', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('sync_seq', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['republic_id'], ['republic.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('synctombstone', schema=None) as batch_op:
+        batch_op.create_index('ix_synctombstone_republic_id_sync_seq', ['republic_id', 'sync_seq'], unique=False)
+
+    # republic_id das fatias e dos pagamentos: nullable até o preenchimento
+    for tabela in ("userexpense", "paymenthistory"):
+        with op.batch_alter_table(tabela, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('republic_id', sa.Integer(), nullable=True))
+    op.execute("UPDATE userexpense SET republic_id = (SELECT e.republic_id FROM expense e WHERE e.id = userexpense.expense_id)")
+    op.execute("UPDATE paymenthistory SET republic_id = (SELECT ue.republic_id FROM userexpense ue WHERE ue.id = paymenthistory.user_expense_id)")
+    for tabela in ("userexpense", "paymenthistory"):
+        with op.batch_alter_table(tabela, schema=None) as batch_op:
+            batch_op.alter_column('republic_id', existing_type=sa.Integer(), nullable=False)
+            batch_op.create_foreign_key(f'fk_{tabela}_republic_id_republic', 'republic', ['republic_id'], ['id'])
+
+    for tabela in SINCRONIZADAS:
+        with op.batch_alter_table(tabela, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('sync_seq', sa.Integer(), nullable=True))
+            batch_op.create_index(f'ix_{tabela}_republic_id_sync_seq', ['republic_id', 'sync_seq'], unique=False)
+        op.execute(
+            f'UPDATE "{tabela}" SET sync_seq = (SELECT r.data_version FROM republic r WHERE r.id = "{tabela}".republic_id)'
+        )
+
+
+def downgrade() -> None:
+    for tabela in reversed(SINCRONIZADAS):
+        with op.batch_alter_table(tabela, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{tabela}_republic_id_sync_seq')
+            batch_op.drop_column('sync_seq')
+
+    for tabela in ("paymenthistory", "userexpense"):
+        with op.batch_alter_table(tabela, schema=None) as batch_op:
+            batch_op.drop_constraint(f'fk_{tabela}_republic_id_republic', type_='foreignkey')
+            batch_op.drop_column('republic_id')
+
+    with op.batch_alter_table('synctombstone', schema=None) as batch_op:
+        batch_op.drop_index('ix_synctombstone_republic_id_sync_seq')
+
+    op.drop_table('synctombstone')
@@ -0,0 +1,36 @@
+"""shards
+
+Colunas do diretório de shards na república: em qual shard estão os dados dela, se está
+mudando de shard e o piso dos cursores do /sync. As repúblicas existentes ficam no shard 0.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 20:33:48.532805
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, Sequence[str], None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('republic', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('shard', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('shard_moving', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.add_column(sa.Column('sync_floor', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('republic', schema=None) as batch_op:
+        batch_op.drop_column('sync_floor')
+        batch_op.drop_column('shard_moving')
+        batch_op.drop_column('shard')
@@ -0,0 +1,33 @@
+"""carimbar moradores
+
+O novo hash da senha no login zerava o sync_seq do usuário sem carimbá-lo depois
+(app/services/sync.py, NAO_SINCRONIZADAS): esses moradores sumiam do /sync. Carimba
+com a versão atual da república os que ficaram NULL.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18 23:12:40.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0013'
+down_revision: Union[str, Sequence[str], None] = '0012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        'UPDATE "user" SET sync_seq = (SELECT r.data_version FROM republic r WHERE r.id = "user".republic_id) '
+        'WHERE sync_seq IS NULL AND republic_id IS NOT NULL'
+    )
+
+
+def downgrade() -> None:
+    # Só dados: não há o que desfazer
+    pass
@@ -0,0 +1,59 @@
+"""idempotencia por rota
+
+A Idempotency-Key passa a valer por usuário, método e caminho (endpoint entra na chave
+primária, agora como "POST /financas/<rota>") e guarda o hash do pedido (request_hash),
+para recusar com 422 a mesma chave com outro conteúdo. As chaves já gravadas ficam sem
+hash e não são conferidas.
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18 23:58:02.640117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0014'
+down_revision: Union[str, Sequence[str], None] = '0013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A chave primária muda: recria a tabela (o SQLite não altera chave primária)
+    op.create_table('idempotencykey_nova',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('endpoint', sqlmodel.sql.sqltypes.AutoString(length=200), nullable=False),
+    sa.Column('key', sqlmodel.sql.sqltypes.AutoString(length=100), nullable=False),
+    sa.Column('request_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True),
+    sa.Column('response_json', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'endpoint', 'key')
+    )
+    # Todas as rotas com Idempotency-Key eram POST em /financas
+    op.execute(
+        "INSERT INTO idempotencykey_nova (user_id, endpoint, key, request_hash, response_json, created_at) "
+        "SELECT user_id, 'POST /financas/' || endpoint, key, NULL, response_json, created_at FROM idempotencykey"
+    )
+    op.drop_table('idempotencykey')
+    op.rename_table('idempotencykey_nova', 'idempotencykey')
+
+
+def downgrade() -> None:
+    # As respostas guardadas só servem para reenvios recentes: são descartadas
+    op.drop_table('idempotencykey')
+    op.create_table('idempotencykey',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('key', sqlmodel.sql.sqltypes.AutoString(length=100), nullable=False),
+    sa.Column('endpoint', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('response_json', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'key')
+    )
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# Banco SQLite temporário e configurações de teste, antes de qualquer import do app
+_pasta = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_pasta, 'testes.db')}"
+os.environ.setdefault("SECRET_KEY", "testes")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ["LIMITES_HABILITADOS"] = "false"
+os.environ["JOBS_HABILITADOS"] = "false"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from alembic import command
+    from alembic.config import Config
+    from fastapi.testclient import TestClient
+    from app.database import ALEMBIC_INI
+    from app.main import app
+
+    command.upgrade(Config(str(ALEMBIC_INI)), "head")
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def novo_usuario(client):
+    """Cria um usuário e devolve (id, cabeçalhos com o token)."""
+    def criar(nome: str = "morador"):
+        email = f"{nome}-{uuid.uuid4().hex[:12]}@teste.com"
+        resposta = client.post("/usuarios/", json={"name": nome, "email": email, "password": "senha123"})
+        assert resposta.status_code == 200, resposta.text
+        token = client.post("/login", data={"username": email, "password": "senha123"}).json()["access_token"]
+        return resposta.json()["id"], {"Authorization": f"Bearer {token}"}
+
+    return criar
+
+
+@pytest.fixture
+def nova_republica(client, novo_usuario):
+    """Cria uma república com `moradores` usuários; devolve [(id, cabeçalhos)], o admin primeiro."""
+    def criar(moradores: int = 2):
+        admin = novo_usuario("admin")
+        resposta = client.post("/republicas/", json={"name": "Casa", "address": "Rua dos Testes, 1"}, headers=admin[1])
+        assert resposta.status_code == 200, resposta.text
+        convite = client.get("/republicas/moradores", headers=admin[1]).json()["invite_code"]
+        membros = [admin]
+        for _ in range(moradores - 1):
+            morador = novo_usuario()
+            assert client.post(f"/republicas/entrar/?invite_code={convite}", headers=morador[1]).status_code == 200
+            membros.append(morador)
+        return membros
+
+    return criar
+
+
+@pytest.fixture
+def banco():
+    """Sessão síncrona no banco de teste, para conferir o que as rotas gravaram."""
+    from sqlmodel import Session
+    from app.database import engine
+
+    with Session(engine) as session:
+        yield session
@@ -0,0 +1,126 @@
+import random
+from decimal import Decimal
+from itertools import combinations
+
+import pytest
+from sqlmodel import select
+
+from app.models import ResidentPurchase
+from app.models.finance import UserBalance
+from app.services.acerto import CASA, LIMITE_EXATO, transferencias_minimas
+
+
+def _aplicar(saldos, transferencias):
+    restantes = dict(saldos)
+    for de, para, valor in transferencias:
+        assert valor > 0
+        restantes[de] += valor
+        restantes[para] -= valor
+    return restantes
+
+
+def _max_grupos_soma_zero(valores):
+    """Força bruta: maior número de grupos de soma zero em que os valores se dividem."""
+    if not valores:
+        return 0
+    primeiro, resto = valores[0], valores[1:]
+    melhor = 0
+    # O grupo do primeiro valor: ele mais qualquer subconjunto do resto que zere a soma
+    for tamanho in range(len(resto) + 1):
+        for indices in combinations(range(len(resto)), tamanho):
+            if primeiro + sum(resto[i] for i in indices) == 0:
+                sobra = [v for i, v in enumerate(resto) if i not in indices]
+                melhor = max(melhor, 1 + _max_grupos_soma_zero(sobra))
+    return melhor
+
+
+def _saldos_aleatorios(rnd, n):
+    valores = [rnd.choice([-3, -2, -1, 1, 2, 3]) * rnd.choice([100, 250, 1000]) for _ in range(n - 1)]
+    saldos = {user_id: valor for user_id, valor in enumerate(valores, start=1)}
+    saldos[CASA] = -sum(valores)
+    return saldos
+
+
+@pytest.mark.parametrize("semente", range(200))
+def test_transferencias_minimas_zeram_com_o_minimo(semente):
+    rnd = random.Random(semente)
+    saldos = _saldos_aleatorios(rnd, rnd.randint(2, 8))
+
+    transferencias = transferencias_minimas(saldos)
+
+    assert all(valor == 0 for valor in _aplicar(saldos, transferencias).values())
+    nao_zerados = [valor for valor in saldos.values() if valor]
+    assert len(transferencias) == len(nao_zerados) - _max_grupos_soma_zero(nao_zerados)
+
+
+def test_transferencias_minimas_acima_do_limite_exato():
+    rnd = random.Random(7)
+    saldos = _saldos_aleatorios(rnd, LIMITE_EXATO + 5)
+
+    transferencias = transferencias_minimas(saldos)
+
+    assert all(valor == 0 for valor in _aplicar(saldos, transferencias).values())
+    assert len(transferencias) <= len([valor for valor in saldos.values() if valor]) - 1
+
+
+def test_transferencias_minimas_recusa_saldos_que_nao_somam_zero():
+    with pytest.raises(ValueError):
+        transferencias_minimas({1: 100, CASA: -50})
+
+
+def _preparar(client, nova_republica):
+    membros = nova_republica(3)
+    admin = membros[0][1]
+    resposta = client.post(
+        "/financas/despesas",
+        json={"description": "Luz", "total_value": 200, "due_date": "2026-10-10", "category": "luz"},
+        headers=admin,
+    )
+    assert resposta.status_code == 200, resposta.text
+    for (_, cabecalhos), valor in zip(membros[1:], (15, 45.5)):
+        resposta = client.post("/financas/compras-moradores", json={"description": "mercado", "value": valor}, headers=cabecalhos)
+        assert resposta.status_code == 200, resposta.text
+    return membros
+
+
+def test_acerto_com_versao_desatualizada_da_409(client, nova_republica):
+    membros = _preparar(client, nova_republica)
+    admin = membros[0][1]
+    versao = client.get("/financas/acerto?aluguel=false", headers=admin).json()["versao"]
+    # Qualquer escrita depois do cálculo sobe a versão da república
+    client.post("/financas/compras-moradores", json={"description": "pão", "value": 3}, headers=membros[1][1])
+
+    resposta = client.post("/financas/acerto", json={"versao": versao}, headers=admin)
+
+    assert resposta.status_code == 409
+    assert client.get("/financas/devedores", headers=admin).json() != []
+
+
+def test_acerto_zera_o_ledger_e_acerta_as_compras(client, nova_republica, banco):
+    membros = _preparar(client, nova_republica)
+    admin = membros[0][1]
+    ids = [user_id for user_id, _ in membros]
+    calculo = client.get("/financas/acerto?aluguel=false", headers=admin).json()
+
+    resposta = client.post("/financas/acerto", json={"versao": calculo["versao"]}, headers=admin)
+
+    assert resposta.status_code == 200, resposta.text
+    aplicado = resposta.json()
+    assert aplicado["transferencias"] == calculo["transferencias"]
+    assert aplicado["fatias_quitadas"] == 3
+    assert aplicado["compras_acertadas"] == 2
+    saldos = banco.exec(select(UserBalance).where(UserBalance.user_id.in_(ids))).all()
+    assert saldos and all(s.open_debts == Decimal(0) and s.open_credits == Decimal(0) for s in saldos)
+    compras = banco.exec(select(ResidentPurchase).where(ResidentPurchase.user_id.in_(ids))).all()
+    assert len(compras) == 2 and all(compra.is_settled for compra in compras)
+    assert client.get("/financas/acerto?aluguel=false", headers=admin).json()["transferencias"] == []
+    assert client.get("/financas/devedores", headers=admin).json() == []
+
+
+def test_acerto_nao_aplica_o_aluguel(client, nova_republica):
+    (_, admin), *_ = _preparar(client, nova_republica)
+    versao = client.get("/financas/acerto", headers=admin).json()["versao"]
+
+    resposta = client.post("/financas/acerto", json={"versao": versao, "aluguel": True}, headers=admin)
+
+    assert resposta.status_code == 400
@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@contextmanager
+def contar_queries():
+    """Conta as instruções mandadas ao banco (todas as engines: primário, leitura e réplicas)."""
+    instrucoes = []
+
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        instrucoes.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", antes)
+    try:
+        yield instrucoes
+    finally:
+        event.remove(Engine, "before_cursor_execute", antes)
+
+
+@pytest.mark.parametrize("moradores", [2, 5, 20])
+def test_devedores_em_duas_consultas(client, nova_republica, moradores):
+    (_, admin), *_ = nova_republica(moradores)
+    for descricao in ("Luz", "Água"):
+        resposta = client.post(
+            "/financas/despesas",
+            json={"description": descricao, "total_value": 90, "due_date": "2026-10-10", "category": "contas"},
+            headers=admin,
+        )
+        assert resposta.status_code == 200, resposta.text
+
+    # A primeira chamada aquece os caches (usuário autenticado, shard da república)
+    assert client.get("/financas/devedores", headers=admin).status_code == 200
+    with contar_queries() as instrucoes:
+        resposta = client.get("/financas/devedores", headers=admin)
+
+    assert resposta.status_code == 200, resposta.text
+    devedores = resposta.json()
+    assert len(devedores) == moradores
+    assert all(len(devedor["pending_expenses"]) == 2 for devedor in devedores)
+    assert len(instrucoes) == 2, instrucoes
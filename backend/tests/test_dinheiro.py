@@ -0,0 +1,46 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from app.models.dinheiro import para_centavos, para_reais, ratear_centavos
+
+
+def test_ratear_em_partes_iguais_sobra_para_as_primeiras():
+    assert ratear_centavos(10000, [1, 1, 1]) == [3334, 3333, 3333]
+    assert ratear_centavos(100, [1, 1, 1]) == [34, 33, 33]
+    assert ratear_centavos(200, [1, 1, 1]) == [67, 67, 66]
+
+
+def test_ratear_da_os_centavos_aos_maiores_restos():
+    # Cotas: 1,5 / 3,3 / 5,2 -> pisos 1 / 3 / 5, sobram 1 centavo para a maior fração (0,5)
+    assert ratear_centavos(10, [15, 33, 52]) == [2, 3, 5]
+    # Cotas: 0,6 / 0,6 / 0,8 -> todos os pisos são 0; os 2 centavos vão para 0,8 e o primeiro 0,6
+    assert ratear_centavos(2, [3, 3, 4]) == [1, 0, 1]
+
+
+@pytest.mark.parametrize("semente", range(100))
+def test_ratear_soma_sempre_o_total(semente):
+    rnd = random.Random(semente)
+    total = rnd.randint(0, 10_000_000)
+    pesos = [rnd.randint(0, 50) for _ in range(rnd.randint(1, 12))]
+    pesos[0] += 1  # soma positiva
+
+    partes = ratear_centavos(total, pesos)
+
+    assert sum(partes) == total
+    assert all(parte >= 0 for parte in partes)
+    # Nenhuma parte se afasta mais de um centavo da sua cota exata
+    assert all(abs(parte * sum(pesos) - total * peso) < sum(pesos) for parte, peso in zip(partes, pesos))
+
+
+def test_ratear_recusa_pesos_zerados():
+    with pytest.raises(ValueError):
+        ratear_centavos(100, [0, 0])
+
+
+def test_centavos_e_reais():
+    assert para_centavos(Decimal("12.345")) == 1235
+    assert para_centavos(Decimal("0.1") + Decimal("0.2")) == 30
+    assert para_reais(1235) == Decimal("12.35")
+    assert para_reais(para_centavos(Decimal("-7.10"))) == Decimal("-7.10")
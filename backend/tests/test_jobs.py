@@ -0,0 +1,113 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlmodel import select
+
+from app.core.config import settings
+from app.models import Expense, Job, User
+from app.services import jobs
+
+
+@pytest.fixture
+def republicas_com_template(client, nova_republica, banco):
+    """Três repúblicas com um template cada; devolve os ids delas."""
+    ids = []
+    for _ in range(3):
+        (admin_id, cabecalhos), = nova_republica(1)
+        resposta = client.post("/financas/templates", json={"description": "Internet", "base_value": 100, "category": "fixo"}, headers=cabecalhos)
+        assert resposta.status_code == 200, resposta.text
+        ids.append(banco.get(User, admin_id).republic_id)
+    return ids
+
+
+def rodar_mes(client, mes, republic_ids):
+    """Agenda o mês, reivindica os jobs e executa todos num único lote, no loop do app."""
+    async def rodar():
+        from sqlmodel.ext.asyncio.session import AsyncSession
+        from app.database import async_engine
+
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            await jobs.agendar_mensalidades(session, mes, republic_ids)
+            await session.commit()
+            lote = await jobs.reivindicar(session, 100)
+        return await jobs.executar_lote(lote)
+
+    return client.portal.call(rodar)
+
+
+def quebrar_republica(monkeypatch, republic_id):
+    original = jobs.gerar_mensalidades
+
+    async def gerar(session, mes, republic_ids=None):
+        if republic_id in republic_ids:
+            raise RuntimeError(f"república {republic_id} quebrada")
+        return await original(session, mes, republic_ids)
+
+    monkeypatch.setattr(jobs, "gerar_mensalidades", gerar)
+
+
+def jobs_do_mes(banco, mes):
+    banco.expire_all()
+    return {job.republic_id: job for job in banco.exec(select(Job).where(Job.reference_month == jobs.referencia(mes))).all()}
+
+
+def despesas_do_mes(banco, republic_id, mes):
+    return banco.exec(
+        select(Expense).where(Expense.republic_id == republic_id, Expense.reference_month == jobs.referencia(mes))
+    ).all()
+
+
+def utc(momento: datetime) -> datetime:
+    # O SQLite devolve as datas sem fuso
+    return momento if momento.tzinfo else momento.replace(tzinfo=timezone.utc)
+
+
+def test_republica_com_erro_nao_desfaz_o_lote(client, banco, monkeypatch, republicas_com_template):
+    mes = date(2031, 3, 1)
+    boa1, ruim, boa2 = republicas_com_template
+    quebrar_republica(monkeypatch, ruim)
+    antes = datetime.now(timezone.utc)
+
+    assert rodar_mes(client, mes, republicas_com_template) == 2
+
+    por_republica = jobs_do_mes(banco, mes)
+    for rep_id in (boa1, boa2):
+        job = por_republica[rep_id]
+        assert (job.status, job.attempts, job.result, job.last_error) == ("concluido", 1, 1, None)
+        assert utc(job.run_after) <= datetime.now(timezone.utc)
+        assert len(despesas_do_mes(banco, rep_id, mes)) == 1
+
+    job = por_republica[ruim]
+    assert (job.status, job.attempts, job.finished_at) == ("pendente", 1, None)
+    assert "quebrada" in job.last_error
+    # Backoff: a próxima tentativa fica para depois de jobs_intervalo * 2
+    assert (utc(job.run_after) - antes).total_seconds() >= settings.jobs_intervalo * 2
+    assert despesas_do_mes(banco, ruim, mes) == []
+
+
+def test_job_falha_de_vez_depois_da_ultima_tentativa(client, banco, monkeypatch, republicas_com_template):
+    mes = date(2031, 4, 1)
+    boa1, ruim, boa2 = republicas_com_template
+    quebrar_republica(monkeypatch, ruim)
+
+    async def agendar():
+        from sqlmodel.ext.asyncio.session import AsyncSession
+        from app.database import async_engine
+
+        async with AsyncSession(async_engine) as session:
+            await jobs.agendar_mensalidades(session, mes, [ruim])
+            await session.commit()
+
+    client.portal.call(agendar)
+    job = jobs_do_mes(banco, mes)[ruim]
+    job.attempts = settings.jobs_max_tentativas - 1
+    banco.add(job)
+    banco.commit()
+
+    assert rodar_mes(client, mes, republicas_com_template) == 2
+
+    por_republica = jobs_do_mes(banco, mes)
+    job = por_republica[ruim]
+    assert (job.status, job.attempts) == ("falhou", settings.jobs_max_tentativas)
+    assert job.finished_at is not None and "quebrada" in job.last_error
+    assert [por_republica[rep_id].status for rep_id in (boa1, boa2)] == ["concluido", "concluido"]
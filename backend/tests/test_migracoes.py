@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def _alembic(arquivo: Path, *argumentos: str):
+    # Processo à parte: o env.py das migrações lê o DATABASE_URL do settings
+    ambiente = {**os.environ, "DATABASE_URL": f"sqlite:///{arquivo}"}
+    ambiente.pop("SHARDS", None)
+    subprocess.run([sys.executable, "-m", "alembic", *argumentos], cwd=BACKEND, env=ambiente, check=True, capture_output=True)
+
+
+@pytest.fixture
+def banco_0007(tmp_path):
+    """Banco no schema anterior aos centavos, com fatias divididas em float."""
+    arquivo = tmp_path / "antigo.db"
+    _alembic(arquivo, "upgrade", "0007")
+    conexao = sqlite3.connect(arquivo)
+    conexao.execute("INSERT INTO republic (id, name, address, invite_code) VALUES (1, 'Casa', 'Rua 1', 'REP-CAS-0001')")
+    conexao.executemany(
+        "INSERT INTO user (id, name, email, hashed_password, republic_id, fixed_rent, role_tag) VALUES (?, ?, ?, 'x', 1, 0, 'morador')",
+        [(i, f"m{i}", f"m{i}@teste.com") for i in (1, 2, 3)],
+    )
+    # 100,00 e 200,00 em três (33,333... e 66,666...) e 0,10 em três (0,0333...)
+    for expense_id, total in ((1, 100.0), (2, 200.0), (3, 0.1)):
+        conexao.execute(
+            "INSERT INTO expense (id, description, amount, due_date, split_type, category, republic_id) "
+            "VALUES (?, 'conta', ?, '2026-01-10', 'igual', 'geral', 1)",
+            (expense_id, total),
+        )
+        for user_id in (1, 2, 3):
+            conexao.execute(
+                "INSERT INTO userexpense (value, is_paid, paid_amount, user_id, expense_id) VALUES (?, 0, 0, ?, ?)",
+                (total / 3, user_id, expense_id),
+            )
+    # A primeira fatia de 100,00 foi quitada com um recibo de 33,333...; ela vai ganhar o centavo que falta
+    conexao.execute("UPDATE userexpense SET is_paid = 1, paid_amount = value WHERE id = 1")
+    conexao.execute("INSERT INTO paymenthistory (user_expense_id, amount, payment_date, confirmed_by_id) VALUES (1, 100.0 / 3, '2026-01-11', 1)")
+    conexao.commit()
+    conexao.close()
+    return arquivo
+
+
+def test_centavos_fecham_as_despesas_e_os_recibos(banco_0007):
+    _alembic(banco_0007, "upgrade", "0008")
+
+    conexao = sqlite3.connect(banco_0007)
+    despesas = conexao.execute(
+        "SELECT e.id, e.amount, SUM(ue.value) FROM expense e JOIN userexpense ue ON ue.expense_id = e.id GROUP BY e.id"
+    ).fetchall()
+    assert despesas == [(1, 10000, 10000), (2, 20000, 20000), (3, 10, 10)]
+    fatias = dict(conexao.execute("SELECT id, value FROM userexpense WHERE expense_id = 1").fetchall())
+    assert sorted(fatias.values()) == [3333, 3333, 3334]
+    assert conexao.execute("SELECT value, paid_amount FROM userexpense WHERE id = 1").fetchone() == (3334, 3334)
+    assert conexao.execute("SELECT SUM(amount) FROM paymenthistory WHERE user_expense_id = 1").fetchone() == (3334,)
+    # Ledger recalculado: o que falta das fatias em aberto
+    assert conexao.execute("SELECT SUM(open_debts) FROM userbalance").fetchone() == (10000 + 20000 + 10 - 3334,)
+    conexao.close()
+
+    # As migrações seguintes rodam sobre os dados convertidos
+    _alembic(banco_0007, "upgrade", "head")
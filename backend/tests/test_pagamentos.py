@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
+from sqlmodel import select
+
+from app.api.financas import TENTATIVAS_PAGAMENTO
+from app.models.finance import PaymentHistory
+
+
+@contextmanager
+def outro_pagamento_antes(vezes: int):
+    """
+    Simula outro admin pagando as mesmas fatias entre a leitura e a escrita: logo antes do
+    UPDATE com a versão lida, sobe a versão das fatias (nas primeiras `vezes` tentativas).
+    Devolve a lista das tentativas de UPDATE.
+    """
+    tentativas = []
+
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE userexpense") and "userexpense.version = ?" in statement:
+            tentativas.append(statement)
+            if len(tentativas) <= vezes:
+                cursor.execute("UPDATE userexpense SET version = version + 1")
+
+    event.listen(Engine, "before_cursor_execute", antes)
+    try:
+        yield tentativas
+    finally:
+        event.remove(Engine, "before_cursor_execute", antes)
+
+
+def _republica_com_despesa(client, nova_republica):
+    """Três moradores e uma despesa de 90,00: uma fatia de 30,00 para cada."""
+    membros = nova_republica(3)
+    resposta = client.post(
+        "/financas/despesas",
+        json={"description": "Luz", "total_value": 90, "due_date": "2026-10-10", "category": "luz"},
+        headers=membros[0][1],
+    )
+    assert resposta.status_code == 200, resposta.text
+    return membros
+
+
+def _recibos(banco, user_id):
+    return banco.exec(
+        select(func.count(PaymentHistory.id)).where(PaymentHistory.confirmed_by_id == user_id)
+    ).one()
+
+
+def test_conflito_em_todas_as_tentativas_da_409(client, nova_republica, banco):
+    (admin_id, admin), (morador_id, _), _ = _republica_com_despesa(client, nova_republica)
+
+    with outro_pagamento_antes(vezes=TENTATIVAS_PAGAMENTO) as tentativas:
+        resposta = client.post("/financas/pagar-divida", json={"user_id": morador_id, "amount": 30}, headers=admin)
+
+    assert resposta.status_code == 409
+    assert len(tentativas) == TENTATIVAS_PAGAMENTO
+    assert _recibos(banco, admin_id) == 0
+    devedores = {d["id"]: d for d in client.get("/financas/devedores", headers=admin).json()}
+    assert devedores[morador_id]["total_owed"] == 30.0
+
+
+def test_conflito_passageiro_refaz_o_pagamento(client, nova_republica, banco):
+    (admin_id, admin), (morador_id, _), _ = _republica_com_despesa(client, nova_republica)
+
+    with outro_pagamento_antes(vezes=1) as tentativas:
+        resposta = client.post("/financas/pagar-divida", json={"user_id": morador_id, "amount": 30}, headers=admin)
+
+    assert resposta.status_code == 200, resposta.text
+    assert len(tentativas) == 2
+    assert _recibos(banco, admin_id) == 1
+
+
+def test_reenvio_com_a_mesma_chave_devolve_a_resposta_salva(client, nova_republica, banco):
+    (admin_id, admin), (morador_id, _), _ = _republica_com_despesa(client, nova_republica)
+    cabecalhos = {**admin, "Idempotency-Key": "pagamento-1"}
+    pedido = {"user_id": morador_id, "amount": 10}
+
+    primeira = client.post("/financas/pagar-divida", json=pedido, headers=cabecalhos)
+    segunda = client.post("/financas/pagar-divida", json=pedido, headers=cabecalhos)
+
+    assert primeira.status_code == segunda.status_code == 200
+    assert segunda.json() == primeira.json()
+    assert _recibos(banco, admin_id) == 1
+    devedores = {d["id"]: d for d in client.get("/financas/devedores", headers=admin).json()}
+    assert devedores[morador_id]["total_owed"] == 20.0
+
+
+def test_mesma_chave_com_outro_corpo_da_422(client, nova_republica, banco):
+    (admin_id, admin), (morador_id, _), _ = _republica_com_despesa(client, nova_republica)
+    cabecalhos = {**admin, "Idempotency-Key": "pagamento-2"}
+
+    primeira = client.post("/financas/pagar-divida", json={"user_id": morador_id, "amount": 10}, headers=cabecalhos)
+    outra = client.post("/financas/pagar-divida", json={"user_id": morador_id, "amount": 11}, headers=cabecalhos)
+
+    assert primeira.status_code == 200, primeira.text
+    assert outra.status_code == 422
+    assert _recibos(banco, admin_id) == 1
+
+
+def test_pagamento_acima_da_divida_devolve_a_sobra(client, nova_republica):
+    (_, admin), (morador_id, _), _ = _republica_com_despesa(client, nova_republica)
+
+    resposta = client.post("/financas/pagar-divida", json={"user_id": morador_id, "amount": 50.25}, headers=admin)
+
+    assert resposta.status_code == 200, resposta.text
+    assert resposta.json()["sobra_em_caixa"] == 20.25
+    devedores = {d["id"] for d in client.get("/financas/devedores", headers=admin).json()}
+    assert morador_id not in devedores